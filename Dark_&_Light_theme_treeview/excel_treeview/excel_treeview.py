@@ -1,44 +1,80 @@
 import os
+import queue
 import sys
 import tkinter as tk
 from sys import *
 from tkinter import *
-import tkinter.font as tkf
 from tkinter import filedialog, ttk
 import numpy
 import openpyxl
-import pandas as pd
+from sheet_cache import SheetCache
+from sheet_loader import SheetLoader
+from virtual_treeview import RowBatches, VirtualTreeview
 
 
 # add path as global
 global path
 path = "people.xlsx"
+loader = None  # The SheetLoader reading the current file
+cache = SheetCache()  # Parsed files, reopened without parsing them while they are unchanged
+df = None  # The DataFrame of the current file once it is read
+LOAD_POLL_MS = 50
 # [Start of Function To Load data from Excel]
 def load_data():
     """
-    Load data from an Excel file into the TreeView widget.
+    Load data from an Excel or CSV file into the TreeView widget.
+    The file at path is read once on a background thread, see SheetLoader, and its rows
+    show as they are read. Only the rows in view are inserted into the TreeView, see VirtualTreeview.
     """
-    # Open the Excel file
-    try:
-        df = pd.read_excel(path)
-    except FileNotFoundError:
-        print("File not found.")
-        return
-
-    # Get column names dynamically
-    cols = list(df.columns)
-
-    # Set columns for the TreeView
-    treeview["columns"] = cols
-    for col in cols:
-        treeview.heading(col, text=col)
-        # Adjust column width to fit content
-        treeview.column(col, minwidth=0, width=tkf.Font().measure(col))
-		#treeview.column(col, minwidth=0, width=tkf.Font().measure(col))
-
-    # Insert data into the TreeView
-    for index, row in df.iterrows():
-        treeview.insert("", tk.END, values=tuple(row))
+    global loader
+    if loader is not None:
+        loader.cancel()  # Another file was opened while the previous one was still loading
+    loader = SheetLoader(path, cache)
+    loader.start()
+    label.config(text=f"Loading {os.path.basename(path)}...")
+    root.after(LOAD_POLL_MS, poll_loader, loader)
+
+
+def poll_loader(current):
+    """
+    Shows the rows read by a SheetLoader so far.
+    Runs on the Tk main loop and reschedules itself until the file is read.
+    """
+    global df
+    if current is not loader:
+        return  # Replaced by a newer file
+    rows_added = False
+    while True:
+        try:
+            kind, value = current.events.get_nowait()
+        except queue.Empty:
+            break
+        if kind == "columns":
+            # Set columns for the TreeView from the column names, each as wide as its name
+            table.set_data(RowBatches(), columns=value)
+        elif kind == "rows":
+            table.data.append(value)
+            rows_added = True
+        elif kind == "done":
+            # Same rows, now in one DataFrame
+            df = value
+            table.replace_data(df)
+            label.config(text=f"{os.path.basename(current.path)}: {len(df):,} rows in {current.seconds:.1f}s"
+                              + (" (cached)" if current.cached else ""))
+            return
+        else:
+            if isinstance(value, FileNotFoundError):
+                # Handle error if the file is not found
+                label.config(text="File Could Not Be Found, Please Try Again!")
+            else:
+                # Handle error if the file cannot be opened
+                label.config(text="File Could Not Be Opened, Please Try Again!")
+            print(f"Could not read {current.path}: {value!r}")
+            return
+    if rows_added:
+        table.data_changed()
+        label.config(text=f"Loading {os.path.basename(current.path)}: {len(table):,} rows...")
+    root.after(LOAD_POLL_MS, poll_loader, current)
 # [End of Function To Load data from Excel]
 # [Start of Function to switch mode/ theme between dark and light]
 # Function to switch mode/ theme between dark and light
@@ -55,15 +91,7 @@ def clear_tree():
     """
     Clear all items in the TreeView widget.
     """
-    #for item in treeview.get_children():
-        #treeview.delete(item)
-
-
-# [End of Function to Clear_TreeView]
-
-# [Start of Function to Clear_TreeView]
-def clear_tree():
-    my_tree.delete(*my_tree.get_children())
+    table.clear()
 
 
 # [End of Function to Clear_TreeView]
@@ -74,9 +102,9 @@ def clear_tree():
 def file_open():
     """
     Open a file dialog to select a file, load its data into a DataFrame,
-    and display the data in the TreeView widget.
+    and display the data in the TreeView widget while it loads.
     """
-    #global path
+    global path
     #pass           #pass when function is empty
     filename=filedialog.askopenfilename(
         initialdir=os.getcwd(),
@@ -85,48 +113,15 @@ def file_open():
         filetype=(("xlsx files","*.xlsx"),("csv files","*.csv"))
         )
     if filename:
-        try:
-		 # Attempt to read the file as an Excel file and load its data into a DataFrame
-            #df = pd.read_excel(filename)
-            filename = r"{}".format(filename)
-            df = pd.read_excel(filename)
-
-            # Set the global path variable to the selected file
-            path = filename
-
-            # Clear any existing data in the TreeView widget
-            clear_tree()
-
-            # Load the data from the DataFrame into the TreeView widget
-            load_data()
-
-        except ValueError:
-            # Handle error if the file cannot be opened
-            label.config(text="File Could Not Be Opened, Please Try Again!")
-        except FileNotFoundError:
-            # Handle error if the file is not found
-            label.config(text="File Could Not Be Found, Please Try Again!")
-
-            
-# Clear Old TreeView
-    clear_tree()       
-
-
-# Setup new TreeView 
-    my_tree["column"] = list(df.columns)
-    my_tree["show"] = "headings"
-
-    #loop thru column  list
-    
-    for column in my_tree["column"]:
-        my_tree.heading(column, text=column)
-    
-    # put data in treeview
-    df_rows = df.to_numpy().tolist()
-    for row in df_rows:
-        my_tree.insert("", "end", values=row)
-    my_tree.pack()
-    
+        # Set the global path variable to the selected file
+        path = r"{}".format(filename)
+
+        # Clear any existing data in the TreeView widget
+        clear_tree()
+
+        # Read the file as an Excel or CSV file and load its data into the TreeView widget
+        load_data()
+
  #[End of Function to Open Files]
 
 
@@ -142,8 +137,6 @@ root.tk.call("source", "forest-light.tcl")
 root.tk.call("source", "forest-dark.tcl")
 style.theme_use("forest-dark")
 
-my_tree = ttk.Treeview()
-
 #Create Frame
 frame = ttk.Frame(root)
 frame.pack()
@@ -210,10 +203,11 @@ treeScroll.pack(side="right", fill="y")
 
 # Define columns for the TreeView dynamically
 treeview = ttk.Treeview(
-    treeFrame, show="headings", yscrollcommand=treeScroll.set, height=13
+    treeFrame, show="headings", height=13
 )
 treeview.pack(fill="both", expand=True)
-treeScroll.config(command=treeview.yview)
+# The rows stay in the DataFrame, the TreeView only holds the visible ones and treeScroll follows the DataFrame
+table = VirtualTreeview(treeview, treeScroll)
 
 #treeview.pack()
 
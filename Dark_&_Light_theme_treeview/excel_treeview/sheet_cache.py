@@ -0,0 +1,189 @@
+# [START OF SCRIPT sheet_cache.py]
+"""
+Cache of parsed spreadsheets, so reopening an unchanged file skips parsing it.
+
+Each entry is keyed on the file's absolute path, size and modification time and stored in its own folder
+of the cache directory: the numeric, boolean and date columns as NumPy .npy files, memory-mapped when the
+entry is read, the other columns (text, mixed values, pandas extension types) in one pickle. The entries
+used least recently are deleted once the cache grows over its size limit.
+
+Usage:
+    cache = SheetCache()
+    stamp = file_stamp("people.xlsx")
+    df = cache.get("people.xlsx", stamp)  # None when the file is not cached or has changed
+    if df is None:
+        df = pd.read_excel("people.xlsx")
+        cache.put(df, stamp)
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".excel_treeview", "cache")
+DEFAULT_CACHE_BYTES = 1024 ** 3  # 1 GiB
+ENTRY_INFO_NAME = "entry.json"
+OTHER_COLUMNS_NAME = "columns.pkl"
+# Column types stored as .npy files: bool, integers, floats, complex, timedelta64 and datetime64
+MAPPED_KINDS = "biufcmM"
+
+
+def file_stamp(path):
+    """
+    Returns what identifies a version of a file, taken before reading it so a change made while it is read
+    leaves the cached copy stale instead of wrong.
+
+    Args:
+        path (str): The file.
+
+    Returns:
+        tuple: (absolute path, size, modification time in nanoseconds).
+    """
+    info = os.stat(path)
+    return os.path.abspath(path), info.st_size, info.st_mtime_ns
+
+
+class SheetCache:
+    """
+    Parsed spreadsheets stored as memory-mappable columns, with LRU eviction by total size.
+    The time an entry was last read is the modification time of its entry.json.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_BYTES):
+        """
+        Args:
+            directory (str): The cache directory, created when needed.
+            max_bytes (int): The size the cache is trimmed to after each new entry.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def entry_path(self, stamp):
+        """Returns the folder of the entry for a file_stamp()."""
+        key = hashlib.sha256(json.dumps(list(stamp)).encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, key)
+
+    def get(self, path, stamp=None):
+        """
+        Reads the cached DataFrame of a file.
+
+        Args:
+            path (str): The spreadsheet.
+            stamp (tuple): Its file_stamp(), taken now by default.
+
+        Returns:
+            pd.DataFrame: The rows, with the .npy columns memory-mapped copy-on-write,
+            or None when the file is not cached in its current version.
+        """
+        entry = self.entry_path(stamp or file_stamp(path))
+        info_path = os.path.join(entry, ENTRY_INFO_NAME)
+        try:
+            with open(info_path, encoding="utf-8") as f:
+                info = json.load(f)
+            others = pd.read_pickle(os.path.join(entry, OTHER_COLUMNS_NAME)) if info["pickled"] else None
+            columns = {}
+            for index, name in enumerate(info["columns"]):
+                if index in info["mapped"]:
+                    columns[name] = numpy.load(os.path.join(entry, f"{index}.npy"), mmap_mode="c")
+                else:
+                    columns[name] = others[name]
+            os.utime(info_path)  # Most recently used
+        except (OSError, ValueError, KeyError):
+            return None  # Not cached, or an entry being written or deleted
+        return pd.DataFrame(columns, columns=info["columns"], copy=False)
+
+    def put(self, df, stamp):
+        """
+        Stores the DataFrame parsed from a file, replacing the entries of its older versions, then deletes
+        the least recently used entries beyond the size limit. The entry is written in a temporary folder
+        renamed when complete, so a reader never sees half an entry.
+
+        Args:
+            df (pd.DataFrame): The rows parsed from the file, with unique column names.
+            stamp (tuple): The file_stamp() taken before the file was read.
+        """
+        entry = self.entry_path(stamp)
+        if os.path.exists(entry):
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        temp_entry = f"{entry}.tmp-{os.getpid()}"
+        try:
+            os.makedirs(temp_entry)
+            mapped = [index for index, dtype in enumerate(df.dtypes)
+                      if isinstance(dtype, numpy.dtype) and dtype.kind in MAPPED_KINDS]
+            for index in mapped:
+                numpy.save(os.path.join(temp_entry, f"{index}.npy"), df.iloc[:, index].to_numpy())
+            others = [index for index in range(df.shape[1]) if index not in mapped]
+            if others:
+                df.iloc[:, others].to_pickle(os.path.join(temp_entry, OTHER_COLUMNS_NAME))
+            info = {"source": stamp[0], "size": stamp[1], "mtime_ns": stamp[2], "rows": len(df),
+                    "columns": [str(name) for name in df.columns], "mapped": mapped, "pickled": bool(others),
+                    "bytes": sum(item.stat().st_size for item in os.scandir(temp_entry))}
+            with open(os.path.join(temp_entry, ENTRY_INFO_NAME), "w", encoding="utf-8") as f:
+                json.dump(info, f)
+            os.rename(temp_entry, entry)
+        finally:
+            shutil.rmtree(temp_entry, ignore_errors=True)  # Only left when the entry was not written
+        self.trim(keep_source=stamp[0], keep_entry=entry)
+
+    def entries(self):
+        """
+        Lists the complete entries of the cache.
+
+        Returns:
+            list: (last use time, bytes, source path, entry folder) tuples, least recently used first.
+        """
+        entries = []
+        try:
+            folders = [folder for folder in os.scandir(self.directory) if folder.is_dir() and ".tmp-" not in folder.name]
+        except FileNotFoundError:
+            return entries
+        for folder in folders:
+            info_path = os.path.join(folder.path, ENTRY_INFO_NAME)
+            try:
+                with open(info_path, encoding="utf-8") as f:
+                    info = json.load(f)
+                entries.append((os.path.getmtime(info_path), info["bytes"], info["source"], folder.path))
+            except (OSError, ValueError, KeyError):
+                entries.append((0.0, 0, None, folder.path))  # Left by a deletion that failed, removed first
+        entries.sort()
+        return entries
+
+    def trim(self, keep_source=None, keep_entry=None):
+        """
+        Deletes the entries of older versions of a file and the least recently used entries until the cache
+        fits in max_bytes.
+
+        Args:
+            keep_source (str): A file whose other entries are outdated.
+            keep_entry (str): The entry of its current version, never deleted.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _, _ in entries)
+        for _, size, source, folder in entries:
+            if folder == keep_entry:
+                continue
+            if total > self.max_bytes or source is None or source == keep_source:
+                self.delete(folder)
+                total -= size
+
+    def delete(self, folder):
+        """
+        Deletes an entry, its entry.json first so it is no longer read. A file still memory-mapped
+        (on Windows) is left for a later trim.
+        """
+        try:
+            os.remove(os.path.join(folder, ENTRY_INFO_NAME))
+        except OSError:
+            pass
+        shutil.rmtree(folder, ignore_errors=True)
+
+    def clear(self):
+        """Deletes every entry."""
+        for _, _, _, folder in self.entries():
+            self.delete(folder)
+
+# [END OF SCRIPT sheet_cache.py]
@@ -0,0 +1,283 @@
+# [START OF SCRIPT sheet_loader.py]
+"""
+Reads a spreadsheet once, on a background thread, in batches of rows.
+
+The reader is picked from the file extension: openpyxl in read-only mode for Excel workbooks, which parses
+the sheet row by row instead of loading it whole, and pandas' chunked CSV reader for CSV files. The first
+batch is small so the first screen of rows shows at once, the following ones grow to keep the overhead low.
+With a SheetCache, reopening an unchanged file memory-maps its cached columns instead of parsing it.
+
+Usage:
+    loader = SheetLoader("people.xlsx")
+    loader.start()
+    kind, value = loader.events.get()  # ("columns", names), ("rows", batch)..., then ("done", df) or ("error", e)
+"""
+import os
+import pickle
+import queue
+import threading
+import time
+
+import openpyxl
+import pandas as pd
+from pandas.io.parsers import TextParser
+from sheet_cache import file_stamp
+
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm", ".xltx", ".xltm")
+CSV_EXTENSIONS = (".csv",)
+FIRST_BATCH_ROWS = 200  # About a few screens of rows
+MAX_BATCH_ROWS = 20000
+# Values pd.read_csv reads as booleans
+CSV_TRUE_VALUES = ("True", "TRUE", "true")
+CSV_FALSE_VALUES = ("False", "FALSE", "false")
+
+
+def batch_sizes():
+    """Yields the number of rows of each batch: small first, then doubling up to MAX_BATCH_ROWS."""
+    size = FIRST_BATCH_ROWS
+    while True:
+        yield size
+        size = min(size * 2, MAX_BATCH_ROWS)
+
+
+def unique_columns(names):
+    """
+    Names the columns of a header row the way pandas does: "Unnamed: <index>" for empty cells and a
+    ".<n>" suffix for repeated names, so every TreeView column has its own identifier.
+
+    Args:
+        names (tuple): The cells of the header row.
+
+    Returns:
+        list: The column names, as strings.
+    """
+    columns = []
+    seen = {}
+    for index, name in enumerate(names):
+        name = f"Unnamed: {index}" if name is None or name == "" else str(name)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        seen.setdefault(name, 0)
+        columns.append(name)
+    return columns
+
+
+def read_excel_batches(path):
+    """
+    Reads the active sheet of a workbook with openpyxl in read-only mode.
+
+    Args:
+        path (str): The workbook.
+
+    Yields:
+        The column names from the first row, then lists of row tuples. Empty rows at the end of the sheet are left out.
+    """
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        columns = unique_columns(next(rows, ()))
+        yield columns
+        width = len(columns)
+        sizes = batch_sizes()
+        size = next(sizes)
+        batch = []
+        blank_rows = []  # Only kept once a row with values follows them
+        for row in rows:
+            if len(row) != width:
+                row = (row + (None,) * width)[:width]  # The sheet's dimension was missing or wrong
+            if all(value is None for value in row):
+                blank_rows.append(row)
+                continue
+            if blank_rows:
+                batch.extend(blank_rows)
+                blank_rows = []
+            batch.append(row)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+                size = next(sizes)
+        if batch:
+            yield batch
+    finally:
+        workbook.close()
+
+
+def read_csv_batches(path):
+    """
+    Reads a CSV file with pandas' chunked reader. The values are read as text, missing values as NaN:
+    the reader would infer the types of each chunk on its own, so a column could be integers in one batch
+    and floats or text in the next. parse_csv_column types the whole columns once the file is read.
+
+    Args:
+        path (str): The CSV file.
+
+    Yields:
+        The column names, then DataFrames of rows.
+    """
+    sizes = batch_sizes()
+    with pd.read_csv(path, chunksize=FIRST_BATCH_ROWS, dtype=str, encoding_errors="replace") as reader:
+        chunk = reader.get_chunk(next(sizes))  # Empty but with the columns when the file only has a header
+        yield [str(column) for column in chunk.columns]
+        while True:
+            yield chunk
+            try:
+                chunk = reader.get_chunk(next(sizes))
+            except StopIteration:
+                return
+
+
+def read_batches(path):
+    """
+    Reads a spreadsheet in batches with the reader for its format.
+    Other formats than Excel workbooks and CSV files (e.g. .xls) are read whole by pd.read_excel.
+
+    Args:
+        path (str): The spreadsheet.
+
+    Yields:
+        The column names, then batches of rows (lists of tuples or DataFrames).
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in EXCEL_EXTENSIONS:
+        yield from read_excel_batches(path)
+    elif extension in CSV_EXTENSIONS:
+        yield from read_csv_batches(path)
+    else:
+        df = pd.read_excel(path)
+        yield [str(column) for column in df.columns]
+        yield df
+
+
+def parse_csv_column(column):
+    """
+    Gives a column of a CSV file read as text the type pd.read_csv infers when it reads the whole file:
+    integers, floats (also for integers with missing values), booleans (objects with missing values) or text.
+
+    Args:
+        column (pd.Series): The values as text, NaN for missing values.
+
+    Returns:
+        pd.Series: The typed column.
+    """
+    try:
+        return pd.to_numeric(column)
+    except (ValueError, TypeError):
+        pass
+    values = column.dropna()
+    if len(values) and values.isin(CSV_TRUE_VALUES + CSV_FALSE_VALUES).all():
+        booleans = column.map(lambda value: value in CSV_TRUE_VALUES, na_action="ignore")
+        return booleans.astype(bool) if len(values) == len(column) else booleans.astype(object)
+    return column
+
+
+def build_frame(columns, batches, parse_text=False):
+    """
+    Joins the batches read from a file into one DataFrame, with the column types pandas would infer
+    reading the whole file at once.
+
+    Args:
+        columns (list): The column names.
+        batches (list): The batches, all lists of rows or all DataFrames.
+        parse_text (bool): The batches are CSV rows read as text, typed with parse_csv_column once joined.
+
+    Returns:
+        pd.DataFrame: The rows. Lists of rows go through the TextParser pd.read_excel uses, so empty cells
+        are NaN, empty columns are floats and numbers stored as text are numbers, as with pd.read_excel.
+    """
+    if batches and isinstance(batches[0], pd.DataFrame):
+        df = pd.concat(batches, ignore_index=True) if len(batches) > 1 else batches[0]
+        df.columns = columns
+        if parse_text:
+            df = pd.DataFrame({index: parse_csv_column(df.iloc[:, index]) for index in range(df.shape[1])})
+            df.columns = columns
+        return df
+    rows = [["" if value is None else value for value in row] for batch in batches for row in batch]
+    return TextParser(rows, names=columns).read()  # Empty cells as "" like pd.read_excel, read as missing values
+
+
+class SheetLoader:
+    """
+    Reads a spreadsheet on a background thread and posts what it reads to a queue, for the Tk main loop
+    to drain with root.after:
+        ("columns", names)  once, before any row
+        ("rows", batch)     for each batch, a list of row tuples or a DataFrame
+        ("done", df)        at the end, with all the rows in one DataFrame
+        ("error", e)        instead of "done" when the file cannot be read, e is the exception
+    The file is read exactly once, the final DataFrame is built from the batches. With a SheetCache, an
+    unchanged file is read from the cache instead, posting no "rows" before "done", and a parsed file is
+    added to the cache once "done" is posted.
+    """
+
+    def __init__(self, path, cache=None):
+        """
+        Args:
+            path (str): The spreadsheet to read.
+            cache (SheetCache): The cache of parsed files, if any.
+        """
+        self.path = path
+        self.cache = cache
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.rows = 0
+        self.seconds = 0.0
+        self.cached = False  # Read from the cache
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        """Starts reading on the background thread."""
+        self.thread.start()
+
+    def cancel(self):
+        """Stops reading after the current batch, nothing more is posted."""
+        self.cancel_event.set()
+
+    def run(self):
+        """Reads the file, or its cached copy, and posts its rows, runs on the background thread."""
+        start_time = time.perf_counter()
+        try:
+            stamp = file_stamp(self.path)  # Before reading, a change made meanwhile leaves the entry stale
+            df = self.cache.get(self.path, stamp) if self.cache is not None else None
+            if df is not None:
+                self.cached = True
+                self.events.put(("columns", list(df.columns)))
+            else:
+                df = self.read()
+        except Exception as e:  # openpyxl, zipfile and pandas raise many types for unreadable files
+            self.events.put(("error", e))
+            return
+        if df is None:
+            return  # Cancelled
+        self.rows = len(df)
+        self.seconds = time.perf_counter() - start_time
+        self.events.put(("done", df))
+        if self.cache is not None and not self.cached:
+            try:
+                self.cache.put(df, stamp)
+            except (OSError, TypeError, pickle.PicklingError):
+                pass  # The cache only saves time, the file is parsed again next time
+
+    def read(self):
+        """
+        Parses the file, posting its column names and batches of rows.
+
+        Returns:
+            pd.DataFrame: All the rows, or None when cancelled.
+        """
+        batches = []
+        reader = read_batches(self.path)
+        try:
+            columns = next(reader)
+            self.events.put(("columns", columns))
+            for batch in reader:
+                if self.cancel_event.is_set():
+                    return None
+                if len(batch):
+                    batches.append(batch)
+                    self.rows += len(batch)
+                    self.events.put(("rows", batch))
+        finally:
+            reader.close()
+        return build_frame(columns, batches, parse_text=os.path.splitext(self.path)[1].lower() in CSV_EXTENSIONS)
+
+# [END OF SCRIPT sheet_loader.py]
@@ -0,0 +1,80 @@
+import os
+
+import numpy
+import pandas as pd
+import pytest
+
+from sheet_cache import ENTRY_INFO_NAME, SheetCache, file_stamp
+
+
+def make_frame(rows=1000):
+    return pd.DataFrame({
+        "id": numpy.arange(rows),
+        "price": numpy.linspace(0, 1, rows),
+        "flag": numpy.arange(rows) % 2 == 0,
+        "when": pd.date_range("2024-01-01", periods=rows, freq="h"),
+        "name": [f"n{index}" for index in range(rows)],
+        "mixed": [index if index % 3 else f"t{index}" for index in range(rows)],
+        "missing": [None if index % 5 == 0 else "x" for index in range(rows)],
+    })
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SheetCache(str(tmp_path / "cache"))
+
+
+def add_sheet(tmp_path, name):
+    """A file to key an entry on, its content does not matter to the cache."""
+    path = tmp_path / name
+    path.write_text(name, encoding="utf-8")
+    return str(path)
+
+
+def is_memory_mapped(array):
+    while array is not None and not isinstance(array, numpy.memmap):
+        array = array.base
+    return array is not None
+
+
+def test_round_trip(tmp_path, cache):
+    path = add_sheet(tmp_path, "sheet.xlsx")
+    df = make_frame()
+    cache.put(df, file_stamp(path))
+    cached = cache.get(path)
+    pd.testing.assert_frame_equal(cached.copy(), df)  # Copied into memory, assert_frame_equal compares array classes
+    for name in ("id", "price", "flag", "when"):
+        assert is_memory_mapped(cached[name].to_numpy()), name
+
+
+def test_changed_file_misses_cache_and_replaces_entry(tmp_path, cache):
+    path = add_sheet(tmp_path, "sheet.xlsx")
+    cache.put(make_frame(), file_stamp(path))
+    info = os.stat(path)
+    os.utime(path, ns=(info.st_atime_ns, info.st_mtime_ns + 1_000_000_000))
+    assert cache.get(path) is None
+
+    cache.put(make_frame(10), file_stamp(path))
+    assert len(cache.get(path)) == 10
+    assert len(cache.entries()) == 1  # The entry of the older version is deleted
+
+
+def test_trim_evicts_least_recently_used_first(tmp_path, cache):
+    paths = [add_sheet(tmp_path, f"sheet{index}.xlsx") for index in range(3)]
+    for age, path in zip((200, 100), paths):
+        cache.put(make_frame(), file_stamp(path))
+        entry_info = os.path.join(cache.entry_path(file_stamp(path)), ENTRY_INFO_NAME)
+        os.utime(entry_info, (os.path.getmtime(entry_info) - age,) * 2)
+    assert cache.get(paths[0]) is not None  # Now the most recently used
+    cache.max_bytes = sum(size for _, size, _, _ in cache.entries()) + 1  # Room for two entries
+
+    cache.put(make_frame(), file_stamp(paths[2]))
+    assert [source for _, _, source, _ in cache.entries()] == [os.path.abspath(paths[0]), os.path.abspath(paths[2])]
+    assert cache.get(paths[1]) is None
+
+
+def test_clear(tmp_path, cache):
+    path = add_sheet(tmp_path, "sheet.xlsx")
+    cache.put(make_frame(), file_stamp(path))
+    cache.clear()
+    assert cache.entries() == [] and cache.get(path) is None
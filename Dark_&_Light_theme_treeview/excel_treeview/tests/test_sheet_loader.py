@@ -0,0 +1,90 @@
+import datetime
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from sheet_loader import FIRST_BATCH_ROWS, SheetLoader
+
+
+def load(path, cache=None):
+    """Reads a file with a SheetLoader and returns its events."""
+    loader = SheetLoader(str(path), cache)
+    loader.start()
+    loader.thread.join()
+    events = []
+    while not loader.events.empty():
+        events.append(loader.events.get())
+    return loader, events
+
+
+def loaded_frame(path, cache=None):
+    loader, events = load(path, cache)
+    kind, value = events[-1]
+    assert kind == "done", value
+    return value
+
+
+def test_csv_columns_changing_type_after_first_batch(tmp_path):
+    path = tmp_path / "mixed.csv"
+    late = FIRST_BATCH_ROWS * 3  # In a later batch than the first one
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("int,late_float,late_missing,late_text,flag,flag_missing,empty,name,name\n")
+        for index in range(FIRST_BATCH_ROWS * 5):
+            f.write(",".join([str(index), "1.5" if index == late else str(index), "" if index == late else str(index),
+                              "text" if index == late else str(index), "True" if index % 3 else "false",
+                              "" if index == late else "TRUE", "", "x", "y"]) + "\n")
+    loader, events = load(path)
+    assert [kind for kind, _ in events].count("rows") > 1
+    df = events[-1][1]
+    pd.testing.assert_frame_equal(df, pd.read_csv(path))
+    assert list(df.dtypes.astype(str)[:5]) == ["int64", "float64", "float64", "str", "bool"]
+
+
+def test_header_only_csv(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("a,b,c\n", encoding="utf-8")
+    loader, events = load(path)
+    assert events[0] == ("columns", ["a", "b", "c"])
+    assert [kind for kind, _ in events].count("rows") == 0
+    pd.testing.assert_frame_equal(events[-1][1], pd.read_csv(path))
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """A workbook with numbers, text, dates, booleans, empty cells, an empty and a repeated column and blank rows."""
+    path = tmp_path / "sheet.xlsx"
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["id", "price", "name", "when", "flag", "mixed", None, "id", "number_text"])
+    for index in range(FIRST_BATCH_ROWS * 3):
+        if index == 250:
+            sheet.append([None] * 9)  # A blank row between rows is kept
+            continue
+        sheet.append([index, None if index == 300 else index * 1.5, None if index == 7 else f"n{index}",
+                      datetime.datetime(2024, 1, 1) + datetime.timedelta(hours=index), index % 2 == 0,
+                      None if index == 9 else (index if index < 400 else f"t{index}"), None, index, str(index)])
+    sheet.append([None] * 9)  # Blank rows at the end are left out
+    workbook.save(path)
+    return path
+
+
+def test_workbook_matches_read_excel(workbook):
+    df = loaded_frame(workbook)
+    pd.testing.assert_frame_equal(df, pd.read_excel(workbook))
+    assert list(df.columns[6:8]) == ["Unnamed: 6", "id.1"]
+
+
+def test_header_only_workbook(tmp_path):
+    path = tmp_path / "empty.xlsx"
+    workbook = openpyxl.Workbook()
+    workbook.active.append(["a", "b"])
+    workbook.save(path)
+    pd.testing.assert_frame_equal(loaded_frame(path), pd.read_excel(path))
+
+
+def test_unreadable_file_posts_error(tmp_path):
+    path = tmp_path / "broken.xlsx"
+    path.write_bytes(b"not a workbook")
+    _, events = load(path)
+    assert events[-1][0] == "error"
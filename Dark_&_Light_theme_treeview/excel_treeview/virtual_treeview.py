@@ -0,0 +1,313 @@
+# [START OF SCRIPT virtual_treeview.py]
+"""
+Virtual table mode for a ttk.Treeview.
+
+The rows stay in a pandas DataFrame, a 2-D NumPy array or a list of rows, and the Treeview only holds one
+item per visible line. Scrolling recycles those items by changing their values, so showing a table takes
+the same time and Tk memory whatever its number of rows.
+
+Rows still being read can be shown from a RowBatches, which grows as batches are appended.
+
+Usage:
+    table = VirtualTreeview(treeview, scrollbar)
+    table.set_data(df)
+"""
+import tkinter.font as tkf
+from bisect import bisect_right
+
+# Rows read around the visible ones, so scrolling a few lines does not slice the data again
+VIEW_BUFFER = 100
+# Lines scrolled by one notch of the mouse wheel
+WHEEL_LINES = 3
+
+
+def format_cell(value):
+    """
+    Returns the value shown in a cell, an empty string for missing values.
+
+    Args:
+        value: A cell of the data.
+
+    Returns:
+        The value, or "" for None, NaN, NaT and pd.NA.
+    """
+    try:
+        missing = value is None or bool(value != value)  # Only NaN-like values differ from themselves
+    except (TypeError, ValueError):
+        missing = True  # pd.NA has no truth value
+    return "" if missing else value
+
+
+def read_rows(data, start, stop):
+    """
+    Reads rows of a table.
+
+    Args:
+        data: A pandas DataFrame, a 2-D NumPy array, a RowBatches or a list of row sequences.
+        start (int): Index of the first row.
+        stop (int): Index after the last row.
+
+    Returns:
+        list: The rows, as lists of values.
+    """
+    if hasattr(data, "iloc"):
+        return data.iloc[start:stop].to_numpy().tolist()
+    if hasattr(data, "tolist"):
+        return data[start:stop].tolist()
+    if isinstance(data, RowBatches):
+        return data.rows(start, stop)
+    return [list(row) for row in data[start:stop]]
+
+
+class RowBatches:
+    """
+    Rows arriving in batches, read as one table while more batches are appended.
+    Each batch may be a DataFrame, a NumPy array or a list of rows, they are not copied.
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.starts = []  # Index of the first row of each batch
+        self.total = 0
+
+    def __len__(self):
+        return self.total
+
+    def append(self, batch):
+        """Adds a batch of rows after the current ones."""
+        if len(batch):
+            self.starts.append(self.total)
+            self.batches.append(batch)
+            self.total += len(batch)
+
+    def rows(self, start, stop):
+        """
+        Reads rows across the batches.
+
+        Args:
+            start (int): Index of the first row.
+            stop (int): Index after the last row.
+
+        Returns:
+            list: The rows, as lists of values.
+        """
+        rows = []
+        index = bisect_right(self.starts, start) - 1
+        while start < stop and 0 <= index < len(self.batches):
+            batch_start = self.starts[index]
+            rows.extend(read_rows(self.batches[index], start - batch_start, stop - batch_start))
+            start = batch_start + len(self.batches[index])
+            index += 1
+        return rows
+
+
+class VirtualTreeview:
+    """
+    Shows a large table in a ttk.Treeview by materializing only the rows in view.
+
+    The Treeview gets one item per visible line and the scrollbar is driven by this class instead of the
+    Treeview, from the position of the first visible row in the data. The selection is kept as a row index
+    of the data, so it survives the recycling of the items.
+    """
+
+    def __init__(self, treeview, scrollbar=None, buffer=VIEW_BUFFER):
+        """
+        Takes over the rows and the scrolling of a Treeview.
+
+        Args:
+            treeview (ttk.Treeview): The Treeview showing the table, with show="headings".
+            scrollbar (ttk.Scrollbar): Its vertical scrollbar, if any.
+            buffer (int): Rows read before and after the visible ones.
+        """
+        self.treeview = treeview
+        self.scrollbar = scrollbar
+        self.buffer = buffer
+        self.data = []
+        self.first = 0  # Row of the data shown on the first line
+        self.selected = None  # Selected row of the data, even when it is scrolled out of view
+        self.lines = int(treeview.cget("height"))  # Lines in view, measured again when the Treeview is resized
+        self._items = []
+        self._block_start = 0
+        self._block = []  # Rows self._block_start onwards, read from the data with the buffer
+
+        treeview.configure(selectmode="browse", yscrollcommand="")
+        if scrollbar is not None:
+            scrollbar.configure(command=self.yview)
+        # Widget bindings run before the class bindings, "break" keeps the Treeview from scrolling its few items
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            treeview.bind(sequence, self._on_wheel)
+        for sequence in ("<Up>", "<Down>", "<Prior>", "<Next>", "<Home>", "<End>"):
+            treeview.bind(sequence, self._on_key)
+        treeview.bind("<<TreeviewSelect>>", self._on_select)
+        treeview.bind("<Configure>", lambda event: self.fit())
+
+    def __len__(self):
+        return len(self.data)
+
+    def set_data(self, data, columns=None):
+        """
+        Shows a new table in place of the current one.
+
+        Args:
+            data: The rows, as a pandas DataFrame, a 2-D NumPy array, a RowBatches or a list of row sequences.
+            columns (list): The column headings, by default the columns of a DataFrame.
+                The columns are left as they are when there are none.
+        """
+        if columns is None and hasattr(data, "columns"):
+            columns = list(data.columns)
+        if columns is not None:
+            self.set_columns(columns)
+        self.data = data
+        self.first = 0
+        self.selected = None
+        self._block = []
+        self._block_start = 0
+        self.refresh()
+        self.treeview.after_idle(self.fit)  # The Treeview may be taller than its height option
+
+    def replace_data(self, data):
+        """
+        Shows other data holding the same rows, e.g. the DataFrame built once a file is read, keeping the
+        position and the selection.
+
+        Args:
+            data: The rows, see set_data.
+        """
+        self.data = data
+        self.data_changed()
+
+    def data_changed(self):
+        """Shows the changes of the data, e.g. the rows appended to a RowBatches since the last refresh."""
+        self._block = []
+        self._block_start = 0
+        self.refresh()
+
+    def set_columns(self, columns):
+        """
+        Sets the columns of the Treeview, each as wide as its heading.
+
+        Args:
+            columns (list): The column headings.
+        """
+        tree = self.treeview
+        tree["columns"] = columns
+        font = tkf.nametofont("TkHeadingFont")
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, minwidth=0, width=font.measure(col) + 20)
+
+    def clear(self):
+        """Removes all the rows."""
+        self.set_data([])
+
+    def rows(self, start, stop):
+        """
+        Reads rows of the data.
+
+        Args:
+            start (int): Index of the first row.
+            stop (int): Index after the last row.
+
+        Returns:
+            list: The rows, as lists of values.
+        """
+        return read_rows(self.data, start, stop)
+
+    def refresh(self):
+        """Shows the rows from self.first on the Treeview items and updates the selection and the scrollbar."""
+        total = len(self.data)
+        lines = min(self.lines, total)
+        self.first = max(0, min(self.first, total - lines))
+        stop = self.first + lines
+        if self.first < self._block_start or stop > self._block_start + len(self._block):
+            self._block_start = max(0, self.first - self.buffer)
+            self._block = self.rows(self._block_start, min(total, stop + self.buffer))
+
+        tree = self.treeview
+        while len(self._items) < lines:
+            self._items.append(tree.insert("", "end"))
+        while len(self._items) > lines:
+            tree.delete(self._items.pop())
+        offset = self.first - self._block_start
+        for position, item in enumerate(self._items):
+            tree.item(item, values=[format_cell(value) for value in self._block[offset + position]])
+
+        if self.selected is not None and self.first <= self.selected < stop:
+            item = self._items[self.selected - self.first]
+            if tree.selection() != (item,):
+                tree.selection_set(item)
+            tree.focus(item)
+        elif tree.selection():
+            tree.selection_remove(tree.selection())  # The item now shows another row
+
+        if self.scrollbar is not None:
+            self.scrollbar.set(self.first / total if total else 0.0, stop / total if total else 1.0)
+
+    def select(self, index):
+        """
+        Selects a row of the data and scrolls it into view.
+
+        Args:
+            index (int): The row, clamped to the data.
+        """
+        if not len(self.data):
+            return
+        self.selected = max(0, min(index, len(self.data) - 1))
+        if self.selected < self.first:
+            self.first = self.selected
+        elif self.selected >= self.first + self.lines:
+            self.first = self.selected - self.lines + 1
+        self.refresh()
+
+    def yview(self, *args):
+        """
+        Scrollbar command: scrolls to a fraction of the rows ("moveto") or by lines or pages ("scroll").
+        """
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * len(self.data))
+        elif args[0] == "scroll":
+            step = max(1, self.lines - 1) if args[2] == "pages" else 1
+            self.first += int(args[1]) * step
+        self.refresh()
+
+    def _on_wheel(self, event):
+        """Scrolls a few lines per notch of the mouse wheel (event.delta on Windows and macOS, buttons 4 and 5 on X11)."""
+        if event.num == 4 or (event.num != 5 and event.delta > 0):
+            self.first -= WHEEL_LINES
+        else:
+            self.first += WHEEL_LINES
+        self.refresh()
+        return "break"
+
+    def _on_key(self, event):
+        """Moves the selection through the whole data with the arrow, page, Home and End keys."""
+        if self.selected is None:
+            self.select(self.first)
+            return "break"
+        page = max(1, self.lines - 1)
+        moves = {"Up": -1, "Down": 1, "Prior": -page, "Next": page}
+        if event.keysym == "Home":
+            self.select(0)
+        elif event.keysym == "End":
+            self.select(len(self.data) - 1)
+        else:
+            self.select(self.selected + moves[event.keysym])
+        return "break"
+
+    def _on_select(self, event):
+        """Records the row of an item selected with the mouse."""
+        selection = self.treeview.selection()
+        if selection and selection[0] in self._items:
+            self.selected = self.first + self._items.index(selection[0])
+
+    def fit(self):
+        """Fits the number of items to the height of the Treeview, once it is laid out or when it is resized."""
+        bbox = self.treeview.bbox(self._items[0]) if self._items else ""
+        if not bbox:
+            return
+        lines = max(1, (self.treeview.winfo_height() - bbox[1]) // bbox[3])
+        if lines != self.lines:
+            self.lines = lines
+            self.refresh()
+
+# [END OF SCRIPT virtual_treeview.py]
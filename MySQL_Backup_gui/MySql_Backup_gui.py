@@ -3,13 +3,21 @@
 # SCRIPT DETAILS: MySQL_Backup_GUI_backup_20240701_1730.py
 
 import os
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import subprocess
-import datetime
 import shutil
-#pip install -v mysql-connector-python
-import mysql.connector  # Import mysql.connector for MySQL operations
+from mysql_backup_core import (BACKUP_LOCK_NAME, COMPRESSION_EXTENSIONS, DEFAULT_COMPRESSION, METADATA_CACHE, BackupCancelled,
+                               BackupError, FileLock, TransferLimits, backup_all_databases, backup_incremental,
+                               backup_tables_parallel, format_progress, format_restore_progress, get_pool,
+                               restore_point_in_time)
+from mysql_backup_scheduler import DEFAULT_KEEP_FULL, BackupScheduler, JobStore, make_job, store_keyring_password
+from mysql_backup_orchestrator import BatchOrchestrator, format_report, load_inventory, write_report
+
+QUEUE_POLL_MS = 100  # Interval at which the backup thread's events are drained on the Tk main loop
+# Backup modes of the scheduled jobs for each dump mode of the GUI
+JOB_MODES = {"All databases": "full", "Parallel per table": "parallel", "Incremental (binlog)": "incremental"}
 
 class MySQL_Backup_GUI:
     """GUI for performing MySQL backup and handling files using ttk widgets."""
@@ -26,6 +34,12 @@ class MySQL_Backup_GUI:
 
         # Set default directory to current working directory
         self.default_dir = os.getcwd()
+
+        self.progress_queue = queue.Queue()  # Events posted by the backup thread, drained on the Tk main loop
+        self.cancel_event = threading.Event()  # Set to stop a running backup
+        self.backup_thread = None
+        self.scheduler = None  # Runs the saved jobs while the window is open, unless a scheduler daemon does
+        self.schedule_queue = queue.Queue()  # Log messages of the scheduler, drained on the Tk main loop
         
         # Create and configure styles for the scrollbars
         self.style = ttk.Style()
@@ -58,6 +72,13 @@ class MySQL_Backup_GUI:
         # Create and configure the GUI elements
         self.create_widgets()
 
+        # A running backup is cancelled rather than killed with the window
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Run the jobs saved earlier
+        if JobStore().jobs():
+            self.start_scheduler()
+
     def on_frame_configure(self, event):
         """Adjust scroll region to the size of the frame."""
         self.canvas.configure(scrollregion=self.canvas.bbox("all"))
@@ -86,8 +107,18 @@ class MySQL_Backup_GUI:
         self.backup_dir_button.grid(row=3, column=0, columnspan=2, padx=5, pady=5)
 
         # Perform Backup button
-        self.backup_button = ttk.Button(self.frame, text="Perform Backup", command=self.perform_backup)
-        self.backup_button.grid(row=4, column=0, columnspan=2, padx=5, pady=10)
+        backup_buttons = ttk.Frame(self.frame)
+        backup_buttons.grid(row=4, column=0, columnspan=2, padx=5, pady=10)
+        self.backup_button = ttk.Button(backup_buttons, text="Perform Backup", command=self.perform_backup)
+        self.backup_button.grid(row=0, column=0, padx=5)
+
+        # Back up every server of an inventory file, several at a time
+        self.inventory_button = ttk.Button(backup_buttons, text="Back Up Inventory...", command=self.perform_inventory_backup)
+        self.inventory_button.grid(row=0, column=1, padx=5)
+
+        # Load the latest backup chain of the backup directory back into the server
+        self.restore_button = ttk.Button(backup_buttons, text="Restore Latest...", command=self.perform_restore)
+        self.restore_button.grid(row=0, column=2, padx=5)
 
         # Scheduled Task checkbox
         self.schedule_task_var = tk.BooleanVar()
@@ -109,22 +140,77 @@ class MySQL_Backup_GUI:
         self.time_entry = ttk.Entry(self.schedule_options)
         self.time_entry.grid(row=1, column=1, padx=5, pady=5)
 
+        # Retention: older backup folders are deleted after each successful scheduled backup
+        ttk.Label(self.schedule_options, text="Full Backups Kept:").grid(row=2, column=0, padx=5, pady=5)
+        self.keep_full = ttk.Spinbox(self.schedule_options, from_=1, to=365, width=5)
+        self.keep_full.set(DEFAULT_KEEP_FULL)
+        self.keep_full.grid(row=2, column=1, padx=5, pady=5, sticky="w")
+
+        self.save_schedule_button = ttk.Button(self.schedule_options, text="Save Schedule", command=self.save_schedule)
+        self.save_schedule_button.grid(row=3, column=0, columnspan=2, padx=5, pady=5)
+
+        # Compression of the dump, done on several threads while mysqldump is running
+        compression_options = ttk.Frame(self.frame)
+        compression_options.grid(row=7, column=0, columnspan=2, padx=5, pady=5)
+        ttk.Label(compression_options, text="Compression:").grid(row=0, column=0, padx=5, pady=5)
+        self.compression_option = ttk.Combobox(compression_options, values=list(COMPRESSION_EXTENSIONS), width=8, state="readonly")
+        self.compression_option.set(DEFAULT_COMPRESSION)
+        self.compression_option.grid(row=0, column=1, padx=5, pady=5)
+        ttk.Label(compression_options, text="Threads:").grid(row=0, column=2, padx=5, pady=5)
+        self.compression_threads = ttk.Spinbox(compression_options, from_=1, to=64, width=5)
+        self.compression_threads.set(os.cpu_count() or 1)
+        self.compression_threads.grid(row=0, column=3, padx=5, pady=5)
+
+        # Dump mode: one mysqldump of all databases, or tables dumped concurrently from one snapshot
+        ttk.Label(compression_options, text="Dump Mode:").grid(row=1, column=0, padx=5, pady=5)
+        self.dump_mode = ttk.Combobox(compression_options, values=["All databases", "Parallel per table", "Incremental (binlog)"], width=18, state="readonly")
+        self.dump_mode.set("All databases")
+        self.dump_mode.grid(row=1, column=1, padx=5, pady=5)
+        ttk.Label(compression_options, text="Dump Workers:").grid(row=1, column=2, padx=5, pady=5)
+        self.dump_workers = ttk.Spinbox(compression_options, from_=1, to=64, width=5)
+        self.dump_workers.set(4)
+        self.dump_workers.grid(row=1, column=3, padx=5, pady=5)
+
+        # Full dumps can be stored as chunks shared by the backups of the directory, written once
+        self.dedup_var = tk.BooleanVar()
+        ttk.Checkbutton(compression_options, text="Deduplicate full backups (chunk store)",
+                        variable=self.dedup_var).grid(row=2, column=0, columnspan=4, padx=5, pady=5)
+
+        # Progress of the running backup, estimated from the table sizes in information_schema
+        progress_frame = ttk.Frame(self.frame)
+        progress_frame.grid(row=8, column=0, columnspan=2, padx=5, pady=5)
+        self.progress = ttk.Progressbar(progress_frame, orient="horizontal", length=300, mode="determinate", maximum=100)
+        self.progress.grid(row=0, column=0, padx=5, pady=5)
+        self.progress_label = ttk.Label(progress_frame, text="0%", width=5)
+        self.progress_label.grid(row=0, column=1, padx=5, pady=5)
+        self.cancel_button = ttk.Button(progress_frame, text="Cancel", command=self.cancel_backup, state="disabled")
+        self.cancel_button.grid(row=0, column=2, padx=5, pady=5)
+
         # Console output for logging
         self.console_output = tk.Text(self.frame, height=10, wrap="word")
-        self.console_output.grid(row=7, column=0, columnspan=2, padx=5, pady=10)
+        self.console_output.grid(row=9, column=0, columnspan=2, padx=5, pady=10)
 
     def test_connection(self):
-        """Tests the MySQL connection with the provided credentials."""
+        """
+        Tests the MySQL connection with the provided credentials and shows how much data the server holds.
+        The connection is borrowed from the shared pool and the sizes come from the metadata cache, so
+        testing again does not reconnect nor query information_schema until the cache expires.
+        """
         mysql_user = self.mysql_user.get()
         mysql_pass = self.mysql_pass.get()
 
         try:
-            # Establish the MySQL connection
-            connection = mysql.connector.connect(user=mysql_user, password=mysql_pass)
-            connection.close()  # Close the connection if successful
-            self.console_output.insert(tk.END, "Connection successful!\n")
-        except mysql.connector.Error as err:
+            pool = get_pool(mysql_user, mysql_pass)
+            with pool.connection() as connection:
+                version = connection.get_server_info()  # The pool has checked the connection is alive
+            catalog = METADATA_CACHE.catalog(pool)
+        except BackupError as err:
             self.console_output.insert(tk.END, f"Connection failed: {err}\n")
+            return
+        data_mb = sum(table.data_bytes for table in catalog.tables) / (1024 * 1024)
+        index_mb = sum(table.index_bytes for table in catalog.tables) / (1024 * 1024)
+        self.console_output.insert(tk.END, f"Connection successful! MySQL {version}: {len(catalog.databases)} databases, "
+                                           f"{len(catalog.tables)} tables, about {data_mb:.1f} MB of data and {index_mb:.1f} MB of indexes\n")
 
     def toggle_schedule_options(self):
         """Show or hide the scheduling options based on the checkbox."""
@@ -143,6 +229,63 @@ class MySQL_Backup_GUI:
         elif selected_option == "Weekly":
             self.time_label.config(text="Day and Time (e.g., Mon 14:00):")
     
+    def save_schedule(self):
+        """
+        Saves the current settings as a scheduled job and starts the scheduler.
+        The job replaces an earlier one with the same backup directory, mode and frequency.
+        """
+        if not hasattr(self, 'backup_dir'):
+            messagebox.showwarning("Schedule Error", "Please select a backup directory.")
+            return
+        frequency = self.main_option.get()
+        mode = JOB_MODES[self.dump_mode.get()]
+        try:
+            # The job file only gets a reference to the password, which is kept in the system keyring
+            password_ref = None
+            if self.mysql_pass.get():
+                password_ref = store_keyring_password(self.mysql_user.get(), self.mysql_pass.get())
+            job = make_job(f"{os.path.basename(os.path.normpath(self.backup_dir))} {mode} {frequency.lower()}",
+                           self.mysql_user.get(), password_ref, self.backup_dir, frequency, self.time_entry.get(),
+                           mode, compression=self.compression_option.get(), threads=int(self.compression_threads.get()),
+                           workers=int(self.dump_workers.get()), keep_full=int(self.keep_full.get()),
+                           dedup=self.dedup_var.get() and mode == "full")
+        except ValueError as e:
+            messagebox.showwarning("Schedule Error", str(e))
+            return
+
+        store = JobStore()
+        store.add_job(job)
+        self.console_output.insert(tk.END, f"Saved job {job['name']}: {frequency} at {job['at']}, keeping {job['keep_full']} "
+                                           f"full backups. Jobs are stored in {store.path}\n")
+        self.start_scheduler()
+
+    def start_scheduler(self):
+        """Starts running the saved jobs in the background, unless a scheduler is already running them."""
+        if self.scheduler is not None:
+            return
+        scheduler = BackupScheduler(JobStore(), log=self.schedule_queue.put)
+        try:
+            scheduler.start()
+        except BackupError:
+            self.console_output.insert(tk.END, "A scheduler daemon is already running the saved jobs.\n")
+            return
+        self.scheduler = scheduler
+        self.root.after(QUEUE_POLL_MS, self.poll_schedule_queue)
+
+    def poll_schedule_queue(self):
+        """Writes the scheduler's log messages to the console. Runs on the Tk main loop while the scheduler runs."""
+        lines = []
+        while True:
+            try:
+                lines.append(self.schedule_queue.get_nowait())
+            except queue.Empty:
+                break
+        if lines:
+            self.console_output.insert(tk.END, "\n".join(lines) + "\n")
+            self.console_output.see(tk.END)
+        if self.scheduler is not None:
+            self.root.after(QUEUE_POLL_MS, self.poll_schedule_queue)
+
     def select_backup_directory(self):
         """Opens a dialog to select a directory for backup."""
         backup_dir = filedialog.askdirectory(title="Select Backup Directory", initialdir=self.default_dir)
@@ -153,28 +296,283 @@ class MySQL_Backup_GUI:
             self.console_output.insert(tk.END, "No directory selected.\n")
 
     def perform_backup(self):
-        """Performs MySQL database backup."""
-        mysql_user = self.mysql_user.get()
-        mysql_pass = self.mysql_pass.get()
+        """
+        Starts a MySQL database backup on a background thread.
+        The mysqldump output is compressed on several threads as it is produced, so no uncompressed file is
+        ever written. The settings are read here on the Tk thread, the backup thread only reports back through
+        self.progress_queue, which poll_progress_queue drains to update the console and the progress bar.
+        """
+        if self.backup_thread is not None and self.backup_thread.is_alive():
+            messagebox.showwarning("Backup Error", "A backup is already running.")
+            return
 
         if not hasattr(self, 'backup_dir'):
             messagebox.showwarning("Backup Error", "Please select a backup directory.")
             return
-        
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_folder = os.path.join(self.backup_dir, f"backup_{timestamp}")
-        os.makedirs(backup_folder, exist_ok=True)
-        
-        self.console_output.insert(tk.END, f"Creating backup folder: {backup_folder}\n")
-        
-        # MySQL Dump command
-        dump_command = f'mysqldump -u{mysql_user} -p{mysql_pass} --all-databases > {backup_folder}/backup.sql'
-        
+
+        try:
+            threads = max(1, int(self.compression_threads.get()))
+            workers = max(1, int(self.dump_workers.get()))
+        except ValueError:
+            messagebox.showwarning("Backup Error", "The numbers of threads and workers must be whole numbers.")
+            return
+
+        settings = {"user": self.mysql_user.get(), "password": self.mysql_pass.get(), "backup_dir": self.backup_dir,
+                    "mode": self.dump_mode.get(), "compression": self.compression_option.get(),
+                    "threads": threads, "workers": workers, "dedup": self.dedup_var.get()}
+        self.console_output.insert(tk.END, f"Backing up into {self.backup_dir} ({settings['mode']}, {settings['compression']}, {threads} threads)\n")
+
+        self.cancel_event.clear()
+        self.progress["value"] = 0
+        self.progress_label.config(text="0%")
+        self.start_backup_thread(self.run_backup, settings)
+
+    def perform_inventory_backup(self):
+        """
+        Backs up all the servers of an inventory file on a background thread, see mysql_backup_orchestrator.py.
+        The servers, their credential references and the batch limits all come from the file.
+        """
+        if self.backup_thread is not None and self.backup_thread.is_alive():
+            messagebox.showwarning("Backup Error", "A backup is already running.")
+            return
+        inventory_path = filedialog.askopenfilename(title="Select Server Inventory", initialdir=self.default_dir,
+                                                    filetypes=[("Inventory", "*.json"), ("All files", "*.*")])
+        if not inventory_path:
+            return
+        try:
+            inventory = load_inventory(inventory_path)
+        except (OSError, ValueError) as e:
+            messagebox.showwarning("Backup Error", f"Invalid inventory: {e}")
+            return
+        self.console_output.insert(tk.END, f"Backing up {len(inventory['servers'])} servers of {inventory_path}, "
+                                           f"{inventory['max_concurrent']} at a time\n")
+        self.start_backup_thread(self.run_inventory_backup, inventory)
+
+    def perform_restore(self):
+        """
+        Restores the latest backup chain of the backup directory into the server on a background thread.
+        The full backup is loaded table by table over as many sessions as "Dump workers", then the binary
+        logs of the following incremental backups are replayed.
+        """
+        if self.backup_thread is not None and self.backup_thread.is_alive():
+            messagebox.showwarning("Restore Error", "A backup is already running.")
+            return
+        if not hasattr(self, 'backup_dir'):
+            messagebox.showwarning("Restore Error", "Please select a backup directory.")
+            return
+        try:
+            workers = max(1, int(self.dump_workers.get()))
+        except ValueError:
+            messagebox.showwarning("Restore Error", "The number of workers must be a whole number.")
+            return
+        if not messagebox.askyesno("Restore", f"Restore the latest backup of {self.backup_dir}?\n"
+                                              "The restored databases are overwritten."):
+            return
+
+        settings = {"user": self.mysql_user.get(), "password": self.mysql_pass.get(), "backup_dir": self.backup_dir,
+                    "workers": workers}
+        self.console_output.insert(tk.END, f"Restoring the latest backup of {self.backup_dir} with {workers} sessions\n")
+        self.start_backup_thread(self.run_restore, settings)
+
+    def run_restore(self, settings):
+        """
+        Runs the restore selected in perform_restore.
+        Runs on the backup thread and only reports to the UI through self.progress_queue.
+
+        Args:
+            settings (dict): The restore settings read from the widgets.
+        """
+        post_log = lambda message: self.progress_queue.put(("log", message))
+
+        def post_progress(rows, bytes_loaded, bytes_total, seconds):
+            if bytes_total:
+                self.progress_queue.put(("progress", min(1.0, bytes_loaded / bytes_total)))
+            post_log(format_restore_progress(rows, bytes_loaded, bytes_total, seconds))
+
         try:
-            subprocess.run(dump_command, shell=True, check=True)
-            self.console_output.insert(tk.END, "Backup completed successfully.\n")
-        except subprocess.CalledProcessError as e:
-            self.console_output.insert(tk.END, f"Backup failed: {e}\n")
+            full_folder, incrementals = restore_point_in_time(settings["user"], settings["password"], settings["backup_dir"],
+                                                              log=post_log, cancel_event=self.cancel_event,
+                                                              workers=settings["workers"], progress=post_progress)
+            self.progress_queue.put(("done", f"Restore completed successfully: {os.path.basename(full_folder)} "
+                                             f"and {len(incrementals)} incremental backups"))
+        except BackupCancelled:
+            self.progress_queue.put(("error", "Restore cancelled, the restored databases are incomplete."))
+        except BackupError as e:
+            self.progress_queue.put(("error", f"Restore failed: {e}"))
+        except Exception as e:
+            self.progress_queue.put(("error", f"Restore failed: {e!r}"))
+
+    def start_backup_thread(self, target, settings):
+        """
+        Runs a backup on the backup thread and starts draining its events.
+
+        Args:
+            target (callable): The method running the backup, called with settings.
+            settings (dict): The backup settings read on the Tk thread.
+        """
+        self.cancel_event.clear()
+        self.progress["value"] = 0
+        self.progress_label.config(text="0%")
+        self.backup_button.config(state="disabled")
+        self.inventory_button.config(state="disabled")
+        self.restore_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        self.backup_thread = threading.Thread(target=target, args=(settings,), daemon=True)
+        self.backup_thread.start()
+        self.root.after(QUEUE_POLL_MS, self.poll_progress_queue)  # Start draining events
+
+    def run_inventory_backup(self, inventory):
+        """
+        Runs the batch selected in perform_inventory_backup and writes its report into the backup root.
+        Runs on the backup thread and only reports to the UI through self.progress_queue.
+
+        Args:
+            inventory (dict): The inventory, see load_inventory.
+        """
+        finished = []
+
+        def post_status(status):
+            if status["status"] not in ("pending", "running"):
+                finished.append(status["name"])
+                self.progress_queue.put(("progress", len(finished) / len(inventory["servers"])))
+
+        try:
+            orchestrator = BatchOrchestrator(inventory["servers"], inventory["max_concurrent"],
+                                             TransferLimits(inventory["max_read_mb_per_s"], inventory["max_write_mb_per_s"]),
+                                             log=lambda message: self.progress_queue.put(("log", message)),
+                                             on_status=post_status, cancel_event=self.cancel_event)
+            summary = orchestrator.run()
+            report_path = write_report(summary, inventory["backup_root"])
+        except Exception as e:
+            self.progress_queue.put(("error", f"Batch failed: {e!r}"))
+            return
+        self.progress_queue.put(("log", format_report(summary)))
+        totals = summary["totals"]
+        self.progress_queue.put(("done" if totals["ok"] == len(inventory["servers"]) else "error",
+                                 f"Batch finished: {totals['ok']} of {len(inventory['servers'])} servers backed up. "
+                                 f"Report written to {report_path}"))
+
+    def run_backup(self, settings):
+        """
+        Runs the backup selected in perform_backup.
+        Runs on the backup thread and only reports to the UI through self.progress_queue.
+
+        Args:
+            settings (dict): The backup settings read from the widgets.
+        """
+        post_log = lambda message: self.progress_queue.put(("log", message))
+
+        def post_bytes(bytes_in, bytes_out, seconds):
+            post_log(format_progress(bytes_in, bytes_out, seconds))
+
+        def post_table(done, total, table, fraction):
+            self.progress_queue.put(("progress", fraction))
+            post_log(f"[{done}/{total}] {table.database}.{table.table} done (~{table.rows} rows), about {fraction:.0%} of the data")
+
+        backup_lock = FileLock(os.path.join(settings["backup_dir"], BACKUP_LOCK_NAME))
+        try:
+            locked = backup_lock.acquire(blocking=False)
+        except OSError as e:
+            self.progress_queue.put(("error", f"Backup failed: {e}"))
+            return
+        if not locked:
+            self.progress_queue.put(("error", "A scheduled backup is writing to this directory, try again when it is done."))
+            return
+        try:
+            if settings["mode"] == "Parallel per table":
+                dump_info = backup_tables_parallel(settings["user"], settings["password"], settings["backup_dir"],
+                                                   workers=settings["workers"], compression=settings["compression"],
+                                                   threads=settings["threads"], log=post_log, cancel_event=self.cancel_event,
+                                                   table_progress=post_table)
+                message = (f"Backup completed successfully: {len(dump_info['tables'])} tables in "
+                           f"{dump_info['folder']} in {dump_info['seconds']:.1f}s")
+            elif settings["mode"] == "Incremental (binlog)":
+                dump_info = backup_incremental(settings["user"], settings["password"], settings["backup_dir"],
+                                               compression=settings["compression"], threads=settings["threads"],
+                                               log=post_log, cancel_event=self.cancel_event)
+                message = (f"Incremental backup completed successfully: {len(dump_info['files'])} binary logs "
+                           f"up to {dump_info['binlog_end']['file']}:{dump_info['binlog_end']['position']}")
+            else:
+                stats = backup_all_databases(settings["user"], settings["password"], settings["backup_dir"],
+                                             compression=settings["compression"], threads=settings["threads"],
+                                             progress=post_bytes, cancel_event=self.cancel_event,
+                                             table_progress=post_table, log=post_log, dedup=settings["dedup"])
+                message = f"Backup completed successfully: {stats.path} in {stats.seconds:.1f}s"
+                if settings["dedup"]:
+                    message += f", {stats.bytes_out / (1024 * 1024):.1f} MB of new chunks"
+            self.progress_queue.put(("done", message))
+        except BackupCancelled:
+            self.progress_queue.put(("error", "Backup cancelled, the incomplete backup was deleted."))
+        except BackupError as e:
+            self.progress_queue.put(("error", f"Backup failed: {e}"))
+        except Exception as e:
+            self.progress_queue.put(("error", f"Backup failed: {e!r}"))
+        finally:
+            backup_lock.release()
+
+    def poll_progress_queue(self):
+        """
+        Drains the events posted by the backup thread.
+        Log lines are written to the console in one insert and only the latest progress updates the progress bar.
+        Runs on the Tk main loop and reschedules itself until the backup has finished.
+        """
+        log_lines = []
+        fraction = None
+        finished = None
+        while True:
+            try:
+                event = self.progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == "log":
+                log_lines.append(event[1])
+            elif event[0] == "progress":
+                fraction = event[1]
+            else:
+                finished = event  # ("done", message) or ("error", message)
+
+        if finished and finished[0] == "done":
+            fraction = 1.0
+        if fraction is not None:
+            self.progress["value"] = fraction * 100
+            self.progress_label.config(text=f"{int(fraction * 100)}%")
+        if finished:
+            log_lines.append(finished[1])
+        if log_lines:
+            self.console_output.insert(tk.END, "\n".join(log_lines) + "\n")
+            self.console_output.see(tk.END)
+
+        if finished:
+            self.backup_button.config(state="normal")
+            self.inventory_button.config(state="normal")
+            self.restore_button.config(state="normal")
+            self.cancel_button.config(state="disabled")
+            return
+        self.root.after(QUEUE_POLL_MS, self.poll_progress_queue)
+
+    def cancel_backup(self):
+        """Asks the running backup to stop, it deletes its incomplete files and reports back."""
+        if self.backup_thread is not None and self.backup_thread.is_alive():
+            self.cancel_event.set()
+            self.cancel_button.config(state="disabled")
+            self.console_output.insert(tk.END, "Cancelling the backup...\n")
+
+    def on_close(self):
+        """
+        Cancels the running backups, manual or scheduled, before closing the window, so no mysqldump process or
+        partial file is left behind.
+        """
+        backup_running = self.backup_thread is not None and self.backup_thread.is_alive()
+        if backup_running or (self.scheduler is not None and self.scheduler.running):
+            if not messagebox.askyesno("Backup Running", "A backup is running. Cancel it and quit?"):
+                return
+        if backup_running:
+            self.cancel_event.set()
+            self.backup_thread.join(timeout=10)
+        if self.scheduler is not None:
+            self.scheduler.stop(cancel_running=True, timeout=10)
+            self.scheduler = None
+        self.root.destroy()
 
 # Main execution
 if __name__ == "__main__":
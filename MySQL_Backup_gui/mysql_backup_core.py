@@ -0,0 +1,2899 @@
+# [START OF SCRIPT mysql_backup_core.py]
+# SCRIPT DETAILS: GUI-free backup engine of the MySQL Backup GUI.
+# It is imported by MySql_Backup_gui.py and can be run on its own as a command line tool, e.g.:
+#   python mysql_backup_core.py backup --user root --backup-dir /var/backups/mysql --compression zstd --threads 8
+#   python mysql_backup_core.py backup --user root --backup-dir /var/backups/mysql --parallel 8 --databases shop crm
+#   python mysql_backup_core.py backup --user root --backup-dir /var/backups/mysql --incremental
+#   python mysql_backup_core.py restore --user root --backup-dir /var/backups/mysql --until "2024-07-01 14:30:00" --workers 8
+#   python mysql_backup_core.py verify --backup-dir /var/backups/mysql --sandbox --host 127.0.0.1 --port 3310
+
+import os
+import re
+import sys
+import gzip
+import json
+import zlib
+import hashlib
+import time
+import queue
+import shutil
+import operator
+import getpass
+import argparse
+import datetime
+import tempfile
+import threading
+import subprocess
+import urllib.parse
+from functools import partial
+from itertools import accumulate, chain, compress, count, repeat
+from contextlib import contextmanager
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+#pip install -v mysql-connector-python
+import mysql.connector
+import mysql.connector.pooling
+from mysql.connector.constants import FieldType
+
+try:
+    import zstandard  # Optional, pip install zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl  # File locks on Unix
+except ImportError:
+    fcntl = None
+    import msvcrt  # File locks on Windows
+
+# Compression methods of the dump files and the extension each one adds to backup.sql
+COMPRESSION_EXTENSIONS = {"zstd": ".zst", "gzip": ".gz", "none": ""}
+DEFAULT_COMPRESSION = "zstd" if zstandard else "gzip"
+
+COMPRESS_BLOCK_SIZE = 4 * 1024 * 1024  # Bytes compressed at a time by one gzip thread
+PIPE_READ_SIZE = 1024 * 1024  # Bytes read at a time from the mysqldump output
+PROGRESS_INTERVAL = 1.0  # Seconds between two progress reports
+CANCEL_CHECK_INTERVAL = 0.2  # Seconds between two checks of the cancel event while mysqldump runs
+DUMP_INFO_NAME = "dump_info.json"  # Description of a backup written into its backup folder
+BACKUP_LOCK_NAME = ".backup.lock"  # Lock file keeping two processes from backing up into the same directory
+DUMP_HEADER_SIZE = 64 * 1024  # Leading bytes of a mysqldump output searched for the binary log position
+
+# Binary log coordinates written by mysqldump --source-data=2 / --master-data=2 as a comment in the dump header
+BINLOG_POSITION_PATTERN = re.compile(rb"(?:MASTER|SOURCE)_LOG_FILE='([^']+)',\s*(?:MASTER|SOURCE)_LOG_POS=(\d+)")
+# Comment lines written by mysqldump when it moves on to another database or table
+DUMP_MARKER_PATTERN = re.compile(rb"\n-- (Current Database:|Table structure for table) `((?:[^`\n]|``)+)`(?=\n)")
+MARKER_TAIL_SIZE = 1024  # Bytes of an unfinished line kept to find a marker split between two reads
+# Extra field of SHOW COLUMNS for the columns computed by the server
+GENERATED_COLUMN_PATTERN = re.compile(r"\b(?:VIRTUAL|STORED|PERSISTENT) GENERATED\b", re.IGNORECASE)
+
+CHUNK_STORE_NAME = "chunks"  # Deduplicated chunk store shared by the backups of a backup directory
+# Lock file next to a chunk store: shared by the backups writing chunks, exclusive to delete or rename chunks
+CHUNK_STORE_LOCK_EXTENSION = ".lock"
+MANIFEST_EXTENSION = ".manifest"  # Added to backup.sql when the dump is written into the chunk store
+CHUNK_MIN_SIZE = 16 * 1024  # Bytes of a chunk before a content-defined boundary is looked for
+CHUNK_AVERAGE_SIZE = 64 * 1024  # Expected bytes between the minimum size and the content-defined boundary
+CHUNK_MAX_SIZE = 1024 * 1024  # Bytes after which a chunk is cut without a boundary
+CHUNK_ROW_SEPARATOR = b"),("  # Between two rows of an extended INSERT, a candidate chunk boundary like a line end
+
+RESTORE_SPOOL_LIMIT = 8 * 1024 * 1024 * 1024  # Bytes of spooled sections after which the dump is read no further
+RESTORE_HEAD_SIZE = 1024 * 1024  # Leading bytes of a table section searched for its CREATE TABLE statement
+# Comment lines starting the sections of a mysqldump output a parallel restore splits it into
+RESTORE_MARKER_PATTERN = re.compile(rb"\n-- (Current Database: `|Table structure for table `|Temporary (?:view|table) structure "
+                                    rb"for view `|Final view structure for view `|Dumping (?:routines|events) for database ')"
+                                    rb"((?:[^`'\n]|``)+)[`'](?=\n)")
+# A CREATE TABLE statement as written by SHOW CREATE TABLE, the closing line ends with the table options
+CREATE_TABLE_PATTERN = re.compile(rb"CREATE TABLE [^\n]*\(\n(?:[^\n]*\n)*?\)[^\n]*;\n")
+# A non-unique secondary index line of a CREATE TABLE statement, with its definition and first column
+SECONDARY_KEY_PATTERN = re.compile(rb"  (KEY `(?:[^`]|``)+` \(`((?:[^`]|``)+)`[^\n]*?),?")
+AUTO_INCREMENT_PATTERN = re.compile(rb"\n  `((?:[^`]|``)+)` [^\n]*\bAUTO_INCREMENT\b")
+
+# Errors raised while reading a damaged or truncated compressed file
+DECOMPRESSION_ERRORS = (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard else ())
+
+# Result of a dump: the file written, bytes read from mysqldump, bytes written to disk and duration
+DumpStats = namedtuple("DumpStats", ["path", "bytes_in", "bytes_out", "seconds"])
+
+
+class BackupError(Exception):
+    """Raised when a backup cannot be completed."""
+
+
+class BackupCancelled(BackupError):
+    """Raised when a running backup is cancelled."""
+
+
+class RateLimiter:
+    """
+    A byte rate shared by several threads. Each caller takes the bytes it is about to transfer and sleeps
+    until the rate allows them, so concurrent transfers split the rate between them.
+    """
+
+    def __init__(self, bytes_per_second, burst=None):
+        """
+        Args:
+            bytes_per_second (float): The rate.
+            burst (float): Bytes that can go through at once after an idle period, defaults to one second's worth.
+        """
+        self.rate = float(bytes_per_second)
+        self.capacity = float(burst if burst is not None else bytes_per_second)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, amount):
+        """Blocks until amount more bytes fit in the rate."""
+        if amount <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount  # Goes negative while callers wait for their share
+            wait = -self.tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+class TransferLimits:
+    """
+    Caps shared by all the backups running in the process: the uncompressed bytes read from the servers and
+    the compressed bytes written to disk per second. They are applied by every CompressedWriter given them.
+    """
+
+    def __init__(self, read_mb_per_s=None, write_mb_per_s=None):
+        """
+        Args:
+            read_mb_per_s (float): MB per second read from the servers, unlimited when None.
+            write_mb_per_s (float): MB per second written to disk, unlimited when None.
+        """
+        self.read = RateLimiter(read_mb_per_s * 1024 * 1024) if read_mb_per_s else None
+        self.write = RateLimiter(write_mb_per_s * 1024 * 1024) if write_mb_per_s else None
+
+
+class FileLock:
+    """
+    An advisory lock on a file, exclusive or shared. The system releases it when the process ends, so a
+    crashed process never leaves a stale lock behind. Windows has no shared locks, a shared lock is
+    exclusive there.
+    """
+
+    def __init__(self, path, shared=False):
+        """
+        Args:
+            path (str): The lock file, created when missing.
+            shared (bool): Let other shared holders take the lock at the same time.
+        """
+        self.path = path
+        self.shared = shared
+        self.file = None
+
+    def acquire(self, blocking=True):
+        """
+        Takes the lock.
+
+        Args:
+            blocking (bool): Wait for the lock instead of giving up when another holder has it.
+
+        Returns:
+            bool: True if the lock was taken.
+        """
+        lock_file = open(self.path, "a+")
+        try:
+            if fcntl:
+                mode = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+                fcntl.flock(lock_file.fileno(), mode | (0 if blocking else fcntl.LOCK_NB))
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        self.file = lock_file
+        return True
+
+    def release(self):
+        """Releases the lock if it is held."""
+        if self.file is None:
+            return
+        if fcntl:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        else:
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        if not self.acquire():
+            raise OSError(f"Could not lock {self.path}")
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def _gzip_block(block, level):
+    """Compresses one block into a complete gzip member. zlib releases the GIL, so blocks compress in parallel."""
+    return gzip.compress(block, compresslevel=level, mtime=0)
+
+
+class CompressedWriter:
+    """
+    A binary file writer that compresses everything written to it on several threads.
+
+    gzip input is cut into fixed-size blocks compressed concurrently, each into a complete gzip member,
+    and written in their original order. Concatenated members form a valid gzip file that gunzip, zcat and
+    Python's gzip module read as a single stream. zstd uses the multi-threaded compressor of the zstandard
+    package. At most twice as many blocks as threads are held in memory. With TransferLimits, write() waits
+    for the read and disk write rates to allow the data, which slows the dump feeding it.
+    """
+
+    def __init__(self, path, compression=DEFAULT_COMPRESSION, threads=None, level=None, block_size=COMPRESS_BLOCK_SIZE,
+                 limits=None):
+        """
+        Opens the output file.
+
+        Args:
+            path (str): The file to write.
+            compression (str): "zstd", "gzip" or "none".
+            threads (int): Number of compression threads, defaults to the number of CPUs.
+            level (int): Compression level, defaults to 3 for zstd and 6 for gzip.
+            block_size (int): Bytes per gzip block.
+            limits (TransferLimits): Rates shared with the other backups of the process.
+
+        Raises:
+            BackupError: If the compression method is unknown or zstd is selected without the zstandard package.
+        """
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise BackupError(f"Unknown compression method: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise BackupError("zstd compression needs the zstandard package: pip install zstandard")
+
+        self.path = path
+        self.compression = compression
+        self.threads = threads or os.cpu_count() or 1
+        self.block_size = block_size
+        self.limits = limits
+        self.bytes_in = 0  # Uncompressed bytes written so far
+        self._limited_out = 0  # Compressed bytes already counted against the disk write rate
+        self._final_size = 0  # Size of the file once closed
+        self.file = open(path, "wb")
+        self.buffer = bytearray()  # Input not yet handed to a gzip thread
+        self.pending = deque()  # Futures of the compressed gzip blocks, in file order
+        self.executor = None
+        self.zstd_writer = None
+
+        if compression == "gzip":
+            self.level = level if level is not None else 6
+            self.executor = ThreadPoolExecutor(max_workers=self.threads)
+        elif compression == "zstd":
+            compressor = zstandard.ZstdCompressor(level=level if level is not None else 3, threads=self.threads,
+                                                write_checksum=True)  # Lets verify_backups detect damaged files
+            self.zstd_writer = compressor.stream_writer(self.file, closefd=False)
+
+    @property
+    def bytes_out(self):
+        """Compressed bytes written to the file so far."""
+        return self.file.tell() if not self.file.closed else self._final_size
+
+    def write(self, data):
+        """
+        Compresses and writes data. Blocks while too many gzip blocks are waiting to be written.
+
+        Args:
+            data (bytes): The uncompressed data.
+        """
+        if self.limits is not None and self.limits.read is not None:
+            self.limits.read.consume(len(data))
+        self.bytes_in += len(data)
+        if self.zstd_writer is not None:
+            self.zstd_writer.write(data)
+        elif self.executor is None:
+            self.file.write(data)
+        else:
+            self.buffer += data
+            while len(self.buffer) >= self.block_size:
+                self._submit(bytes(self.buffer[:self.block_size]))
+                del self.buffer[:self.block_size]
+        if self.limits is not None and self.limits.write is not None:
+            written = self.file.tell()
+            self.limits.write.consume(written - self._limited_out)
+            self._limited_out = written
+
+    def _submit(self, block):
+        """Queues a block for compression, writing the oldest finished blocks to keep memory bounded."""
+        self.pending.append(self.executor.submit(_gzip_block, block, self.level))
+        while len(self.pending) > 2 * self.threads:
+            self.file.write(self.pending.popleft().result())
+
+    def close(self):
+        """Compresses the remaining input, writes it and closes the file after syncing it to disk."""
+        if self.file.closed:
+            return
+        try:
+            if self.zstd_writer is not None:
+                self.zstd_writer.close()  # Ends the zstd frame, the file stays open
+            elif self.executor is not None:
+                if self.buffer:
+                    self._submit(bytes(self.buffer))
+                    self.buffer.clear()
+                while self.pending:
+                    self.file.write(self.pending.popleft().result())
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        finally:
+            self._close_file()
+
+    def abort(self):
+        """Stops writing and deletes the incomplete file."""
+        for future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        self._close_file()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _close_file(self):
+        """Closes the file and shuts down the gzip threads."""
+        if not self.file.closed:
+            self._final_size = self.file.tell()
+            self.file.close()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+
+
+class ContentChunker:
+    """
+    Cuts a stream into chunks at boundaries chosen from the content, so the same data gives the same chunks
+    wherever it sits in the stream. Rows inserted or deleted between two dumps only change the chunks around
+    them, the chunks of unchanged rows are identical and stored once.
+
+    Candidate boundaries follow the ends of lines and the "),(" between two rows of an extended INSERT. The
+    CRC-32 of the segment since the previous candidate decides whether a chunk may end there, with a
+    probability proportional to the segment length, so the chunk size does not depend on the row size.
+    Candidates in the first min_size bytes of a chunk are ignored and a chunk without any is cut at max_size.
+    Segments are split and hashed by bytes.split, zlib and itertools, so Python only loops over the lines and
+    the few candidates that may end a chunk.
+    """
+
+    def __init__(self, min_size=CHUNK_MIN_SIZE, average_size=CHUNK_AVERAGE_SIZE, max_size=CHUNK_MAX_SIZE):
+        """
+        Args:
+            min_size (int): Bytes of a chunk before a boundary is looked for.
+            average_size (int): Expected bytes between the minimum size and the boundary.
+            max_size (int): Bytes after which a chunk is cut without a boundary.
+        """
+        self.min_size = min_size
+        self.max_size = max_size
+        self.threshold = (1 << 32) / average_size  # CRC-32 values per byte of segment that may end a chunk
+        self.buffer = bytearray()  # Starts at the current chunk or segment, whichever comes first
+        self.chunk_start = 0
+        self.segment_start = 0
+
+    def feed(self, data):
+        """
+        Adds data to the stream.
+
+        Args:
+            data (bytes): The next bytes of the stream.
+
+        Returns:
+            list: The chunks completed by the data, as bytes.
+        """
+        previous_size = len(self.buffer)
+        first = self.chunk_start
+        self.buffer += data
+        cuts = []
+        # Only split again when the data completes a line or a row separator, which can start in earlier data
+        if (self.buffer.find(b"\n", max(self.segment_start, previous_size)) >= 0
+                or self.buffer.find(CHUNK_ROW_SEPARATOR, max(self.segment_start, previous_size - 2)) >= 0):
+            line_rows = list(map(bytes.split, bytes(self.buffer[self.segment_start:]).split(b"\n"),
+                                 repeat(CHUNK_ROW_SEPARATOR)))
+            segments = list(chain.from_iterable(line_rows))
+            sizes = list(map(operator.add, map(len, segments), repeat(len(CHUNK_ROW_SEPARATOR))))
+            for line_end in accumulate(map(len, line_rows)):
+                sizes[line_end - 1] -= len(CHUNK_ROW_SEPARATOR) - 1  # The last row of a line ends with the newline
+            segments.pop()  # Not ended by a candidate yet
+            sizes.pop()
+            ends = list(accumulate(sizes, initial=self.segment_start))[1:]
+            may_end = map(operator.lt, map(zlib.crc32, segments), map(operator.mul, sizes, repeat(self.threshold)))
+            for index in compress(range(len(segments)), may_end):
+                end = ends[index]
+                self._cut_oversized(cuts, end)
+                if end - self.chunk_start >= self.min_size:
+                    self.chunk_start = end
+                    cuts.append(end)
+            if ends:
+                self.segment_start = ends[-1]
+        self._cut_oversized(cuts, len(self.buffer))
+
+        chunks = []
+        for cut in cuts:
+            chunks.append(bytes(self.buffer[first:cut]))
+            first = cut
+        # The bytes of emitted chunks are kept while they belong to the unfinished segment
+        drop = min(self.chunk_start, self.segment_start)
+        del self.buffer[:drop]
+        self.chunk_start -= drop
+        self.segment_start -= drop
+        return chunks
+
+    def _cut_oversized(self, cuts, end):
+        """Cuts the current chunk every max_size bytes while it would reach past end without a boundary."""
+        while end - self.chunk_start > self.max_size:
+            self.chunk_start += self.max_size
+            cuts.append(self.chunk_start)
+
+    def finish(self):
+        """Returns the last chunk of the stream as a list of at most one bytes object."""
+        chunks = [bytes(self.buffer[self.chunk_start:])] if len(self.buffer) > self.chunk_start else []
+        self.buffer.clear()
+        self.chunk_start = self.segment_start = 0
+        return chunks
+
+
+class ChunkStore:
+    """
+    A directory of compressed chunks, each named after the SHA-256 of its uncompressed content, e.g.
+    chunks/3f/3fa2...9c.zst. A chunk is written once however many backups contain it. Chunks are written to a
+    temporary file and renamed, so a chunk file is always complete and several writers can share the store.
+    """
+
+    def __init__(self, path, compression=DEFAULT_COMPRESSION):
+        """
+        Args:
+            path (str): The store directory, created when missing.
+            compression (str): "zstd", "gzip" or "none", for the chunks written.
+
+        Raises:
+            BackupError: If the compression method is unknown or zstd is selected without the zstandard package.
+        """
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise BackupError(f"Unknown compression method: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise BackupError("zstd compression needs the zstandard package: pip install zstandard")
+        self.path = path
+        self.compression = compression
+        self.local = threading.local()  # zstd contexts are not thread-safe, each thread keeps its own
+        os.makedirs(path, exist_ok=True)
+
+    def lock(self, shared=False):
+        """
+        Returns the lock of the store: DedupWriter holds it shared while it writes chunks no manifest lists
+        yet, collect_chunk_garbage and verify_backups hold it exclusive to delete or rename chunks.
+        """
+        return FileLock(self.path + CHUNK_STORE_LOCK_EXTENSION, shared)
+
+    def chunk_path(self, digest):
+        """Returns the file of a chunk."""
+        return os.path.join(self.path, digest[:2], digest + COMPRESSION_EXTENSIONS[self.compression])
+
+    def put(self, data):
+        """
+        Stores a chunk unless the store already holds it.
+
+        Args:
+            data (bytes): The uncompressed chunk.
+
+        Returns:
+            tuple: (SHA-256 hex digest, compressed bytes written, 0 if the chunk was already stored).
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.chunk_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+        if self.compression == "zstd":
+            if not hasattr(self.local, "compressor"):
+                self.local.compressor = zstandard.ZstdCompressor(level=3, write_checksum=True)
+            data = self.local.compressor.compress(data)
+        elif self.compression == "gzip":
+            data = gzip.compress(data, compresslevel=6, mtime=0)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+        return digest, len(data)
+
+    def get(self, digest, size=None):
+        """
+        Reads a chunk and checks it against its digest.
+
+        Args:
+            digest (str): The SHA-256 hex digest of the chunk.
+            size (int): The expected uncompressed size.
+
+        Returns:
+            bytes: The uncompressed chunk.
+
+        Raises:
+            BackupError: If the chunk is missing, cannot be decompressed or does not match its digest.
+        """
+        path = self.chunk_path(digest)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            if self.compression == "zstd":
+                if not hasattr(self.local, "decompressor"):
+                    self.local.decompressor = zstandard.ZstdDecompressor()
+                data = self.local.decompressor.decompress(data)
+            elif self.compression == "gzip":
+                data = gzip.decompress(data)
+        except DECOMPRESSION_ERRORS as e:
+            raise BackupError(f"Chunk {digest} cannot be read: {e}") from e
+        if (size is not None and len(data) != size) or hashlib.sha256(data).hexdigest() != digest:
+            raise BackupError(f"Chunk {digest} does not match its digest, the file {path} is damaged.")
+        return data
+
+
+class DedupWriter:
+    """
+    A writer with the interface of CompressedWriter that cuts what is written into content-defined chunks,
+    stores the chunks missing from a ChunkStore on several threads and writes a manifest listing the chunks
+    in order. bytes_out counts the compressed bytes of the new chunks only, what the backup adds to the disk.
+    The store is locked shared from the first chunk to the manifest, so the chunks it writes or finds already
+    stored are not deleted before the manifest lists them.
+    """
+
+    def __init__(self, path, store, threads=None, limits=None):
+        """
+        Args:
+            path (str): The manifest file to write.
+            store (ChunkStore): The store receiving the chunks.
+            threads (int): Number of threads hashing, compressing and writing chunks, defaults to the number of CPUs.
+            limits (TransferLimits): Rates shared with the other backups of the process.
+        """
+        self.path = path
+        self.store = store
+        self.threads = threads or os.cpu_count() or 1
+        self.limits = limits
+        self.bytes_in = 0  # Uncompressed bytes written so far
+        self.bytes_out = 0  # Compressed bytes of the chunks added to the store
+        self.new_chunks = 0
+        self.chunks = []  # [digest, size] of every chunk, in stream order
+        self.chunker = ContentChunker()
+        self.pending = deque()  # (size, future of ChunkStore.put) of the chunks being stored, in stream order
+        self.store_lock = store.lock(shared=True)
+        if not self.store_lock.acquire():
+            raise BackupError(f"Could not lock the chunk store {store.path}")
+        self.executor = ThreadPoolExecutor(max_workers=self.threads)
+        self.closed = False
+
+    def write(self, data):
+        """
+        Adds data to the backup. Blocks while too many chunks are waiting to be stored.
+
+        Args:
+            data (bytes): The uncompressed data.
+        """
+        if self.limits is not None and self.limits.read is not None:
+            self.limits.read.consume(len(data))
+        self.bytes_in += len(data)
+        for chunk in self.chunker.feed(data):
+            self._submit(chunk)
+
+    def _submit(self, chunk):
+        """Queues a chunk to be stored, collecting the oldest stored chunks to keep memory bounded."""
+        self.pending.append((len(chunk), self.executor.submit(self.store.put, chunk)))
+        while len(self.pending) > 8 * self.threads:
+            self._collect()
+
+    def _collect(self):
+        """Waits for the oldest queued chunk and adds it to the manifest."""
+        size, future = self.pending.popleft()
+        digest, written = future.result()
+        self.chunks.append([digest, size])
+        if written:
+            self.new_chunks += 1
+            self.bytes_out += written
+            if self.limits is not None and self.limits.write is not None:
+                self.limits.write.consume(written)
+
+    def close(self):
+        """Stores the remaining chunks and writes the manifest, which only exists once every chunk is stored."""
+        if self.closed:
+            return
+        try:
+            for chunk in self.chunker.finish():
+                self._submit(chunk)
+            while self.pending:
+                self._collect()
+            manifest = {"store": os.path.relpath(self.store.path, os.path.dirname(os.path.abspath(self.path))),
+                        "compression": self.store.compression, "bytes": self.bytes_in, "chunks": self.chunks}
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(manifest, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(self.path + ".tmp", self.path)
+        finally:
+            self.closed = True
+            self.executor.shutdown(wait=True)
+            self.store_lock.release()
+
+    def abort(self):
+        """Stops writing. The chunks already stored are left to collect_chunk_garbage."""
+        for _, future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        self.closed = True
+        self.executor.shutdown(wait=True)
+        self.store_lock.release()
+        for path in (self.path, self.path + ".tmp"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def read_manifest(path):
+    """
+    Reads the manifest of a deduplicated dump.
+
+    Args:
+        path (str): The manifest file.
+
+    Returns:
+        tuple: (ChunkStore holding its chunks, manifest dict).
+    """
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    store_path = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(path)), manifest["store"]))
+    return ChunkStore(store_path, manifest["compression"]), manifest
+
+
+class ManifestReader:
+    """
+    A readable binary file object returning the content of a deduplicated dump. The next chunks are read and
+    checked against their digests on a few threads ahead of the reader.
+    """
+
+    def __init__(self, path, read_ahead=4):
+        """
+        Args:
+            path (str): The manifest file.
+            read_ahead (int): Number of chunks read ahead.
+        """
+        self.store, manifest = read_manifest(path)
+        self.chunks = iter(manifest["chunks"])
+        self.executor = ThreadPoolExecutor(max_workers=read_ahead)
+        self.pending = deque()
+        self.read_ahead = read_ahead
+        self.data = b""  # The current chunk
+        self.offset = 0  # Bytes of the current chunk already read
+
+    def _fill(self):
+        """Keeps read_ahead chunks being read."""
+        while len(self.pending) < self.read_ahead:
+            entry = next(self.chunks, None)
+            if entry is None:
+                break
+            self.pending.append(self.executor.submit(self.store.get, *entry))
+
+    def read(self, size=-1):
+        """
+        Reads up to size bytes, everything left when size is negative.
+
+        Raises:
+            BackupError: If a chunk is missing or damaged.
+        """
+        parts = []
+        while size != 0:
+            if self.offset == len(self.data):
+                self._fill()
+                if not self.pending:
+                    break
+                self.data, self.offset = self.pending.popleft().result(), 0
+            part = self.data[self.offset:] if size < 0 else self.data[self.offset:self.offset + size]
+            self.offset += len(part)
+            if size > 0:
+                size -= len(part)
+            parts.append(part)
+        return b"".join(parts)
+
+    def close(self):
+        """Stops reading ahead."""
+        for future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_client_options(user, password, host=None, port=None):
+    """
+    Writes the connection settings to a temporary option file readable only by the current user, so the
+    password never appears on a command line or in the process list.
+
+    Args:
+        user (str): MySQL user.
+        password (str): MySQL password.
+        host (str): Server host, the client default when None.
+        port (int): Server port, the client default when None.
+
+    Returns:
+        str: Path of the option file, to pass as --defaults-extra-file and delete afterwards.
+    """
+    def quote(value):
+        return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+    lines = ["[client]", f"user={quote(user)}", f"password={quote(password)}"]
+    if host:
+        lines.append(f"host={quote(host)}")
+    if port:
+        lines.append(f"port={int(port)}")
+        lines.append("protocol=TCP")  # The clients would use the local socket for localhost and ignore the port
+    descriptor, path = tempfile.mkstemp(prefix="mysql_backup_", suffix=".cnf")  # Created with mode 0600
+    with os.fdopen(descriptor, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def create_backup_folder(backup_dir):
+    """
+    Creates a backup_<timestamp> folder inside the backup directory.
+
+    Args:
+        backup_dir (str): The backup directory.
+
+    Returns:
+        str: Path of the new folder.
+    """
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    backup_folder = os.path.join(backup_dir, f"backup_{timestamp}")
+    os.makedirs(backup_folder, exist_ok=True)
+    return backup_folder
+
+
+def write_dump_info(backup_folder, dump_info):
+    """
+    Writes the description of a backup into the dump_info.json file of its folder. The file is replaced
+    atomically, so a folder only has a dump_info.json once its backup is complete.
+
+    Args:
+        backup_folder (str): The backup folder.
+        dump_info (dict): The description to write.
+    """
+    info_path = os.path.join(backup_folder, DUMP_INFO_NAME)
+    with open(info_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(dump_info, f, indent=2)
+    os.replace(info_path + ".tmp", info_path)
+
+
+def parse_binlog_position(header):
+    """
+    Returns the binary log coordinates written in a dump header by --source-data=2, or None.
+
+    Args:
+        header (bytes): The first bytes of the dump.
+
+    Returns:
+        dict: {"file": ..., "position": ...}
+    """
+    match = BINLOG_POSITION_PATTERN.search(header)
+    if match is None:
+        return None
+    return {"file": match.group(1).decode("utf-8"), "position": int(match.group(2))}
+
+
+def _binlog_position_option(mysqldump):
+    """Returns the mysqldump option writing the binary log position as a comment, named after its version."""
+    try:
+        help_text = subprocess.run([mysqldump, "--help"], capture_output=True, text=True, timeout=30).stdout
+    except (OSError, subprocess.SubprocessError):
+        help_text = ""
+    return "--source-data=2" if "--source-data" in help_text else "--master-data=2"  # MySQL 8.0.26+ / older and MariaDB
+
+
+def format_progress(bytes_in, bytes_out, seconds):
+    """
+    Formats dump progress as size, throughput and compression ratio.
+
+    Args:
+        bytes_in (int): Uncompressed bytes dumped.
+        bytes_out (int): Compressed bytes written.
+        seconds (float): Time since the dump started.
+
+    Returns:
+        str: e.g. "1024.0 MB dumped at 85.3 MB/s, 210.4 MB on disk (ratio 4.87x)"
+    """
+    mb_in = bytes_in / (1024 * 1024)
+    ratio = bytes_in / bytes_out if bytes_out else 0.0
+    return (f"{mb_in:.1f} MB dumped at {mb_in / max(seconds, 1e-9):.1f} MB/s, "
+            f"{bytes_out / (1024 * 1024):.1f} MB on disk (ratio {ratio:.2f}x)")
+
+
+def stream_dump(dump_args, output_path, compression=DEFAULT_COMPRESSION, threads=None, progress=None, cancel_event=None,
+                on_header=None, on_data=None, on_stderr=None, limits=None, store=None):
+    """
+    Runs mysqldump and streams its output through a CompressedWriter straight to disk, without any
+    intermediate uncompressed file, or through a DedupWriter into a chunk store.
+
+    Args:
+        dump_args (list): The mysqldump command line.
+        output_path (str): The compressed dump file to write.
+        compression (str): "zstd", "gzip" or "none".
+        threads (int): Number of compression threads.
+        progress (callable): Called with (bytes dumped, bytes written, seconds) every PROGRESS_INTERVAL seconds.
+        cancel_event (threading.Event): Set to stop the dump.
+        on_header (callable): Called once with the first DUMP_HEADER_SIZE bytes of the dump.
+        on_data (callable): Called with every chunk of the dump as it is read.
+        on_stderr (callable): Called from a separate thread with each line mysqldump writes to stderr.
+        limits (TransferLimits): Read and write rates shared with the other backups of the process.
+        store (ChunkStore): Store the dump as deduplicated chunks, output_path is then the manifest written.
+
+    Returns:
+        DumpStats: The size and duration of the dump.
+
+    Raises:
+        BackupError: If mysqldump fails, BackupCancelled if the dump was cancelled. The incomplete file is deleted.
+    """
+    start_time = time.perf_counter()
+    try:
+        process = subprocess.Popen(dump_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        raise BackupError(f"Could not start {dump_args[0]}: {e}") from e
+
+    # Drain stderr on a thread so a chatty mysqldump can never block on a full pipe
+    stderr_lines = []
+
+    def drain_stderr():
+        for line in process.stderr:
+            stderr_lines.append(line)
+            if on_stderr is not None:
+                on_stderr(line.decode("utf-8", errors="replace").rstrip())
+
+    stderr_thread = threading.Thread(target=drain_stderr, daemon=True)
+    stderr_thread.start()
+
+    # Stop mysqldump as soon as the dump is cancelled, even while it is waiting on the server and writes nothing
+    finished = threading.Event()
+    if cancel_event is not None:
+        def kill_on_cancel():
+            while not finished.wait(CANCEL_CHECK_INTERVAL):
+                if cancel_event.is_set():
+                    process.kill()
+                    return
+
+        threading.Thread(target=kill_on_cancel, daemon=True).start()
+
+    writer = None
+    try:
+        if store is not None:
+            writer = DedupWriter(output_path, store, threads, limits)
+        else:
+            writer = CompressedWriter(output_path, compression, threads, limits=limits)
+        next_report = start_time + PROGRESS_INTERVAL
+        header = bytearray()
+        while True:
+            data = process.stdout.read1(PIPE_READ_SIZE)
+            if not data:
+                break
+            if on_header is not None and len(header) < DUMP_HEADER_SIZE:
+                header += data[:DUMP_HEADER_SIZE - len(header)]
+                if len(header) == DUMP_HEADER_SIZE:
+                    on_header(bytes(header))
+            if on_data is not None:
+                on_data(data)
+            writer.write(data)
+            if cancel_event is not None and cancel_event.is_set():
+                raise BackupCancelled("The backup was cancelled.")
+            now = time.perf_counter()
+            if progress and now >= next_report:
+                progress(writer.bytes_in, writer.bytes_out, now - start_time)
+                next_report = now + PROGRESS_INTERVAL
+
+        return_code = process.wait()
+        stderr_thread.join()
+        if cancel_event is not None and cancel_event.is_set():
+            raise BackupCancelled("The backup was cancelled.")
+        if return_code != 0:
+            message = b"".join(stderr_lines).decode("utf-8", errors="replace").strip()
+            raise BackupError(f"mysqldump exited with code {return_code}: {message}")
+        if on_header is not None and len(header) < DUMP_HEADER_SIZE:
+            on_header(bytes(header))  # The whole dump was shorter than the header size
+        writer.close()
+    except BaseException:
+        process.kill()
+        process.wait()
+        if writer is not None:
+            writer.abort()
+        raise
+    finally:
+        finished.set()
+        process.stdout.close()
+
+    seconds = time.perf_counter() - start_time
+    if progress:
+        progress(writer.bytes_in, writer.bytes_out, seconds)
+    return DumpStats(output_path, writer.bytes_in, writer.bytes_out, seconds)
+
+
+def backup_all_databases(user, password, backup_dir, host=None, port=None, compression=DEFAULT_COMPRESSION, threads=None,
+                         progress=None, cancel_event=None, mysqldump="mysqldump", table_progress=None, log=None,
+                         limits=None, dedup=False):
+    """
+    Dumps every database of a server into a new backup_<timestamp> folder as a compressed backup.sql.
+    With dedup, the dump is stored as content-defined chunks in the chunk store of the backup directory,
+    shared by all its backups, and the folder only gets the backup.sql.manifest listing them.
+
+    When binary logging is enabled on the server, the binary log position of the dump snapshot is read from
+    the dump header and recorded in dump_info.json, so incremental backups can continue from it.
+    With table_progress, the tables are taken from the cached catalog of the server and each table is reported
+    when mysqldump moves past it, see DumpProgressTracker.
+
+    Args:
+        user (str): MySQL user.
+        password (str): MySQL password.
+        backup_dir (str): Directory receiving the backup folder.
+        host (str): Server host.
+        port (int): Server port.
+        compression (str): "zstd", "gzip" or "none".
+        threads (int): Number of compression threads.
+        progress (callable): Called with (bytes dumped, bytes written, seconds) while dumping.
+        cancel_event (threading.Event): Set to stop the dump.
+        mysqldump (str): The mysqldump executable.
+        table_progress (callable): Called with (tables done, total tables, TableInfo, estimated fraction done)
+            after each table.
+        log (callable): Called with each log message and each line mysqldump writes to stderr.
+        limits (TransferLimits): Read and write rates shared with the other backups of the process.
+        dedup (bool): Write into the chunk store, bytes_out then counts the new chunks only.
+
+    Returns:
+        DumpStats: The size and duration of the dump.
+    """
+    pool = get_pool(user, password, host, port)
+    binlog_enabled = server_has_binlog(pool)
+    tracker = None
+    if table_progress is not None:
+        tracker = DumpProgressTracker(METADATA_CACHE.catalog(pool).tables, table_progress)  # Sizes are estimates anyway
+        if log:
+            log(f"Dumping about {tracker.total_bytes / (1024 * 1024):.1f} MB of data in {len(tracker.tables)} tables")
+    backup_folder = create_backup_folder(backup_dir)
+    store = ChunkStore(os.path.join(backup_dir, CHUNK_STORE_NAME), compression) if dedup else None
+    output_path = os.path.join(backup_folder, "backup.sql" + (MANIFEST_EXTENSION if dedup else COMPRESSION_EXTENSIONS[compression]))
+    options_path = write_client_options(user, password, host, port)
+    binlog_position = []
+    try:
+        # --defaults-extra-file must come first. --single-transaction dumps InnoDB tables from one consistent snapshot
+        dump_args = [mysqldump, f"--defaults-extra-file={options_path}", "--single-transaction", "--quick",
+                     "--routines", "--events", "--all-databases"]
+        if binlog_enabled:
+            dump_args.append(_binlog_position_option(mysqldump))
+        stats = stream_dump(dump_args, output_path, compression, threads, progress, cancel_event,
+                            on_header=lambda header: binlog_position.append(parse_binlog_position(header)),
+                            on_data=tracker.feed if tracker else None, on_stderr=log, limits=limits, store=store)
+        if tracker:
+            tracker.finish()
+        write_dump_info(backup_folder, {"mode": "full", "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                                        "compression": compression, "file": os.path.basename(output_path), "dedup": dedup,
+                                        "binlog": binlog_position[0] if binlog_position else None,
+                                        "bytes_in": stats.bytes_in, "bytes_out": stats.bytes_out,
+                                        "seconds": round(stats.seconds, 3)})
+        return stats
+    except BackupError:
+        try:
+            os.rmdir(backup_folder)  # Only removed when the failed dump left nothing in it
+        except OSError:
+            pass
+        raise
+    finally:
+        os.remove(options_path)
+
+
+# Schemas that are never dumped table by table: virtual schemas and the server's own system tables
+SYSTEM_SCHEMAS = ("information_schema", "performance_schema", "sys", "mysql")
+
+INSERT_STATEMENT_SIZE = 1024 * 1024  # Bytes of values per INSERT statement, like mysqldump's net_buffer_length
+ROWS_PER_FETCH = 1000  # Rows read at a time from the server
+
+POOL_SIZE = 2  # Open connections kept per server for short metadata queries
+POOL_WAIT = 30.0  # Seconds to wait for a free pooled connection
+CATALOG_TTL = 300.0  # Seconds a server's database and table catalog is reused before it is queried again
+
+# A base table of the server with its size estimates from information_schema
+TableInfo = namedtuple("TableInfo", ["database", "table", "engine", "rows", "data_bytes", "index_bytes"])
+# The databases and tables of a server, with the server version and the time.monotonic() they were read at
+ServerCatalog = namedtuple("ServerCatalog", ["version", "databases", "tables", "read_at"])
+
+# Column types whose text values are written unquoted
+_NUMERIC_TYPES = {FieldType.DECIMAL, FieldType.NEWDECIMAL, FieldType.TINY, FieldType.SHORT, FieldType.LONG, FieldType.FLOAT,
+                  FieldType.DOUBLE, FieldType.LONGLONG, FieldType.INT24, FieldType.YEAR}
+# Column types written as hex literals when their character set is binary
+_BINARY_TYPES = {FieldType.TINY_BLOB, FieldType.MEDIUM_BLOB, FieldType.LONG_BLOB, FieldType.BLOB, FieldType.STRING,
+                 FieldType.VAR_STRING, FieldType.VARCHAR, FieldType.BIT, FieldType.GEOMETRY}
+_BINARY_CHARSET = 63
+
+
+def connection_factory(user, password, host=None, port=None):
+    """
+    Returns a function opening a new mysql.connector connection with the given credentials.
+
+    Args:
+        user (str): MySQL user.
+        password (str): MySQL password.
+        host (str): Server host, the connector default when None.
+        port (int): Server port, the connector default when None.
+    """
+    settings = {"user": user, "password": password, "charset": "utf8mb4"}
+    if host:
+        settings["host"] = host
+    if port:
+        settings["port"] = int(port)
+    return partial(mysql.connector.connect, **settings)
+
+
+def close_connection(connection):
+    """Closes a connection, dropping the socket if a query was interrupted with rows left unread."""
+    try:
+        connection.close()
+    except mysql.connector.Error:
+        connection.shutdown()
+
+
+class ConnectionPool:
+    """
+    Open connections to one server, reused for short queries such as the connection test, the binary log
+    status and the information_schema catalog instead of paying a handshake each time.
+
+    It wraps mysql.connector.pooling.MySQLConnectionPool, which checks a connection is still alive when it is
+    handed out and resets its session when it is returned, but opens the connections only when they are
+    first needed and waits for a free one instead of failing when all of them are in use. Dumps keep their
+    own connections, as they hold long transactions and locks.
+    """
+
+    _names = count(1)  # Pool names must be unique within the process
+
+    def __init__(self, user, password, host=None, port=None, size=POOL_SIZE):
+        """
+        Args:
+            user (str): MySQL user.
+            password (str): MySQL password.
+            host (str): Server host.
+            port (int): Server port.
+            size (int): Most connections open at a time.
+        """
+        settings = connection_factory(user, password, host, port).keywords
+        self.key = (user, host or "localhost", int(port or 3306))
+        self.password = password
+        self.size = max(1, size)
+        self.pool = mysql.connector.pooling.MySQLConnectionPool(pool_name=f"mysql_backup_{next(self._names)}",
+                                                                pool_size=self.size, pool_reset_session=True)
+        self.pool.set_config(**settings)
+        self.slots = threading.BoundedSemaphore(self.size)
+        self.lock = threading.Lock()
+        self.opened = 0  # Connections created so far
+        self.in_use = 0
+
+    @contextmanager
+    def connection(self, timeout=POOL_WAIT):
+        """
+        Lends a connection of the pool, returned to it at the end of the with block.
+
+        Args:
+            timeout (float): Seconds to wait for a free connection.
+
+        Raises:
+            BackupError: If no connection gets free in time or the server cannot be reached.
+        """
+        if not self.slots.acquire(timeout=timeout):
+            raise BackupError(f"No free connection to {self.key[1]}:{self.key[2]} after {timeout:g}s.")
+        try:
+            with self.lock:
+                if self.opened == self.in_use:  # Every open connection is lent, open one more
+                    self.pool.add_connection()
+                    self.opened += 1
+                self.in_use += 1
+            try:
+                connection = self.pool.get_connection()
+            except BaseException:
+                with self.lock:
+                    self.in_use -= 1
+                raise
+        except mysql.connector.Error as e:
+            self.slots.release()
+            raise BackupError(f"Could not connect: {e}") from e
+        except BaseException:
+            self.slots.release()
+            raise
+        try:
+            yield connection
+        finally:
+            try:
+                connection.close()  # Back to the pool, before it is counted as free
+            except mysql.connector.Error:
+                pass  # A broken connection is reopened the next time it is handed out
+            with self.lock:
+                self.in_use -= 1
+            self.slots.release()
+
+
+_pools = {}  # (user, host, port) -> ConnectionPool
+_pools_lock = threading.Lock()
+
+
+def get_pool(user, password, host=None, port=None):
+    """
+    Returns the connection pool of a server, shared by the GUI, the scheduler and the backups of this process.
+    A new pool replaces the old one when the password changed.
+
+    Args:
+        user (str): MySQL user.
+        password (str): MySQL password.
+        host (str): Server host.
+        port (int): Server port.
+    """
+    key = (user, host or "localhost", int(port or 3306))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.password != password:
+            pool = _pools[key] = ConnectionPool(user, password, host, port)
+        return pool
+
+
+class MetadataCache:
+    """
+    Keeps the database and table catalog of each server for ttl seconds, so the size estimates and table
+    lists shown by the GUI and used by the scheduler do not query information_schema on every action.
+    Callers asking for the same server at the same time share a single query.
+    """
+
+    def __init__(self, ttl=CATALOG_TTL):
+        """
+        Args:
+            ttl (float): Seconds a catalog is reused.
+        """
+        self.ttl = ttl
+        self.catalogs = {}  # Pool key -> ServerCatalog
+        self.locks = {}  # Pool key -> lock held while the catalog is read
+        self.lock = threading.Lock()
+
+    def catalog(self, pool, max_age=None):
+        """
+        Returns the catalog of a server, reading it when the cached one is older than max_age.
+
+        Args:
+            pool (ConnectionPool): The server's connection pool.
+            max_age (float): Seconds, defaults to the ttl. 0 always reads a fresh catalog.
+
+        Returns:
+            ServerCatalog: The catalog.
+
+        Raises:
+            BackupError: If the server cannot be reached.
+        """
+        max_age = self.ttl if max_age is None else max_age
+        with self.lock:
+            key_lock = self.locks.setdefault(pool.key, threading.Lock())
+        with key_lock:
+            catalog = self.catalogs.get(pool.key)
+            if catalog is None or time.monotonic() - catalog.read_at > max_age:
+                read_at = time.monotonic()
+                with pool.connection() as connection:
+                    try:
+                        catalog = ServerCatalog(connection.get_server_info(), list_databases(connection),
+                                                list_tables(connection), read_at)
+                    except mysql.connector.Error as e:
+                        raise BackupError(f"Could not read the catalog of {pool.key[1]}:{pool.key[2]}: {e}") from e
+                self.catalogs[pool.key] = catalog
+            return catalog
+
+    def invalidate(self, pool=None):
+        """Forgets the catalog of a server, or of every server."""
+        with self.lock:
+            if pool is None:
+                self.catalogs.clear()
+            else:
+                self.catalogs.pop(pool.key, None)
+
+
+METADATA_CACHE = MetadataCache()  # Shared by the GUI, the scheduler and the backups of this process
+
+
+def server_catalog(user, password, host=None, port=None, max_age=None):
+    """
+    Returns the database and table catalog of a server from METADATA_CACHE.
+
+    Args:
+        user (str): MySQL user.
+        password (str): MySQL password.
+        host (str): Server host.
+        port (int): Server port.
+        max_age (float): Oldest cached catalog accepted in seconds, defaults to CATALOG_TTL.
+
+    Returns:
+        ServerCatalog: The catalog.
+    """
+    return METADATA_CACHE.catalog(get_pool(user, password, host, port), max_age)
+
+
+def quote_identifier(name):
+    """Quotes a database, table or column name with backticks."""
+    return "`" + name.replace("`", "``") + "`"
+
+
+def escape_like(value):
+    """Escapes the LIKE wildcards of a name, so "a_b" does not also match "aXb"."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def is_generated_column(extra):
+    """
+    Tells whether a column is computed by the server, from the Extra field of SHOW COLUMNS.
+    Only VIRTUAL and STORED (MariaDB: PERSISTENT) generated columns, not the DEFAULT_GENERATED
+    columns MySQL 8.0.13+ reports for expression defaults such as DEFAULT CURRENT_TIMESTAMP.
+    """
+    return GENERATED_COLUMN_PATTERN.search(extra or "") is not None
+
+
+def safe_file_name(name):
+    """Encodes a database or table name into a file name valid on every platform."""
+    return urllib.parse.quote(name, safe="")
+
+
+def _encode_escaped(value):
+    """Encodes a raw text value as a quoted SQL string."""
+    value = bytes(value).replace(b"\\", b"\\\\").replace(b"'", b"\\'").replace(b"\n", b"\\n").replace(b"\r", b"\\r")
+    return b"'" + value.replace(b"\x00", b"\\0").replace(b"\x1a", b"\\Z") + b"'"
+
+
+def _encode_hex(value):
+    """Encodes a raw binary value as a hex literal."""
+    return b"X'" + bytes(value).hex().encode("ascii") + b"'" if value else b"''"
+
+
+def column_encoders(description):
+    """
+    Returns one function per result column turning its raw text-protocol value into an SQL literal.
+
+    Args:
+        description (list): The cursor description of a query made with a raw cursor.
+
+    Returns:
+        list: Functions taking the raw value (bytes or None) and returning the literal as bytes.
+    """
+    encoders = []
+    for column in description:
+        type_code, charset = column[1], column[8]
+        if type_code in _NUMERIC_TYPES:
+            encode = bytes
+        elif type_code in _BINARY_TYPES and charset == _BINARY_CHARSET:
+            encode = _encode_hex
+        else:
+            encode = _encode_escaped  # Text, dates, times and JSON
+        encoders.append(lambda value, encode=encode: b"NULL" if value is None else encode(value))
+    return encoders
+
+
+def list_tables(connection, databases=None):
+    """
+    Lists the base tables of a server, largest first, from information_schema.
+
+    Args:
+        connection: An open mysql.connector connection.
+        databases (iterable): Only list the tables of these databases, defaults to every non-system database.
+
+    Returns:
+        list: TableInfo tuples sorted by data plus index size, descending.
+    """
+    query = ("SELECT table_schema, table_name, engine, table_rows, data_length, index_length "
+             "FROM information_schema.tables WHERE table_type = 'BASE TABLE' "
+             f"AND table_schema NOT IN ({', '.join(['%s'] * len(SYSTEM_SCHEMAS))})")
+    params = list(SYSTEM_SCHEMAS)
+    if databases:
+        databases = list(databases)
+        query += f" AND table_schema IN ({', '.join(['%s'] * len(databases))})"
+        params.extend(databases)
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    tables = [TableInfo(database, table, engine or "", rows or 0, data_bytes or 0, index_bytes or 0)
+              for database, table, engine, rows, data_bytes, index_bytes in cursor.fetchall()]
+    cursor.close()
+    tables.sort(key=lambda table: table.data_bytes + table.index_bytes, reverse=True)
+    return tables
+
+
+def list_databases(connection, databases=None):
+    """
+    Returns the names of the non-system databases of a server, or the given ones that exist.
+
+    Args:
+        connection: An open mysql.connector connection.
+        databases (iterable): Database names to keep, defaults to all of them.
+    """
+    cursor = connection.cursor()
+    cursor.execute("SELECT schema_name FROM information_schema.schemata ORDER BY schema_name")
+    names = [name for (name,) in cursor.fetchall() if name not in SYSTEM_SCHEMAS]
+    cursor.close()
+    if databases:
+        names = [name for name in names if name in set(databases)]
+    return names
+
+
+class DumpProgressTracker:
+    """
+    Estimates how far a dump has got from the table sizes listed in information_schema.
+
+    Finished tables count with their data size, so the fraction follows the volume dumped rather than the
+    number of tables. It is an estimate: information_schema sizes are approximate for InnoDB tables and a
+    SQL dump is not the same size as the data it holds. feed() follows a single mysqldump stream through
+    its "Current Database" and "Table structure for table" comments, table_done() is called directly by
+    dumps that know when a table is finished.
+    """
+
+    def __init__(self, tables, table_progress=None):
+        """
+        Args:
+            tables (list): TableInfo tuples of the tables being dumped.
+            table_progress (callable): Called with (tables done, total tables, TableInfo, estimated fraction done)
+                after each table.
+        """
+        self.tables = {(table.database, table.table): table for table in tables}
+        self.total_bytes = sum(max(table.data_bytes, 1) for table in tables) or 1  # Empty tables still count
+        self.done_bytes = 0
+        self.done_count = 0
+        self.table_progress = table_progress or (lambda done, total, table, fraction: None)
+        self.lock = threading.Lock()  # table_done is called from several dump workers
+        self._database = None
+        self._table = None
+        self._tail = b""
+
+    @property
+    def fraction(self):
+        """The estimated share of the data dumped, from 0 to 1."""
+        return min(self.done_bytes / self.total_bytes, 1.0)
+
+    def table_done(self, table):
+        """Counts a table as dumped and reports it."""
+        with self.lock:
+            self.done_count += 1
+            self.done_bytes += max(table.data_bytes, 1)
+            done_count, fraction = self.done_count, self.fraction
+        self.table_progress(done_count, len(self.tables), table, fraction)
+
+    def feed(self, data):
+        """
+        Reads the table markers in the next chunk of a mysqldump output.
+
+        Args:
+            data (bytes): The chunk, in stream order.
+        """
+        text = self._tail + data
+        last_newline = text.rfind(b"\n")
+        for match in DUMP_MARKER_PATTERN.finditer(text, 0, last_newline + 1):
+            self.finish()
+            name = match.group(2).replace(b"``", b"`").decode("utf-8", errors="replace")
+            if match.group(1) == b"Current Database:":
+                self._database = name
+            else:
+                self._table = self.tables.get((self._database, name))  # None for the system tables
+        # The last newline is kept as it may open the next marker
+        self._tail = text[max(last_newline, len(text) - MARKER_TAIL_SIZE):] if last_newline >= 0 else text[-MARKER_TAIL_SIZE:]
+
+    def finish(self):
+        """Counts the table mysqldump was writing as dumped."""
+        if self._table is not None:
+            table, self._table = self._table, None
+            self.table_done(table)
+
+
+def server_has_binlog(pool):
+    """
+    Returns True if binary logging is enabled on a server.
+
+    Args:
+        pool (ConnectionPool): The server's connection pool.
+
+    Raises:
+        BackupError: If the server cannot be reached.
+    """
+    with pool.connection() as connection:
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT @@log_bin")
+            enabled = bool(int(cursor.fetchone()[0]))
+            cursor.close()
+        except mysql.connector.Error as e:
+            raise BackupError(f"Could not read the binary log settings: {e}") from e
+    return enabled
+
+
+def read_binlog_position(cursor):
+    """
+    Returns the current binary log coordinates of the server, or None when binary logging is disabled.
+
+    Args:
+        cursor: A cursor of an open connection.
+
+    Returns:
+        dict: {"file": ..., "position": ..., "gtid_executed": ...}
+    """
+    for statement in ("SHOW BINARY LOG STATUS", "SHOW MASTER STATUS"):  # The first one from MySQL 8.2
+        try:
+            cursor.execute(statement)
+        except mysql.connector.Error:
+            continue
+        row = cursor.fetchone()
+        cursor.fetchall()
+        if not row:
+            return None
+        columns = [column[0].lower() for column in cursor.description]
+        status = dict(zip(columns, row))
+        return {"file": status["file"], "position": int(status["position"]),
+                "gtid_executed": status.get("executed_gtid_set") or ""}
+    return None
+
+
+def _sql_header(database):
+    """Returns the session settings written at the start of every file of a parallel dump."""
+    lines = ["SET NAMES utf8mb4;", "SET TIME_ZONE='+00:00';", "SET FOREIGN_KEY_CHECKS=0;", "SET UNIQUE_CHECKS=0;",
+             "SET SQL_MODE='NO_AUTO_VALUE_ON_ZERO';"]
+    if database is not None:
+        lines.append(f"USE {quote_identifier(database)};")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def _show_create(cursor, statement, column):
+    """Runs a SHOW CREATE statement and returns the given column of its row."""
+    cursor.execute(statement)
+    row = cursor.fetchone()
+    cursor.fetchall()
+    return row[column]
+
+
+class ParallelDumpScheduler:
+    """
+    Dumps the tables of a server concurrently, one compressed file per table, largest tables first.
+
+    All workers read from the same point in time: while FLUSH TABLES WITH READ LOCK is held by a coordinator
+    connection, every worker connection starts a REPEATABLE READ transaction WITH CONSISTENT SNAPSHOT, then
+    the lock is released. The binary log position read under the lock is recorded with the dump. InnoDB tables
+    are therefore consistent with each other however long the dump takes. Without the RELOAD privilege needed
+    for the lock, the dump falls back to a single worker, which still reads every table from one snapshot.
+
+    The backup folder gets one folder per database holding _database.sql (CREATE DATABASE), one file per table
+    (structure, data and triggers) and _objects.sql (views, routines and events), plus dump_info.json.
+    """
+
+    def __init__(self, connect, backup_folder, workers=4, compression=DEFAULT_COMPRESSION, threads=None,
+                 progress=None, log=None, cancel_event=None, table_progress=None, limits=None):
+        """
+        Stores the dump settings.
+
+        Args:
+            connect (callable): Opens a new mysql.connector connection, see connection_factory.
+            backup_folder (str): The folder receiving the dump files.
+            workers (int): Number of tables dumped at the same time.
+            compression (str): "zstd", "gzip" or "none".
+            threads (int): Total number of compression threads, shared between the workers.
+            progress (callable): Called with (tables done, total tables, TableInfo, DumpStats) after each table.
+            log (callable): Called with each log message.
+            cancel_event (threading.Event): Set to stop the dump.
+            table_progress (callable): Called with (tables done, total tables, TableInfo, estimated fraction done)
+                after each table, see DumpProgressTracker.
+            limits (TransferLimits): Read and write rates shared with the other backups of the process.
+        """
+        self.connect = connect
+        self.backup_folder = backup_folder
+        self.workers = max(1, workers)
+        self.compression = compression
+        self.threads = threads or os.cpu_count() or 1
+        self.progress = progress or (lambda done, total, table, stats: None)
+        self.log = log or (lambda message: None)
+        self.cancel_event = cancel_event or threading.Event()
+        self.table_progress = table_progress
+        self.limits = limits
+
+    def open_snapshot_connections(self, coordinator):
+        """
+        Opens the worker connections on a common consistent snapshot.
+
+        Args:
+            coordinator: The connection used to take the global read lock.
+
+        Returns:
+            tuple: (list of worker connections, binary log position or None, True if the snapshot is shared
+            through the global read lock).
+        """
+        cursor = coordinator.cursor()
+        cursor.execute("SET SESSION lock_wait_timeout = 60")
+        try:
+            cursor.execute("FLUSH TABLES WITH READ LOCK")
+            locked = True
+        except mysql.connector.Error as e:
+            self.log(f"FLUSH TABLES WITH READ LOCK failed ({e}), dumping with a single worker to keep one snapshot")
+            locked = False
+            self.workers = 1
+
+        connections = []
+        try:
+            for _ in range(self.workers):
+                connection = self.connect()
+                connections.append(connection)
+                worker_cursor = connection.cursor()
+                worker_cursor.execute("SET SESSION TIME_ZONE = '+00:00'")
+                worker_cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                worker_cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+                worker_cursor.close()
+            binlog_position = read_binlog_position(cursor) if locked else None
+        except BaseException:
+            for connection in connections:
+                close_connection(connection)
+            raise
+        finally:
+            if locked:
+                cursor.execute("UNLOCK TABLES")
+            cursor.close()
+        return connections, binlog_position, locked
+
+    def run(self, databases=None):
+        """
+        Dumps the selected databases.
+
+        Args:
+            databases (iterable): Names of the databases to dump, defaults to every non-system database.
+
+        Returns:
+            dict: The content of dump_info.json.
+
+        Raises:
+            BackupError: If a table cannot be dumped, BackupCancelled if the dump was cancelled. The backup folder
+            is deleted in both cases.
+        """
+        start_time = time.perf_counter()
+        try:
+            coordinator = self.connect()
+        except mysql.connector.Error as e:
+            raise BackupError(f"Could not connect: {e}") from e
+
+        connections = []
+        try:
+            database_names = list_databases(coordinator, databases)
+            tables = list_tables(coordinator, database_names)
+            self.workers = max(1, min(self.workers, len(tables)))  # No idle snapshot connections
+            connections, binlog_position, locked = self.open_snapshot_connections(coordinator)
+
+            non_transactional = [table for table in tables if table.engine.lower() != "innodb"]
+            if non_transactional:
+                self.log(f"{len(non_transactional)} tables are not InnoDB and are only consistent if they are not "
+                         f"written during the dump: {', '.join(t.database + '.' + t.table for t in non_transactional[:10])}")
+            self.log(f"Dumping {len(tables)} tables of {len(database_names)} databases with {len(connections)} workers")
+
+            for database in database_names:
+                os.makedirs(os.path.join(self.backup_folder, safe_file_name(database)), exist_ok=True)
+                self.dump_database_definition(coordinator, database)
+
+            table_stats = self.dump_tables(connections, tables)
+
+            for database in database_names:
+                self.dump_database_objects(coordinator, database)
+        except (mysql.connector.Error, OSError) as e:
+            shutil.rmtree(self.backup_folder, ignore_errors=True)
+            raise BackupError(f"The dump failed: {e}") from e
+        except BaseException:
+            shutil.rmtree(self.backup_folder, ignore_errors=True)
+            raise
+        finally:
+            for connection in connections + [coordinator]:
+                close_connection(connection)
+
+        dump_info = {
+            "mode": "parallel",
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "compression": self.compression,
+            "consistent": locked or len(connections) == 1,
+            "binlog": binlog_position,
+            "databases": database_names,
+            "tables": [{"database": table.database, "table": table.table, "file": os.path.relpath(stats.path, self.backup_folder),
+                        "rows": rows, "bytes_in": stats.bytes_in, "bytes_out": stats.bytes_out, "seconds": round(stats.seconds, 3)}
+                       for table, (stats, rows) in table_stats.items()],
+            "seconds": round(time.perf_counter() - start_time, 3),
+        }
+        write_dump_info(self.backup_folder, dump_info)
+        return dump_info
+
+    def dump_tables(self, connections, tables):
+        """
+        Dumps the tables over the worker connections, each worker taking the largest table left.
+
+        Args:
+            connections (list): The worker connections, all on the same snapshot.
+            tables (list): TableInfo tuples sorted largest first.
+
+        Returns:
+            dict: TableInfo -> (DumpStats, rows dumped), in dump order.
+        """
+        idle_connections = queue.Queue()
+        for connection in connections:
+            idle_connections.put(connection)
+
+        def dump_with_idle_connection(table):
+            connection = idle_connections.get()
+            try:
+                return self.dump_table(connection, table)
+            finally:
+                idle_connections.put(connection)
+
+        tracker = DumpProgressTracker(tables, self.table_progress)
+        table_stats = {}
+        with ThreadPoolExecutor(max_workers=len(connections)) as executor:
+            futures = {executor.submit(dump_with_idle_connection, table): table for table in tables}
+            try:
+                for future in as_completed(futures):
+                    table = futures[future]
+                    table_stats[table] = future.result()
+                    self.progress(len(table_stats), len(tables), table, table_stats[table][0])
+                    tracker.table_done(table)
+            except BaseException:
+                self.cancel_event.set()  # Stops the other workers at their next batch of rows
+                for future in futures:
+                    future.cancel()
+                raise
+        return table_stats
+
+    def dump_table(self, connection, table):
+        """
+        Writes the structure, rows and triggers of one table into its compressed file.
+
+        Args:
+            connection: A worker connection inside the snapshot transaction.
+            table (TableInfo): The table to dump.
+
+        Returns:
+            tuple: (DumpStats, number of rows dumped).
+        """
+        start_time = time.perf_counter()
+        qualified_name = f"{quote_identifier(table.database)}.{quote_identifier(table.table)}"
+        path = os.path.join(self.backup_folder, safe_file_name(table.database),
+                            safe_file_name(table.table) + ".sql" + COMPRESSION_EXTENSIONS[self.compression])
+        writer = CompressedWriter(path, self.compression, max(1, self.threads // self.workers), limits=self.limits)
+        rows_dumped = 0
+        try:
+            cursor = connection.cursor()
+            create_table = _show_create(cursor, f"SHOW CREATE TABLE {qualified_name}", 1)
+            # Generated columns are computed by the server and cannot be inserted
+            cursor.execute(f"SHOW COLUMNS FROM {qualified_name}")
+            columns = [row[0] for row in cursor.fetchall() if not is_generated_column(row[5])]
+            cursor.execute(f"SHOW TRIGGERS FROM {quote_identifier(table.database)} LIKE %s", (escape_like(table.table),))
+            triggers = [row[0] for row in cursor.fetchall() if row[2] == table.table]
+            trigger_definitions = [_show_create(cursor, f"SHOW CREATE TRIGGER {quote_identifier(table.database)}.{quote_identifier(trigger)}", 2)
+                                   for trigger in triggers]
+            cursor.close()
+
+            table_name = quote_identifier(table.table)
+            writer.write(_sql_header(table.database))
+            writer.write((f"--\n-- Table structure for table {table_name}\n--\n\n"
+                          f"DROP TABLE IF EXISTS {table_name};\n{create_table};\n\n"
+                          f"--\n-- Dumping data for table {table_name}\n--\n\n").encode("utf-8"))
+
+            column_list = ",".join(quote_identifier(column) for column in columns)
+            insert_prefix = f"INSERT INTO {table_name} ({column_list}) VALUES ".encode("utf-8")
+            cursor = connection.cursor(raw=True)
+            cursor.execute(f"SELECT {column_list} FROM {qualified_name}")
+            encoders = column_encoders(cursor.description)
+            values, values_size = [], 0
+            while True:
+                rows = cursor.fetchmany(ROWS_PER_FETCH)
+                if not rows:
+                    break
+                for row in rows:
+                    value = b"(" + b",".join([encode(field) for encode, field in zip(encoders, row)]) + b")"
+                    values.append(value)
+                    values_size += len(value) + 1
+                    if values_size >= INSERT_STATEMENT_SIZE:
+                        writer.write(insert_prefix + b",".join(values) + b";\n")
+                        values, values_size = [], 0
+                rows_dumped += len(rows)
+                if self.cancel_event.is_set():
+                    raise BackupCancelled("The backup was cancelled.")
+            if values:
+                writer.write(insert_prefix + b",".join(values) + b";\n")
+            cursor.close()
+
+            if trigger_definitions:
+                writer.write(b"\nDELIMITER ;;\n" + b"".join(definition.encode("utf-8") + b";;\n" for definition in trigger_definitions)
+                             + b"DELIMITER ;\n")
+            writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+        return DumpStats(path, writer.bytes_in, writer.bytes_out, time.perf_counter() - start_time), rows_dumped
+
+    def dump_database_definition(self, connection, database):
+        """Writes the CREATE DATABASE statement of a database into its _database.sql file."""
+        cursor = connection.cursor()
+        create_database = _show_create(cursor, f"SHOW CREATE DATABASE IF NOT EXISTS {quote_identifier(database)}", 1)
+        cursor.close()
+        path = os.path.join(self.backup_folder, safe_file_name(database), "_database.sql" + COMPRESSION_EXTENSIONS[self.compression])
+        writer = CompressedWriter(path, self.compression, 1, limits=self.limits)
+        writer.write(_sql_header(None) + f"{create_database};\n".encode("utf-8"))
+        writer.close()
+
+    def dump_database_objects(self, connection, database):
+        """
+        Writes the views, stored routines and events of a database into its _objects.sql file, to be loaded
+        once all of its tables exist. Views are ordered so the ones used by other views come first.
+        """
+        database_name = quote_identifier(database)
+        cursor = connection.cursor()
+        cursor.execute("SELECT table_name FROM information_schema.views WHERE table_schema = %s ORDER BY table_name", (database,))
+        views = {name: _show_create(cursor, f"SHOW CREATE VIEW {database_name}.{quote_identifier(name)}", 1)
+                 for (name,) in cursor.fetchall()}
+        cursor.execute("SELECT routine_type, routine_name FROM information_schema.routines WHERE routine_schema = %s "
+                       "ORDER BY routine_type, routine_name", (database,))
+        routines = [_show_create(cursor, f"SHOW CREATE {routine_type} {database_name}.{quote_identifier(name)}", 2)
+                    for routine_type, name in cursor.fetchall()]
+        cursor.execute("SELECT event_name FROM information_schema.events WHERE event_schema = %s ORDER BY event_name", (database,))
+        events = [_show_create(cursor, f"SHOW CREATE EVENT {database_name}.{quote_identifier(name)}", 3)
+                  for (name,) in cursor.fetchall()]
+        cursor.close()
+
+        ordered_views = []
+        remaining = dict(views)
+        while remaining:
+            # A view is ready once no other remaining view appears in its definition
+            ready = [name for name, definition in remaining.items()
+                     if not any(quote_identifier(other) in definition for other in remaining if other != name)]
+            for name in ready or list(remaining):  # A cycle cannot be created, keep the rest in name order
+                ordered_views.append(remaining.pop(name))
+
+        definitions = [f"{view};\n" for view in ordered_views]
+        if routines or events:
+            definitions.append("DELIMITER ;;\n")
+            definitions.extend(f"{definition};;\n" for definition in routines + events if definition)
+            definitions.append("DELIMITER ;\n")
+        path = os.path.join(self.backup_folder, safe_file_name(database), "_objects.sql" + COMPRESSION_EXTENSIONS[self.compression])
+        writer = CompressedWriter(path, self.compression, 1, limits=self.limits)
+        writer.write(_sql_header(database) + "".join(definitions).encode("utf-8"))
+        writer.close()
+
+
+def backup_tables_parallel(user, password, backup_dir, host=None, port=None, workers=4, databases=None,
+                           compression=DEFAULT_COMPRESSION, threads=None, progress=None, log=None, cancel_event=None,
+                           table_progress=None, limits=None):
+    """
+    Dumps every table of a server into a new backup_<timestamp> folder with a ParallelDumpScheduler.
+
+    Args:
+        user (str): MySQL user.
+        password (str): MySQL password.
+        backup_dir (str): Directory receiving the backup folder.
+        host (str): Server host.
+        port (int): Server port.
+        workers (int): Number of tables dumped at the same time.
+        databases (iterable): Names of the databases to dump, defaults to every non-system database.
+        compression (str): "zstd", "gzip" or "none".
+        threads (int): Total number of compression threads.
+        progress (callable): Called with (tables done, total tables, TableInfo, DumpStats) after each table.
+        log (callable): Called with each log message.
+        cancel_event (threading.Event): Set to stop the dump.
+        table_progress (callable): Called with (tables done, total tables, TableInfo, estimated fraction done)
+            after each table.
+        limits (TransferLimits): Read and write rates shared with the other backups of the process.
+
+    Returns:
+        dict: The content of the dump_info.json written into the backup folder, plus its "folder".
+    """
+    backup_folder = create_backup_folder(backup_dir)
+    scheduler = ParallelDumpScheduler(connection_factory(user, password, host, port), backup_folder, workers, compression,
+                                      threads, progress, log, cancel_event, table_progress, limits)
+    dump_info = scheduler.run(databases)
+    dump_info["folder"] = backup_folder
+    return dump_info
+
+
+def open_dump_file(path):
+    """
+    Opens a dump or binary log file of a backup for reading, decompressing it according to its extension.
+
+    Args:
+        path (str): A .zst, .gz or uncompressed file, or the .manifest of a deduplicated dump.
+
+    Returns:
+        A readable binary file object.
+    """
+    if path.endswith(MANIFEST_EXTENSION):
+        return ManifestReader(path)
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise BackupError("Reading zstd files needs the zstandard package: pip install zstandard")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True, closefd=True)
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def read_chunks(paths, cancel_event=None):
+    """
+    Yields the decompressed content of several backup files one after the other, in PIPE_READ_SIZE chunks.
+
+    Args:
+        paths (list): The files to read.
+        cancel_event (threading.Event): Set to stop reading.
+    """
+    for path in paths:
+        with open_dump_file(path) as f:
+            for data in iter(lambda: f.read(PIPE_READ_SIZE), b""):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise BackupCancelled("The restore was cancelled.")
+                yield data
+
+
+def feed_client(client_args, chunks, stdin_process=None):
+    """
+    Runs a command line client and writes chunks of SQL to its standard input.
+
+    Args:
+        client_args (list): The client command line, e.g. the mysql client.
+        chunks (iterable): The bytes to write, or None when stdin_process feeds the client.
+        stdin_process (subprocess.Popen): A process whose standard output is connected to the client instead.
+
+    Raises:
+        BackupError: If the client or the feeding process fails.
+    """
+    try:
+        process = subprocess.Popen(client_args, stdin=stdin_process.stdout if stdin_process else subprocess.PIPE,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except OSError as e:
+        raise BackupError(f"Could not start {client_args[0]}: {e}") from e
+    stderr_lines = []
+    stderr_thread = threading.Thread(target=lambda: stderr_lines.extend(process.stderr), daemon=True)
+    stderr_thread.start()
+
+    try:
+        if stdin_process is not None:
+            stdin_process.stdout.close()  # The client holds the read end now
+        else:
+            try:
+                for data in chunks:
+                    process.stdin.write(data)
+            except BrokenPipeError:
+                pass  # The client stopped on an error, reported below
+            finally:
+                process.stdin.close()
+        return_code = process.wait()
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    stderr_thread.join()
+    if return_code != 0:
+        message = b"".join(stderr_lines).decode("utf-8", errors="replace").strip()
+        raise BackupError(f"{os.path.basename(client_args[0])} exited with code {return_code}: {message}")
+
+
+def list_backups(backup_dir):
+    """
+    Lists the complete backups of a backup directory, oldest first.
+
+    Args:
+        backup_dir (str): The backup directory.
+
+    Returns:
+        list: (backup folder, dump_info dict) pairs. Folders without a dump_info.json are skipped.
+    """
+    backups = []
+    for name in sorted(os.listdir(backup_dir)):
+        info_path = os.path.join(backup_dir, name, DUMP_INFO_NAME)
+        if name.startswith("backup_") and os.path.isfile(info_path):
+            with open(info_path, encoding="utf-8") as f:
+                backups.append((os.path.join(backup_dir, name), json.load(f)))
+    return backups
+
+
+def backup_end_position(dump_info):
+    """Returns the binary log position an incremental backup following this backup starts from, or None."""
+    return dump_info.get("binlog_end") if dump_info.get("mode") == "incremental" else dump_info.get("binlog")
+
+
+def backup_incremental(user, password, backup_dir, host=None, port=None, compression=DEFAULT_COMPRESSION, threads=None,
+                       log=None, cancel_event=None, mysqlbinlog="mysqlbinlog", limits=None):
+    """
+    Copies the binary log events written since the latest backup into a new backup_<timestamp> folder.
+
+    The binary logs are rotated first, so every file up to the new current one is complete. The files from
+    the one holding the previous end position up to the last complete one are read from the server with
+    mysqlbinlog --read-from-remote-server --raw and compressed. Needs the RELOAD and REPLICATION SLAVE privileges.
+
+    Args:
+        user (str): MySQL user.
+        password (str): MySQL password.
+        backup_dir (str): Directory holding the earlier backups and receiving the new folder.
+        host (str): Server host.
+        port (int): Server port.
+        compression (str): "zstd", "gzip" or "none".
+        threads (int): Number of compression threads.
+        log (callable): Called with each log message.
+        cancel_event (threading.Event): Set to stop the backup.
+        mysqlbinlog (str): The mysqlbinlog executable.
+        limits (TransferLimits): Read and write rates applied while the copied binary logs are compressed.
+
+    Returns:
+        dict: The content of the dump_info.json written into the new folder, plus its "folder".
+
+    Raises:
+        BackupError: If there is no earlier backup with a binary log position or its binary log was purged.
+    """
+    log = log or (lambda message: None)
+    chained = [(folder, info) for folder, info in list_backups(backup_dir) if backup_end_position(info)]
+    if not chained:
+        raise BackupError("No earlier backup records a binary log position, take a full backup with binary logging enabled first.")
+    base_folder, base_info = chained[-1]
+    start_position = backup_end_position(base_info)
+
+    with get_pool(user, password, host, port).connection() as connection:
+        try:
+            cursor = connection.cursor()
+            cursor.execute("FLUSH BINARY LOGS")  # Closes the current file so it can be copied whole
+            cursor.execute("SHOW BINARY LOGS")
+            binlog_names = [row[0] for row in cursor.fetchall()]
+            end_position = read_binlog_position(cursor)
+            cursor.close()
+        except mysql.connector.Error as e:
+            raise BackupError(f"Could not rotate the binary logs: {e}") from e
+
+    if start_position["file"] not in binlog_names:
+        raise BackupError(f"The binary log {start_position['file']} was purged from the server, take a full backup.")
+    files = binlog_names[binlog_names.index(start_position["file"]):binlog_names.index(end_position["file"])]
+    log(f"Copying {len(files)} binary logs since {start_position['file']}:{start_position['position']} "
+        f"(after {os.path.basename(base_folder)})")
+
+    start_time = time.perf_counter()
+    backup_folder = create_backup_folder(backup_dir)
+    options_path = write_client_options(user, password, host, port)
+    try:
+        copy_args = [mysqlbinlog, f"--defaults-extra-file={options_path}", "--read-from-remote-server", "--raw",
+                     f"--result-file={backup_folder}{os.sep}"] + files
+        try:
+            result = subprocess.run(copy_args, capture_output=True)
+        except OSError as e:
+            raise BackupError(f"Could not start {mysqlbinlog}: {e}") from e
+        if result.returncode != 0:
+            raise BackupError(f"mysqlbinlog exited with code {result.returncode}: "
+                              f"{result.stderr.decode('utf-8', errors='replace').strip()}")
+
+        # Compress the copied files in place of the raw ones
+        compressed_files = []
+        bytes_in = bytes_out = 0
+        for name in files:
+            raw_path = os.path.join(backup_folder, name)
+            writer = CompressedWriter(raw_path + COMPRESSION_EXTENSIONS[compression], compression, threads, limits=limits)
+            try:
+                for data in read_chunks([raw_path], cancel_event):
+                    writer.write(data)
+                writer.close()
+            except BaseException:
+                writer.abort()
+                raise
+            os.remove(raw_path)
+            compressed_files.append(os.path.basename(writer.path))
+            bytes_in += writer.bytes_in
+            bytes_out += writer.bytes_out
+    except BaseException:
+        shutil.rmtree(backup_folder, ignore_errors=True)
+        raise
+    finally:
+        os.remove(options_path)
+
+    dump_info = {"mode": "incremental", "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                 "compression": compression, "base": os.path.basename(base_folder), "binlog_start": start_position,
+                 "binlog_end": end_position, "files": compressed_files, "bytes_in": bytes_in, "bytes_out": bytes_out,
+                 "seconds": round(time.perf_counter() - start_time, 3)}
+    write_dump_info(backup_folder, dump_info)
+    dump_info["folder"] = backup_folder
+    return dump_info
+
+
+def full_backup_files(backup_folder, dump_info):
+    """
+    Returns the files of a full backup in the order they must be loaded.
+
+    Args:
+        backup_folder (str): The backup folder.
+        dump_info (dict): Its dump_info.json content.
+    """
+    if dump_info["mode"] == "full":
+        return [os.path.join(backup_folder, dump_info["file"])]
+    extension = COMPRESSION_EXTENSIONS[dump_info["compression"]]
+    database_files = [os.path.join(backup_folder, safe_file_name(database), "_database.sql" + extension)
+                      for database in dump_info["databases"]]
+    table_files = [os.path.join(backup_folder, table["file"]) for table in dump_info["tables"]]
+    object_files = [os.path.join(backup_folder, safe_file_name(database), "_objects.sql" + extension)
+                    for database in dump_info["databases"]]
+    return database_files + table_files + object_files
+
+
+def restore_chain(backup_dir, until=None):
+    """
+    Selects the backups needed to restore a server to a point in time: the latest full backup taken before it,
+    followed by the incremental backups chained to it, up to the first one taken after that point.
+
+    Args:
+        backup_dir (str): The backup directory.
+        until (datetime.datetime): The point in time, defaults to the latest backup.
+
+    Returns:
+        tuple: ((full backup folder, dump_info), list of (incremental folder, dump_info)).
+    """
+    backups = list_backups(backup_dir)
+    created = lambda info: datetime.datetime.fromisoformat(info["created"])
+    full_backups = [index for index, (_, info) in enumerate(backups)
+                    if info["mode"] in ("full", "parallel") and (until is None or created(info) <= until)]
+    if not full_backups:
+        raise BackupError("No full backup was taken before that point in time.")
+
+    full_index = full_backups[-1]
+    incrementals = []
+    previous_name = os.path.basename(backups[full_index][0])
+    for folder, info in backups[full_index + 1:]:
+        if info["mode"] != "incremental" or info["base"] != previous_name:
+            continue
+        incrementals.append((folder, info))
+        previous_name = os.path.basename(folder)
+        if until is not None and created(info) > until:
+            break  # Holds the events up to the point in time
+    return backups[full_index], incrementals
+
+
+def prune_backups(backup_dir, keep_full=7, keep_days=None, now=None):
+    """
+    Deletes the oldest backup folders of a backup directory, whole restore chains at a time.
+
+    A chain is a full or parallel backup followed by the incremental backups based on it. The keep_full newest
+    chains are always kept and, with keep_days, so are the chains whose latest backup is more recent than that.
+    Everything older than the oldest kept chain is deleted, including incremental backups whose full backup
+    is gone. Folders without a dump_info.json, from an older version or from a backup still being written,
+    are never deleted. The chunks only used by the deleted backups are then removed from the chunk store.
+
+    Args:
+        backup_dir (str): The backup directory.
+        keep_full (int): Number of full backups kept with their incremental backups, at least 1.
+        keep_days (float): Also keep the chains with a backup from the last keep_days days.
+        now (datetime.datetime): The current time, used with keep_days.
+
+    Returns:
+        list: The deleted folders.
+    """
+    chains = []  # Lists of (folder, dump_info), oldest first
+    chain_of = {}  # Folder name -> its chain
+    for folder, info in list_backups(backup_dir):
+        chain = chain_of.get(info.get("base")) if info.get("mode") == "incremental" else None
+        if chain is None:
+            chain = []
+            chains.append(chain)
+        chain.append((folder, info))
+        chain_of[os.path.basename(folder)] = chain
+
+    full_chains = [index for index, chain in enumerate(chains) if chain[0][1].get("mode") != "incremental"]
+    kept = full_chains[-max(1, keep_full):]
+    if keep_days is not None:
+        cutoff = (now or datetime.datetime.now()) - datetime.timedelta(days=keep_days)
+        kept += [index for index in full_chains
+                 if datetime.datetime.fromisoformat(chains[index][-1][1]["created"]) >= cutoff]
+    if not kept:
+        return []
+
+    deleted = []
+    for chain in chains[:min(kept)]:
+        for folder, _ in chain:
+            shutil.rmtree(folder)
+            deleted.append(folder)
+    if deleted and os.path.isdir(os.path.join(backup_dir, CHUNK_STORE_NAME)):
+        collect_chunk_garbage(backup_dir)
+    return deleted
+
+
+def collect_chunk_garbage(backup_dir):
+    """
+    Deletes the chunks of the chunk store of a backup directory that no manifest refers to any more, and the
+    temporary files of interrupted writes. Nothing is deleted while a DedupWriter writes into the store, even
+    from another process: its chunks are not listed by a manifest yet.
+
+    Args:
+        backup_dir (str): The backup directory.
+
+    Returns:
+        tuple: (number of files deleted, bytes freed), or None when the store is in use, the chunks are then
+        collected by a later call.
+
+    Raises:
+        BackupError: If a manifest cannot be read, in which case nothing is deleted.
+    """
+    store_path = os.path.join(backup_dir, CHUNK_STORE_NAME)
+    store_lock = FileLock(store_path + CHUNK_STORE_LOCK_EXTENSION)
+    if not store_lock.acquire(blocking=False):
+        return None
+    try:
+        return _delete_unreferenced_chunks(backup_dir, store_path)
+    finally:
+        store_lock.release()
+
+
+def _delete_unreferenced_chunks(backup_dir, store_path):
+    """Deletes the files of a chunk store no manifest of the backup directory refers to, see collect_chunk_garbage."""
+    referenced = set()  # Chunk files, relative to the store
+    for name in os.listdir(backup_dir):
+        folder = os.path.join(backup_dir, name)
+        if not name.startswith("backup_") or not os.path.isdir(folder):
+            continue
+        for file_name in os.listdir(folder):
+            if file_name.endswith(MANIFEST_EXTENSION):
+                try:
+                    store, manifest = read_manifest(os.path.join(folder, file_name))
+                except (OSError, ValueError, KeyError) as e:
+                    raise BackupError(f"Cannot read the manifest {file_name} of {name}, no chunk was deleted: {e}") from e
+                referenced.update(os.path.relpath(store.chunk_path(digest), store_path) for digest, _ in manifest["chunks"])
+
+    deleted, freed = 0, 0
+    for directory, _, file_names in os.walk(store_path):
+        for file_name in file_names:
+            path = os.path.join(directory, file_name)
+            if os.path.relpath(path, store_path) not in referenced:
+                freed += os.path.getsize(path)
+                os.remove(path)
+                deleted += 1
+    return deleted, freed
+
+
+def defer_secondary_indexes(create_table, table):
+    """
+    Moves the secondary indexes of an InnoDB CREATE TABLE statement into an ALTER TABLE run once the rows are
+    loaded, which builds each index sorted in one pass instead of inserting every row into it. Only plain KEYs
+    are deferred: a UNIQUE key may be the clustered index of a table without PRIMARY KEY, which the ALTER
+    would rebuild, or be referenced by the foreign keys of other tables. Tables with foreign keys, which need
+    their indexes when they are created, and indexes starting with the AUTO_INCREMENT column are left as they are.
+
+    Args:
+        create_table (bytes): The CREATE TABLE statement as written by SHOW CREATE TABLE, ending with ";\\n".
+        table (str): The table name.
+
+    Returns:
+        tuple: (the CREATE TABLE statement without the deferred indexes, the ALTER TABLE adding them or b"").
+    """
+    if b"ENGINE=InnoDB" not in create_table or b" FOREIGN KEY " in create_table:
+        return create_table, b""
+    auto_increment = AUTO_INCREMENT_PATTERN.search(create_table)
+    kept, deferred = [], []
+    for line in create_table.split(b"\n"):
+        match = SECONDARY_KEY_PATTERN.fullmatch(line)
+        if match and not (auto_increment and match.group(2) == auto_increment.group(1)):
+            deferred.append(b"ADD " + match.group(1))
+        else:
+            kept.append(line)
+    if not deferred:
+        return create_table, b""
+    closing = max(index for index, line in enumerate(kept) if line.startswith(b")"))
+    kept[closing - 1] = kept[closing - 1].rstrip(b",")  # The indexes may have followed the last kept line
+    return b"\n".join(kept), f"ALTER TABLE {quote_identifier(table)} ".encode("utf-8") + b", ".join(deferred) + b";\n"
+
+
+def format_restore_progress(rows, bytes_loaded, bytes_total, seconds):
+    """
+    Formats restore progress as rows and data loaded with their rates.
+
+    Args:
+        rows (int): Rows sent to the server.
+        bytes_loaded (int): Bytes of SQL sent to the server.
+        bytes_total (int): Bytes of SQL in the backup, 0 when unknown.
+        seconds (float): Time since the restore started.
+
+    Returns:
+        str: e.g. "1,250,000 rows loaded at 85,321 rows/s, 512.0 of 2048.0 MB at 35.0 MB/s"
+    """
+    seconds = max(seconds, 1e-9)
+    mb_loaded = bytes_loaded / (1024 * 1024)
+    total = f" of {bytes_total / (1024 * 1024):.1f}" if bytes_total else ""
+    return f"{rows:,} rows loaded at {rows / seconds:,.0f} rows/s, {mb_loaded:.1f}{total} MB at {mb_loaded / seconds:.1f} MB/s"
+
+
+# A part of a backup loaded by ParallelRestorer: "header", "database", "table", "objects" or "views", the database
+# it belongs to (None when it selects it itself), the table or view name, its file and whether it is a spool file
+RestoreSection = namedtuple("RestoreSection", ["kind", "database", "name", "path", "temporary"])
+
+
+class ParallelRestorer:
+    """
+    Loads a full or parallel backup into a server over several mysql client sessions.
+
+    The single dump of a full backup is read once, decompressed, and split at the comment lines mysqldump
+    writes before each table into one section per table. The sections are spooled into temporary files with
+    fast compression, so the dump is read at the speed of decompression while up to `workers` sessions load
+    the completed sections. Database definitions, routines and events are loaded in their order on a session
+    of their own, views once every table before them is loaded. The files of a parallel backup already are
+    such sections and are loaded directly, largest table first.
+
+    The sessions disable unique and foreign key checks and commit once per table, and the secondary indexes
+    of InnoDB tables are created after their rows are loaded, see defer_secondary_indexes. Progress counts
+    the rows sent to the server.
+    """
+
+    def __init__(self, client_args, workers=4, log=None, progress=None, cancel_event=None, skip_binlog=False,
+                 spool_dir=None, spool_limit=RESTORE_SPOOL_LIMIT):
+        """
+        Args:
+            client_args (list): The mysql client command line connecting to the server.
+            workers (int): Number of tables loaded at the same time.
+            log (callable): Called with each log message, from several threads.
+            progress (callable): Called with (rows, bytes loaded, bytes in the backup, seconds) every
+                PROGRESS_INTERVAL seconds, from the loading threads.
+            cancel_event (threading.Event): Set to stop the restore.
+            skip_binlog (bool): Do not write the loaded rows to the binary log of the server (needs SUPER or
+                SYSTEM_VARIABLES_ADMIN), e.g. when restoring a server its replicas are restored separately from.
+            spool_dir (str): Directory receiving the spool files, defaults to the system temporary directory.
+            spool_limit (int): Bytes of spool files not loaded yet after which reading the dump waits.
+        """
+        self.client_args = client_args
+        self.workers = max(1, workers)
+        self.log = log or (lambda message: None)
+        self.progress = progress
+        self.cancel_event = cancel_event or threading.Event()
+        self.settings = b"SET SESSION foreign_key_checks = 0, unique_checks = 0, autocommit = 0;\n"
+        if skip_binlog:
+            self.settings += b"SET SESSION sql_log_bin = 0;\n"
+        self.spool_dir = spool_dir
+        self.spool_limit = spool_limit
+        self.prefix = b""  # Session settings from the header of the dump, sent first by every session
+        self.sections = queue.Queue()  # Table sections waiting for a session, then one None per session
+        self.sessions = []  # Threads running the loading sessions
+        self.stopping = threading.Event()  # Set when a session fails or the restore stops
+        self.condition = threading.Condition()  # Guards the counters below
+        self.pending = 0  # Table sections queued or loading
+        self.spooled = 0  # Bytes of spool files not loaded yet
+        self.failure = None  # The first error of a session
+        self.rows = self.bytes_loaded = self.bytes_total = self.tables_done = 0
+        self.start_time = self.next_report = 0.0
+
+    def run(self, backup_folder, dump_info):
+        """
+        Loads a backup.
+
+        Args:
+            backup_folder (str): The backup folder.
+            dump_info (dict): Its dump_info.json content, of a full or parallel backup.
+
+        Returns:
+            dict: {"tables": tables loaded, "rows": rows loaded, "bytes": bytes of SQL loaded, "seconds": duration}.
+
+        Raises:
+            BackupError: If a session fails, BackupCancelled if the restore was cancelled.
+        """
+        self.start_time = time.perf_counter()
+        self.next_report = self.start_time + PROGRESS_INTERVAL
+        if dump_info["mode"] == "parallel":
+            self.bytes_total = sum(table["bytes_in"] for table in dump_info["tables"])
+        else:
+            self.bytes_total = dump_info.get("bytes_in", 0)
+        spool_dir = tempfile.mkdtemp(prefix="mysql_restore_", dir=self.spool_dir)
+        try:
+            if dump_info["mode"] == "parallel":
+                self._queue_files(backup_folder, dump_info)
+            else:
+                self._split_dump(os.path.join(backup_folder, dump_info["file"]), spool_dir)
+            self._stop_sessions()
+        except BaseException:
+            self.stopping.set()
+            self._stop_sessions()
+            raise
+        finally:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+        if self.failure is not None:
+            raise self.failure
+        return {"tables": self.tables_done, "rows": self.rows, "bytes": self.bytes_loaded,
+                "seconds": round(time.perf_counter() - self.start_time, 3)}
+
+    def _split_dump(self, path, spool_dir):
+        """Reads a mysqldump output and loads or queues each of its sections as soon as it is spooled."""
+        database = None
+        section_number = count()
+        pending = b""  # The end of the data read, which may hold the start of a marker
+
+        def open_section(kind, name):
+            self._wait_for(lambda: self.spooled <= self.spool_limit or self.pending == 0)
+            spool_path = os.path.join(spool_dir, f"{next(section_number):06d}.sql" + COMPRESSION_EXTENSIONS[DEFAULT_COMPRESSION])
+            writer = CompressedWriter(spool_path, DEFAULT_COMPRESSION, threads=2, level=1)
+            # A database section creates and selects its database itself
+            return RestoreSection(kind, database if kind != "database" else None, name, spool_path, True), writer
+
+        section, writer = open_section("header", None)
+        try:
+            for data in read_chunks([path], self.cancel_event):
+                self._check()
+                data = pending + data
+                position = 0
+                for match in RESTORE_MARKER_PATTERN.finditer(data):
+                    writer.write(data[position:match.start() + 1])
+                    writer.close()
+                    self._dispatch(section)
+                    marker, name = match.group(1), match.group(2).decode("utf-8").replace("``", "`")
+                    if marker.startswith(b"Current Database"):
+                        kind, database = "database", name
+                    elif marker.startswith(b"Dumping"):
+                        kind, database = "objects", name
+                    elif marker.startswith(b"Final view"):
+                        kind = "views"
+                    elif marker.startswith(b"Temporary"):
+                        kind = "view"  # Placeholder table standing in for a view until the views are created
+                    else:
+                        kind = "table"
+                    section, writer = open_section(kind, name)
+                    position = match.start() + 1
+                # Keep the last line when it may be the start of a marker completed by the next data
+                keep = data.rfind(b"\n", max(position, len(data) - MARKER_TAIL_SIZE))
+                keep = keep if keep >= 0 else len(data)
+                writer.write(data[position:keep])
+                pending = data[keep:]
+            writer.write(pending)
+            writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+        self._dispatch(section)
+
+    def _queue_files(self, backup_folder, dump_info):
+        """Loads the files of a parallel backup: databases first, then the tables largest first, then views and routines."""
+        extension = COMPRESSION_EXTENSIONS[dump_info["compression"]]
+        for database in dump_info["databases"]:
+            self._dispatch(RestoreSection("database", None, database,
+                                          os.path.join(backup_folder, safe_file_name(database), "_database.sql" + extension), False))
+        for table in sorted(dump_info["tables"], key=lambda table: table["bytes_in"], reverse=True):
+            self._dispatch(RestoreSection("table", None, table["table"], os.path.join(backup_folder, table["file"]), False))
+        for database in dump_info["databases"]:
+            self._dispatch(RestoreSection("views", None, database,
+                                          os.path.join(backup_folder, safe_file_name(database), "_objects.sql" + extension), False))
+
+    def _dispatch(self, section):
+        """Queues a table section for the loading sessions, or loads any other section on a session of its own."""
+        self._check()
+        if section.kind in ("table", "view"):
+            if not self.sessions:
+                for _ in range(self.workers):
+                    thread = threading.Thread(target=self._run_session, daemon=True)
+                    thread.start()
+                    self.sessions.append(thread)
+            with self.condition:
+                self.pending += 1
+                if section.temporary:
+                    self.spooled += os.path.getsize(section.path)
+            self.sections.put(section)
+            return
+
+        if section.kind == "views":
+            self._wait_for(lambda: self.pending == 0)  # Views need the tables they select from
+        if section.kind == "header":
+            # Loaded once as it is, GTID_PURGED included. The sessions only repeat its session settings.
+            with open_dump_file(section.path) as f:
+                header = f.read()
+            self.prefix = b"".join(line for line in header.splitlines(keepends=True) if b"GTID_PURGED" not in line)
+            chunks = [header]
+        else:
+            chunks = chain([self.prefix, self.settings, self._use(section)], read_chunks([section.path], self.cancel_event),
+                           [b"\nCOMMIT;\n"])
+        feed_client(self.client_args, chunks)
+        if section.temporary:
+            os.remove(section.path)
+
+    def _use(self, section):
+        """Returns the USE statement selecting the database of a section."""
+        return f"USE {quote_identifier(section.database)};\n".encode("utf-8") if section.database is not None else b""
+
+    def _run_session(self):
+        """Runs one loading session until the queue is closed, on its own thread."""
+        current = {}
+        try:
+            feed_client(self.client_args, self._session_input(current))
+        except BackupError as e:
+            section = current.get("section")
+            if section is not None and not isinstance(e, BackupCancelled):
+                e = BackupError(f"Loading {section.database + '.' if section.database else ''}{section.name} failed: {e}")
+            with self.condition:
+                if self.failure is None:
+                    self.failure = e
+                self.condition.notify_all()
+            self.stopping.set()
+
+    def _session_input(self, current):
+        """Yields the SQL of the sections taken from the queue by one session."""
+        yield self.prefix + self.settings
+        while True:
+            section = self.sections.get()
+            if section is None:
+                return
+            current["section"] = section
+            rows = 0
+            try:
+                for data in self._section_input(section):
+                    new_rows = data.count(b"),(") + data.count(b"INSERT INTO ")
+                    rows += new_rows
+                    self._add_progress(len(data), new_rows)
+                    yield data
+            finally:
+                if section.temporary:
+                    size = os.path.getsize(section.path)
+                    os.remove(section.path)
+                else:
+                    size = 0
+                with self.condition:
+                    self.pending -= 1
+                    self.spooled -= size
+                    self.condition.notify_all()
+            current.pop("section")
+            if section.kind != "table":
+                continue
+            with self.condition:
+                self.tables_done += 1
+            self.log(f"Loaded {section.database + '.' if section.database else ''}{section.name}: {rows:,} rows")
+
+    def _section_input(self, section):
+        """Yields the SQL of a table section, with its secondary indexes created after its rows."""
+        yield self._use(section)
+        head = b""
+        alter = b""
+        for data in read_chunks([section.path], self.cancel_event):
+            if self.stopping.is_set():
+                raise BackupCancelled("The restore was stopped.")
+            if head is not None:
+                head += data
+                if len(head) < RESTORE_HEAD_SIZE and CREATE_TABLE_PATTERN.search(head) is None:
+                    continue
+                data, alter = self._defer_indexes(head, section.name)
+                head = None
+            yield data
+        if head:
+            head, alter = self._defer_indexes(head, section.name)
+            yield head
+        yield b"\nCOMMIT;\n" + alter
+
+    @staticmethod
+    def _defer_indexes(head, table):
+        """Applies defer_secondary_indexes to the CREATE TABLE statement in the first bytes of a section."""
+        match = CREATE_TABLE_PATTERN.search(head)
+        if match is None:
+            return head, b""
+        create_table, alter = defer_secondary_indexes(match.group(0), table)
+        return head[:match.start()] + create_table + head[match.end():], alter
+
+    def _add_progress(self, size, rows):
+        """Counts the bytes and rows sent by a session and reports the progress when it is due."""
+        with self.condition:
+            self.bytes_loaded += size
+            self.rows += rows
+            now = time.perf_counter()
+            report = self.progress is not None and now >= self.next_report
+            if report:
+                self.next_report = now + PROGRESS_INTERVAL
+                state = (self.rows, self.bytes_loaded, self.bytes_total, now - self.start_time)
+        if report:
+            self.progress(*state)
+
+    def _check(self):
+        """Raises the first session error, or BackupCancelled once the restore is cancelled."""
+        if self.failure is not None:
+            raise self.failure
+        if self.cancel_event.is_set():
+            raise BackupCancelled("The restore was cancelled.")
+
+    def _wait_for(self, predicate):
+        """Waits until predicate() is true, raising if a session fails or the restore is cancelled meanwhile."""
+        with self.condition:
+            while not predicate():
+                self._check()
+                self.condition.wait(CANCEL_CHECK_INTERVAL)
+
+    def _stop_sessions(self):
+        """Closes the queue and waits for the sessions to load what they took and exit."""
+        for _ in self.sessions:
+            self.sections.put(None)
+        for thread in self.sessions:
+            thread.join()
+
+
+def restore_point_in_time(user, password, backup_dir, until=None, host=None, port=None, skip_gtids=False, log=None,
+                          cancel_event=None, mysql_client="mysql", mysqlbinlog="mysqlbinlog", workers=1, progress=None,
+                          skip_binlog=False):
+    """
+    Restores a server from the latest full backup taken before a point in time, then replays the binary log
+    events of the following incremental backups up to that point. With several workers the full backup is
+    loaded table by table over several sessions by a ParallelRestorer.
+
+    Args:
+        user (str): MySQL user.
+        password (str): MySQL password.
+        backup_dir (str): The backup directory.
+        until (datetime.datetime): Stop replaying at this local time, defaults to replaying every incremental backup.
+        host (str): Server host.
+        port (int): Server port.
+        skip_gtids (bool): Pass --skip-gtids to mysqlbinlog, needed when restoring into a MySQL server with GTIDs.
+        log (callable): Called with each log message.
+        cancel_event (threading.Event): Set to stop the restore.
+        mysql_client (str): The mysql executable.
+        mysqlbinlog (str): The mysqlbinlog executable.
+        workers (int): Number of tables loaded at the same time, 1 to load the full backup through one session.
+        progress (callable): Called with (rows, bytes loaded, bytes in the backup, seconds) while the full
+            backup is loaded by several workers.
+        skip_binlog (bool): Do not write the rows of the full backup to the binary log of the server.
+
+    Returns:
+        tuple: (full backup folder, list of incremental backup folders applied).
+    """
+    log = log or (lambda message: None)
+    (full_folder, full_info), incrementals = restore_chain(backup_dir, until)
+    if incrementals and not full_info.get("binlog"):
+        incrementals = []  # Cannot happen for backups made by this module, an incremental always follows a position
+
+    options_path = write_client_options(user, password, host, port)
+    temp_dir = None
+    try:
+        client_args = [mysql_client, f"--defaults-extra-file={options_path}"]
+        if workers > 1:
+            log(f"Loading full backup {os.path.basename(full_folder)} with {workers} sessions")
+            stats = ParallelRestorer(client_args, workers, log, progress, cancel_event, skip_binlog).run(full_folder, full_info)
+            log(f"Loaded {stats['tables']} tables in {stats['seconds']:.1f}s: "
+                + format_restore_progress(stats["rows"], stats["bytes"], 0, stats["seconds"]))
+        else:
+            log(f"Loading full backup {os.path.basename(full_folder)}")
+            client_input = read_chunks(full_backup_files(full_folder, full_info), cancel_event)
+            if skip_binlog:
+                client_input = chain([b"SET SESSION sql_log_bin = 0;\n"], client_input)
+            feed_client(client_args, client_input)
+
+        if incrementals:
+            # mysqlbinlog reads files by name, so the binary logs are decompressed into a temporary folder
+            temp_dir = tempfile.mkdtemp(prefix="mysql_binlogs_")
+            binlog_paths = []
+            for folder, info in incrementals:
+                for name in info["files"]:
+                    binlog_path = os.path.join(temp_dir, os.path.splitext(name)[0] if info["compression"] != "none" else name)
+                    with open(binlog_path, "wb") as f:
+                        for data in read_chunks([os.path.join(folder, name)], cancel_event):
+                            f.write(data)
+                    binlog_paths.append(binlog_path)
+
+            replay_args = [mysqlbinlog, f"--start-position={incrementals[0][1]['binlog_start']['position']}"]
+            if until is not None:
+                replay_args.append(f"--stop-datetime={until.strftime('%Y-%m-%d %H:%M:%S')}")
+            if skip_gtids:
+                replay_args.append("--skip-gtids")
+            log(f"Replaying {len(binlog_paths)} binary logs of {len(incrementals)} incremental backups"
+                + (f" up to {until}" if until else ""))
+            with tempfile.TemporaryFile() as replay_errors:
+                try:
+                    replay = subprocess.Popen(replay_args + binlog_paths, stdout=subprocess.PIPE, stderr=replay_errors)
+                except OSError as e:
+                    raise BackupError(f"Could not start {mysqlbinlog}: {e}") from e
+                try:
+                    feed_client(client_args, None, stdin_process=replay)
+                except BaseException:
+                    replay.kill()
+                    replay.wait()
+                    raise
+                if replay.wait() != 0:
+                    replay_errors.seek(0)
+                    message = replay_errors.read().decode("utf-8", errors="replace").strip()
+                    raise BackupError(f"mysqlbinlog exited with code {replay.returncode}: {message}")
+    finally:
+        os.remove(options_path)
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    return full_folder, [folder for folder, _ in incrementals]
+
+
+def backup_files(backup_folder, dump_info):
+    """Returns the data files of a full, parallel or incremental backup."""
+    if dump_info["mode"] == "incremental":
+        return [os.path.join(backup_folder, name) for name in dump_info["files"]]
+    return full_backup_files(backup_folder, dump_info)
+
+
+def _read_to_end(path):
+    """Decompresses a backup file to its end, which checks its gzip CRC or zstd checksum. Returns its size."""
+    size = 0
+    try:
+        with open_dump_file(path) as f:
+            for data in iter(lambda: f.read(PIPE_READ_SIZE), b""):
+                size += len(data)
+    except DECOMPRESSION_ERRORS as e:
+        raise BackupError(f"{os.path.basename(path)} cannot be read: {e}") from e
+    return size
+
+
+def verify_backups(backup_dir, names=None, workers=None, log=None, cancel_event=None):
+    """
+    Checks that the backups of a backup directory can be read back completely, on several threads.
+
+    Every chunk used by a deduplicated dump is read and compared with its SHA-256, once however many backups
+    share it, and the other files are decompressed to their end. A damaged chunk is renamed to .damaged, so
+    the next backup holding the same data stores it again, which also repairs the older backups using it.
+    The chunk stores are locked while they are checked, waiting for the backups writing into them, so no
+    chunk a running backup has found stored is renamed. The result is recorded as "verified" in the
+    dump_info.json of each backup.
+
+    Args:
+        backup_dir (str): The backup directory.
+        names (iterable): Names of the backup folders to check, defaults to all of them.
+        workers (int): Number of files or chunks checked at the same time, defaults to the number of CPUs.
+        log (callable): Called with each log message.
+        cancel_event (threading.Event): Set to stop checking.
+
+    Returns:
+        dict: Backup folder -> list of the problems found in it, empty when the backup is readable.
+    """
+    log = log or (lambda message: None)
+    backups = [(folder, info) for folder, info in list_backups(backup_dir)
+               if names is None or os.path.basename(folder) in names]
+    problems = {folder: [] for folder, _ in backups}
+    file_checks = []  # (backup folder, file)
+    chunk_checks = {}  # (store path, digest) -> [ChunkStore, size, backup folders using it]
+    for folder, info in backups:
+        for path in backup_files(folder, info):
+            if not path.endswith(MANIFEST_EXTENSION):
+                file_checks.append((folder, path))
+                continue
+            try:
+                store, manifest = read_manifest(path)
+            except (OSError, ValueError, KeyError) as e:
+                problems[folder].append(f"{os.path.basename(path)} cannot be read: {e}")
+                continue
+            if sum(size for _, size in manifest["chunks"]) != manifest["bytes"]:
+                problems[folder].append(f"{os.path.basename(path)} lists chunks that do not add up to its size")
+            for digest, size in manifest["chunks"]:
+                check = chunk_checks.setdefault((store.path, digest), [store, size, set()])
+                check[2].add(folder)
+    store_locks = []
+    for store_path in sorted({store_path for store_path, _ in chunk_checks}):
+        store_lock = FileLock(store_path + CHUNK_STORE_LOCK_EXTENSION)
+        if not store_lock.acquire(blocking=False):
+            log(f"Waiting for the backups writing into {store_path}")
+            if not store_lock.acquire():
+                for held in store_locks:
+                    held.release()
+                raise BackupError(f"Could not lock the chunk store {store_path}")
+        store_locks.append(store_lock)
+    try:
+        return _check_backups(backups, problems, file_checks, chunk_checks, workers, log, cancel_event)
+    finally:
+        for store_lock in store_locks:
+            store_lock.release()
+
+
+def _check_backups(backups, problems, file_checks, chunk_checks, workers, log, cancel_event):
+    """Reads the files and chunks listed by verify_backups and records the result in each backup."""
+    log(f"Checking {len(file_checks)} files and {len(chunk_checks)} chunks of {len(backups)} backups")
+
+    def check_file(path):
+        if cancel_event is not None and cancel_event.is_set():
+            raise BackupCancelled("The verification was cancelled.")
+        _read_to_end(path)
+
+    def check_chunk(store, digest, size):
+        if cancel_event is not None and cancel_event.is_set():
+            raise BackupCancelled("The verification was cancelled.")
+        try:
+            store.get(digest, size)
+        except BackupError:
+            path = store.chunk_path(digest)
+            if os.path.exists(path):
+                os.replace(path, path + ".damaged")
+            raise
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        futures = {executor.submit(check_file, path): ([folder], os.path.basename(path)) for folder, path in file_checks}
+        futures.update({executor.submit(check_chunk, store, digest, size): (sorted(folders), None)
+                        for (_, digest), (store, size, folders) in chunk_checks.items()})
+        try:
+            for future in as_completed(futures):
+                folders, _ = futures[future]
+                try:
+                    future.result()
+                except BackupCancelled:
+                    raise
+                except BackupError as e:
+                    for folder in folders:
+                        problems[folder].append(str(e))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    verified_at = datetime.datetime.now().isoformat(timespec="seconds")
+    for folder, info in backups:
+        info["verified"] = {"at": verified_at, "problems": len(problems[folder])}
+        write_dump_info(folder, info)
+        log(f"{os.path.basename(folder)}: " + (f"{len(problems[folder])} problems" if problems[folder] else "ok"))
+    return problems
+
+
+def sandbox_restore(user, password, backup_dir, host=None, port=None, until=None, skip_gtids=False, log=None,
+                    cancel_event=None, mysql_client="mysql", mysqlbinlog="mysqlbinlog"):
+    """
+    Restores the latest backup chain of a backup directory into a scratch server with restore_point_in_time,
+    streaming it from the backup files, then lists the tables found on that server. For a parallel backup the
+    tables are compared with the ones it dumped. The databases of the scratch server are overwritten.
+
+    Args:
+        user (str): MySQL user of the scratch server.
+        password (str): MySQL password of the scratch server.
+        backup_dir (str): The backup directory.
+        host (str): Host of the scratch server.
+        port (int): Port of the scratch server.
+        until (datetime.datetime): Restore up to this point in time, defaults to the latest backup.
+        skip_gtids (bool): Pass --skip-gtids to mysqlbinlog.
+        log (callable): Called with each log message.
+        cancel_event (threading.Event): Set to stop the restore.
+        mysql_client (str): The mysql executable.
+        mysqlbinlog (str): The mysqlbinlog executable.
+
+    Returns:
+        dict: {"full": restored full backup folder, "incrementals": number of incremental backups replayed,
+        "tables": number of tables on the server, "missing": "database.table" names dumped but not restored,
+        "seconds": duration of the restore}.
+    """
+    start_time = time.perf_counter()
+    full_folder, incremental_folders = restore_point_in_time(user, password, backup_dir, until, host, port, skip_gtids,
+                                                             log, cancel_event, mysql_client, mysqlbinlog)
+    seconds = time.perf_counter() - start_time
+    try:
+        connection = connection_factory(user, password, host, port)()
+        try:
+            restored = {(table.database, table.table) for table in list_tables(connection)}
+        finally:
+            close_connection(connection)
+    except mysql.connector.Error as e:
+        raise BackupError(f"Could not list the restored tables: {e}") from e
+
+    with open(os.path.join(full_folder, DUMP_INFO_NAME), encoding="utf-8") as f:
+        full_info = json.load(f)
+    dumped = {(table["database"], table["table"]) for table in full_info.get("tables", [])}
+    return {"full": full_folder, "incrementals": len(incremental_folders), "tables": len(restored),
+            "missing": sorted(f"{database}.{table}" for database, table in dumped - restored), "seconds": round(seconds, 3)}
+
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    "backup" takes a full, parallel or incremental backup into a new backup_<timestamp> folder, "restore" loads
+    the latest full backup and replays the incremental backups after it, up to a point in time, and "verify"
+    checks that the backups can be read back, optionally restoring them into a scratch server.
+
+    Args:
+        argv (list): Command line arguments, defaults to sys.argv[1:].
+
+    Returns:
+        int: The process exit code.
+    """
+    parser = argparse.ArgumentParser(description="Back up MySQL databases into compressed dump files and restore them.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    # Connection settings shared by every command
+    server_parser = argparse.ArgumentParser(add_help=False)
+    server_parser.add_argument("--user", default="root", help="MySQL user (default: root)")
+    server_parser.add_argument("--password", help="MySQL password, prompted for when omitted")
+    server_parser.add_argument("--host", help="Server host")
+    server_parser.add_argument("--port", type=int, help="Server port")
+    server_parser.add_argument("--backup-dir", required=True, help="Directory holding the backup folders")
+    server_parser.add_argument("--mysqlbinlog", default="mysqlbinlog", help="The mysqlbinlog executable")
+
+    backup_parser = commands.add_parser("backup", parents=[server_parser], help="Back up into a new backup_<timestamp> folder")
+    backup_parser.add_argument("--compression", choices=list(COMPRESSION_EXTENSIONS), default=DEFAULT_COMPRESSION,
+                               help="Compression of the dump (default: %(default)s)")
+    backup_parser.add_argument("--threads", type=int, default=None, help="Compression threads (default: number of CPUs)")
+    backup_parser.add_argument("--parallel", type=int, default=0, metavar="WORKERS",
+                               help="Dump tables concurrently over this many connections, one file per table (default: one mysqldump)")
+    backup_parser.add_argument("--databases", nargs="+", help="Databases dumped by --parallel (default: all non-system databases)")
+    backup_parser.add_argument("--incremental", action="store_true",
+                               help="Only copy the binary logs written since the latest backup")
+    backup_parser.add_argument("--dedup", action="store_true",
+                               help="Store the dump as deduplicated chunks shared with the other backups of the directory")
+    backup_parser.add_argument("--mysqldump", default="mysqldump", help="The mysqldump executable")
+
+    restore_parser = commands.add_parser("restore", parents=[server_parser],
+                                         help="Restore the latest full backup and replay the incremental backups after it")
+    restore_parser.add_argument("--until", type=datetime.datetime.fromisoformat, metavar="'YYYY-MM-DD HH:MM:SS'",
+                                help="Point in time to restore to, in the server's local time (default: latest)")
+    restore_parser.add_argument("--skip-gtids", action="store_true", help="Replay binary logs without their GTIDs")
+    restore_parser.add_argument("--workers", type=int, default=4,
+                                help="Tables of the full backup loaded at the same time, 1 for a single session (default: %(default)s)")
+    restore_parser.add_argument("--skip-binlog", action="store_true",
+                                help="Do not write the restored rows to the server's binary log (needs SUPER)")
+    restore_parser.add_argument("--mysql", default="mysql", help="The mysql client executable")
+    restore_parser.add_argument("--yes", action="store_true", help="Do not ask for confirmation")
+
+    verify_parser = commands.add_parser("verify", parents=[server_parser],
+                                        help="Check every file and chunk of the backups, optionally restore them into a scratch server")
+    verify_parser.add_argument("--backups", nargs="+", metavar="FOLDER", help="Backup folders to check (default: all)")
+    verify_parser.add_argument("--workers", type=int, default=None, help="Files or chunks checked at the same time (default: number of CPUs)")
+    verify_parser.add_argument("--sandbox", action="store_true",
+                               help="Also restore the latest backup chain into the scratch server given by --host and --port")
+    verify_parser.add_argument("--skip-gtids", action="store_true", help="Replay binary logs without their GTIDs")
+    verify_parser.add_argument("--mysql", default="mysql", help="The mysql client executable")
+    verify_parser.add_argument("--yes", action="store_true", help="Do not ask for confirmation")
+    args = parser.parse_args(argv)
+    if args.command == "backup" and args.dedup and (args.parallel or args.incremental):
+        parser.error("--dedup only applies to full backups, not to --parallel or --incremental")
+
+    password = args.password
+    if password is None and (args.command != "verify" or args.sandbox):
+        password = getpass.getpass("MySQL password: ")
+    report_log = lambda message: print(message, file=sys.stderr)
+
+    if args.command == "verify":
+        target = f"{args.host or 'localhost'}:{args.port or 3306}"
+        if args.sandbox and not args.yes and input(f"This overwrites the databases of {target}, "
+                                                   f"which must be a scratch server. Type yes to continue: ").strip() != "yes":
+            return 1
+        try:
+            problems = verify_backups(args.backup_dir, args.backups, args.workers, log=report_log)
+            failed = sum(1 for folder_problems in problems.values() if folder_problems)
+            for folder, folder_problems in problems.items():
+                for problem in folder_problems:
+                    print(f"{os.path.basename(folder)}: {problem}", file=sys.stderr)
+            print(f"{len(problems) - failed} of {len(problems)} backups are readable", file=sys.stderr)
+            if args.sandbox and not failed:
+                result = sandbox_restore(args.user, password, args.backup_dir, args.host, args.port,
+                                         skip_gtids=args.skip_gtids, log=report_log, mysql_client=args.mysql,
+                                         mysqlbinlog=args.mysqlbinlog)
+                print(f"Restored {os.path.basename(result['full'])} and {result['incrementals']} incremental backups "
+                      f"into {target} in {result['seconds']:.1f}s, {result['tables']} tables", file=sys.stderr)
+                if result["missing"]:
+                    print(f"Tables missing after the restore: {', '.join(result['missing'])}", file=sys.stderr)
+                    failed += 1
+        except BackupError as e:
+            print(f"Verification failed: {e}", file=sys.stderr)
+            return 1
+        return 1 if failed else 0
+
+    if args.command == "restore":
+        target = f"{args.host or 'localhost'}:{args.port or 3306}"
+        if not args.yes and input(f"This overwrites the databases of {target}. Type yes to continue: ").strip() != "yes":
+            return 1
+        try:
+            full_folder, incremental_folders = restore_point_in_time(
+                args.user, password, args.backup_dir, args.until, args.host, args.port, args.skip_gtids, log=report_log,
+                mysql_client=args.mysql, mysqlbinlog=args.mysqlbinlog, workers=args.workers, skip_binlog=args.skip_binlog,
+                progress=lambda *state: report_log(format_restore_progress(*state)))
+        except BackupError as e:
+            print(f"Restore failed: {e}", file=sys.stderr)
+            return 1
+        print(f"Restored {os.path.basename(full_folder)} and {len(incremental_folders)} incremental backups", file=sys.stderr)
+        return 0
+
+    def report_progress(bytes_in, bytes_out, seconds):
+        print(format_progress(bytes_in, bytes_out, seconds), file=sys.stderr)
+
+    def report_table(done, total, table, stats):
+        print(f"[{done}/{total}] {table.database}.{table.table}: {format_progress(stats.bytes_in, stats.bytes_out, stats.seconds)}",
+              file=sys.stderr)
+
+    try:
+        if args.incremental:
+            dump_info = backup_incremental(args.user, password, args.backup_dir, args.host, args.port, args.compression,
+                                           args.threads, log=report_log, mysqlbinlog=args.mysqlbinlog)
+            print(f"Incremental backup of {len(dump_info['files'])} binary logs written to {dump_info['folder']}", file=sys.stderr)
+            return 0
+        if args.parallel:
+            dump_info = backup_tables_parallel(args.user, password, args.backup_dir, args.host, args.port, args.parallel,
+                                               args.databases, args.compression, args.threads, progress=report_table,
+                                               log=report_log)
+            print(f"Backup of {len(dump_info['tables'])} tables written to {dump_info['folder']} in {dump_info['seconds']:.1f}s",
+                  file=sys.stderr)
+            return 0
+        stats = backup_all_databases(args.user, password, args.backup_dir, args.host, args.port, args.compression,
+                                     args.threads, progress=report_progress, mysqldump=args.mysqldump, dedup=args.dedup)
+    except BackupError as e:
+        print(f"Backup failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Backup written to {stats.path} in {stats.seconds:.1f}s", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# [END OF SCRIPT mysql_backup_core.py]
@@ -0,0 +1,331 @@
+# [START OF SCRIPT mysql_backup_orchestrator.py]
+# SCRIPT DETAILS: Batch backup of the MySQL servers listed in an inventory file.
+# It backs up several servers at a time under global read and disk write rates, keeps the status and timings
+# of every server and writes a summary report, e.g.:
+#   python mysql_backup_orchestrator.py check inventory.json
+#   python mysql_backup_orchestrator.py backup inventory.json --max-concurrent 4 --max-read-mb 200 --max-write-mb 100
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from mysql_backup_core import (BACKUP_LOCK_NAME, COMPRESSION_EXTENSIONS, DEFAULT_COMPRESSION, DUMP_INFO_NAME, METADATA_CACHE,
+                               BackupCancelled, BackupError, FileLock, TransferLimits, get_pool, safe_file_name)
+from mysql_backup_scheduler import BACKUP_MODES, resolve_credential, run_backup_job
+
+# Settings a server of the inventory can set, or take from the inventory's "defaults"
+SERVER_SETTINGS = ("name", "host", "port", "user", "password", "mode", "compression", "threads", "workers", "databases",
+                   "dedup", "backup_dir")
+DEFAULT_MAX_CONCURRENT = 4  # Servers backed up at the same time
+REPORT_PREFIX = "batch_report_"
+
+
+def load_inventory(path):
+    """
+    Reads an inventory file.
+
+    The file is JSON with a "servers" list. Each server has a unique "name" and takes the settings it does not
+    set from "defaults": host, port, user, password (a credential reference, see resolve_credential), mode
+    ("full", "parallel" or "incremental"), compression, threads, workers and databases (parallel mode), dedup
+    (full mode) and backup_dir, which defaults to <backup_root>/<name>. "max_concurrent", "max_read_mb_per_s" and
+    "max_write_mb_per_s" set the batch limits. Relative paths are relative to the inventory file.
+
+    Args:
+        path (str): The inventory file.
+
+    Returns:
+        dict: {"servers": [server dicts], "backup_root": ..., "max_concurrent": ..., "max_read_mb_per_s": ...,
+        "max_write_mb_per_s": ...}.
+
+    Raises:
+        ValueError: If the inventory is invalid.
+    """
+    with open(path, encoding="utf-8") as f:
+        inventory = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    backup_root = os.path.join(base_dir, os.path.expanduser(inventory.get("backup_root", "backups")))
+    defaults = {"user": "root", "mode": "full", "compression": DEFAULT_COMPRESSION, "workers": 4}
+    defaults.update(inventory.get("defaults", {}))
+
+    servers = []
+    for entry in inventory.get("servers", []):
+        server = {**defaults, **entry}
+        name = server.get("name")
+        if not name or any(other["name"] == name for other in servers):
+            raise ValueError(f"Every server needs a unique name, found {name!r} twice or empty.")
+        unknown = sorted(set(server) - set(SERVER_SETTINGS))
+        if unknown:
+            raise ValueError(f"{name}: unknown settings {', '.join(unknown)}.")
+        if server["mode"] not in BACKUP_MODES:
+            raise ValueError(f"{name}: unknown mode {server['mode']!r}, use one of {', '.join(BACKUP_MODES)}.")
+        if server["compression"] not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f"{name}: unknown compression {server['compression']!r}.")
+        if server.get("dedup") and server["mode"] != "full":
+            raise ValueError(f"{name}: dedup is only available in full mode.")
+        backup_dir = server.get("backup_dir") or os.path.join(backup_root, safe_file_name(name))
+        server["backup_dir"] = os.path.join(base_dir, os.path.expanduser(backup_dir))
+        servers.append(server)
+    if not servers:
+        raise ValueError("The inventory lists no servers.")
+
+    return {"servers": servers, "backup_root": backup_root,
+            "max_concurrent": inventory.get("max_concurrent", DEFAULT_MAX_CONCURRENT),
+            "max_read_mb_per_s": inventory.get("max_read_mb_per_s"),
+            "max_write_mb_per_s": inventory.get("max_write_mb_per_s")}
+
+
+def backup_sizes(backup_folder):
+    """Returns the (uncompressed, compressed) bytes of a backup from its dump_info.json."""
+    with open(os.path.join(backup_folder, DUMP_INFO_NAME), encoding="utf-8") as f:
+        dump_info = json.load(f)
+    if dump_info.get("mode") == "parallel":
+        return (sum(table["bytes_in"] for table in dump_info["tables"]),
+                sum(table["bytes_out"] for table in dump_info["tables"]))
+    return dump_info.get("bytes_in", 0), dump_info.get("bytes_out", 0)
+
+
+class BatchOrchestrator:
+    """
+    Backs up the servers of an inventory, max_concurrent at a time, under read and disk write rates shared by
+    all of them.
+
+    The status of each server goes from "pending" through "running" to "ok", "failed", "skipped" (its backup
+    directory is locked by another backup) or "cancelled", with its timings and sizes. A failing server does
+    not stop the others.
+    """
+
+    def __init__(self, servers, max_concurrent=DEFAULT_MAX_CONCURRENT, limits=None, log=None, on_status=None,
+                 cancel_event=None):
+        """
+        Args:
+            servers (list): Server dicts, see load_inventory.
+            max_concurrent (int): Servers backed up at the same time.
+            limits (TransferLimits): Read and write rates shared by all the backups.
+            log (callable): Called with each log message, from the backup threads.
+            on_status (callable): Called with a copy of a server's status each time it changes.
+            cancel_event (threading.Event): Set to cancel the running backups and skip the pending ones.
+        """
+        self.servers = servers
+        self.max_concurrent = max(1, max_concurrent)
+        self.limits = limits
+        self.log = log or (lambda message: None)
+        self.on_status = on_status or (lambda status: None)
+        self.cancel_event = cancel_event or threading.Event()
+        self.lock = threading.Lock()
+        self.statuses = {server["name"]: {"name": server["name"], "host": server.get("host") or "localhost",
+                                          "port": server.get("port") or 3306, "mode": server["mode"], "status": "pending",
+                                          "started": None, "finished": None, "seconds": None, "bytes_in": None,
+                                          "bytes_out": None, "folder": None, "message": ""}
+                         for server in servers}
+
+    def run(self):
+        """
+        Backs up every server and waits for all of them.
+
+        Returns:
+            dict: The summary, see summary().
+        """
+        started = datetime.datetime.now()
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrent, len(self.servers))) as executor:
+            list(executor.map(self.backup_server, self.servers))
+        return self.summary(started, time.perf_counter() - start_time)
+
+    def _set_status(self, name, **changes):
+        """Updates the status of a server and reports it."""
+        with self.lock:
+            self.statuses[name].update(changes)
+            status = dict(self.statuses[name])
+        self.on_status(status)
+
+    def backup_server(self, server):
+        """
+        Backs up one server into its backup directory. Runs on a batch thread.
+
+        Args:
+            server (dict): The server.
+        """
+        name = server["name"]
+        if self.cancel_event.is_set():
+            self._set_status(name, status="cancelled", message="Cancelled before it started")
+            return
+        started = datetime.datetime.now()
+        start_time = time.perf_counter()
+        self._set_status(name, status="running", started=started.isoformat(timespec="seconds"))
+        self.log(f"{name}: {server['mode']} backup started")
+        result = {"status": "failed"}
+        try:
+            job = dict(server, password_ref=server.get("password"))  # Resolved by run_backup_job
+            os.makedirs(server["backup_dir"], exist_ok=True)
+            backup_lock = FileLock(os.path.join(server["backup_dir"], BACKUP_LOCK_NAME))
+            if not backup_lock.acquire(blocking=False):
+                result = {"status": "skipped", "message": "Another backup is writing to its backup directory"}
+            else:
+                try:
+                    folder, message = run_backup_job(job, self.cancel_event, lambda line: self.log(f"{name}: {line}"),
+                                                     self.limits)
+                finally:
+                    backup_lock.release()
+                bytes_in, bytes_out = backup_sizes(folder)
+                result = {"status": "ok", "message": message, "folder": folder, "bytes_in": bytes_in, "bytes_out": bytes_out}
+        except BackupCancelled:
+            result = {"status": "cancelled", "message": "The backup was cancelled"}
+        except (BackupError, ValueError, OSError) as e:
+            result["message"] = str(e)
+        except Exception as e:
+            result["message"] = repr(e)
+        self._set_status(name, finished=datetime.datetime.now().isoformat(timespec="seconds"),
+                         seconds=round(time.perf_counter() - start_time, 3), **result)
+        self.log(f"{name}: {result['status']}, {result.get('message', '')}")
+
+    def summary(self, started, seconds):
+        """
+        Returns the summary of a batch.
+
+        Args:
+            started (datetime.datetime): When the batch started.
+            seconds (float): How long it took.
+
+        Returns:
+            dict: {"started", "seconds", "servers": [statuses], "totals": {status: count, "bytes_in", "bytes_out"}}.
+        """
+        with self.lock:
+            statuses = [dict(status) for status in self.statuses.values()]
+        totals = {status: sum(1 for server in statuses if server["status"] == status)
+                  for status in ("ok", "failed", "skipped", "cancelled")}
+        totals["bytes_in"] = sum(server["bytes_in"] or 0 for server in statuses)
+        totals["bytes_out"] = sum(server["bytes_out"] or 0 for server in statuses)
+        return {"started": started.isoformat(timespec="seconds"), "seconds": round(seconds, 3), "servers": statuses,
+                "totals": totals}
+
+
+def format_report(summary):
+    """Returns a batch summary as a text table."""
+    lines = [f"Batch started {summary['started']}, {summary['seconds']:.1f}s",
+             f"{'server':<24}{'mode':<13}{'status':<11}{'seconds':>9}{'MB in':>10}{'MB out':>10}{'MB/s':>8}  message"]
+    for server in summary["servers"]:
+        mb_in = (server["bytes_in"] or 0) / (1024 * 1024)
+        mb_out = (server["bytes_out"] or 0) / (1024 * 1024)
+        seconds = server["seconds"] or 0
+        rate = f"{mb_in / seconds:.1f}" if seconds and server["status"] == "ok" else "-"
+        lines.append(f"{server['name']:<24}{server['mode']:<13}{server['status']:<11}{seconds:>9.1f}{mb_in:>10.1f}"
+                     f"{mb_out:>10.1f}{rate:>8}  {server['message']}")
+    totals = summary["totals"]
+    lines.append(f"{totals['ok']} ok, {totals['failed']} failed, {totals['skipped']} skipped, {totals['cancelled']} cancelled, "
+                 f"{totals['bytes_in'] / (1024 * 1024):.1f} MB dumped into {totals['bytes_out'] / (1024 * 1024):.1f} MB")
+    return "\n".join(lines)
+
+
+def write_report(summary, report_dir):
+    """
+    Writes a batch summary as batch_report_<timestamp>.json and .txt.
+
+    Args:
+        summary (dict): The summary, see BatchOrchestrator.summary.
+        report_dir (str): The directory receiving the reports.
+
+    Returns:
+        str: Path of the JSON report.
+    """
+    os.makedirs(report_dir, exist_ok=True)
+    timestamp = datetime.datetime.fromisoformat(summary["started"]).strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(report_dir, f"{REPORT_PREFIX}{timestamp}")
+    with open(path + ".json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    with open(path + ".txt", "w", encoding="utf-8") as f:
+        f.write(format_report(summary) + "\n")
+    return path + ".json"
+
+
+def check_servers(servers, max_concurrent=DEFAULT_MAX_CONCURRENT):
+    """
+    Connects to every server through its connection pool and reads its catalog, to check the inventory
+    before a batch.
+
+    Args:
+        servers (list): Server dicts, see load_inventory.
+        max_concurrent (int): Servers checked at the same time.
+
+    Returns:
+        list: One line per server with its version and size, or the error.
+    """
+    def check(server):
+        try:
+            password = resolve_credential(server.get("password"), server["user"])
+            catalog = METADATA_CACHE.catalog(get_pool(server["user"], password, server.get("host"), server.get("port")))
+        except (BackupError, ValueError) as e:
+            return f"{server['name']}: FAILED {e}"
+        data_mb = sum(table.data_bytes for table in catalog.tables) / (1024 * 1024)
+        return (f"{server['name']}: MySQL {catalog.version}, {len(catalog.databases)} databases, "
+                f"{len(catalog.tables)} tables, about {data_mb:.1f} MB of data")
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrent, len(servers)))) as executor:
+        return list(executor.map(check, servers))
+
+
+def main(argv=None):
+    """
+    Command line entry point: checks or backs up the servers of an inventory.
+
+    Args:
+        argv (list): Command line arguments, defaults to sys.argv[1:].
+
+    Returns:
+        int: The process exit code, 1 if a server failed.
+    """
+    parser = argparse.ArgumentParser(description="Back up the MySQL servers of an inventory file.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    inventory_parser = argparse.ArgumentParser(add_help=False)
+    inventory_parser.add_argument("inventory", help="The inventory file")
+    inventory_parser.add_argument("--only", nargs="+", metavar="NAME", help="Only these servers")
+    inventory_parser.add_argument("--max-concurrent", type=int, help="Servers handled at the same time (default: from the inventory or 4)")
+
+    commands.add_parser("check", parents=[inventory_parser], help="Connect to every server and show its size")
+    backup_parser = commands.add_parser("backup", parents=[inventory_parser], help="Back up every server")
+    backup_parser.add_argument("--max-read-mb", type=float, help="MB per second read from all the servers together")
+    backup_parser.add_argument("--max-write-mb", type=float, help="MB per second written to disk by all the backups together")
+    backup_parser.add_argument("--report-dir", help="Directory receiving the summary report (default: the backup root)")
+    args = parser.parse_args(argv)
+
+    try:
+        inventory = load_inventory(args.inventory)
+    except (OSError, ValueError) as e:
+        print(f"Invalid inventory: {e}", file=sys.stderr)
+        return 1
+    servers = inventory["servers"]
+    if args.only:
+        servers = [server for server in servers if server["name"] in args.only]
+    max_concurrent = args.max_concurrent or inventory["max_concurrent"]
+
+    if args.command == "check":
+        lines = check_servers(servers, max_concurrent)
+        print("\n".join(lines))
+        return 1 if any(": FAILED " in line for line in lines) else 0
+
+    limits = TransferLimits(args.max_read_mb or inventory["max_read_mb_per_s"], args.max_write_mb or inventory["max_write_mb_per_s"])
+    orchestrator = BatchOrchestrator(servers, max_concurrent, limits,
+                                     log=lambda message: print(f"{datetime.datetime.now():%H:%M:%S} {message}", file=sys.stderr, flush=True))
+
+    def cancel(signal_number, frame):
+        orchestrator.cancel_event.set()
+
+    signal.signal(signal.SIGINT, cancel)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, cancel)
+    summary = orchestrator.run()
+    report_path = write_report(summary, args.report_dir or inventory["backup_root"])
+    print(format_report(summary))
+    print(f"Report written to {report_path}", file=sys.stderr)
+    return 0 if summary["totals"]["ok"] == len(servers) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# [END OF SCRIPT mysql_backup_orchestrator.py]
@@ -0,0 +1,617 @@
+# [START OF SCRIPT mysql_backup_scheduler.py]
+# SCRIPT DETAILS: Backup scheduler of the MySQL Backup GUI.
+# It runs the backups saved as Hourly, Daily or Weekly jobs, inside the GUI or headless as a daemon, and prunes
+# the old backup folders of each job after a successful run, e.g.:
+#   python mysql_backup_scheduler.py add --name nightly --user backup --backup-dir /var/backups/mysql --frequency Daily --at 02:30
+#   python mysql_backup_scheduler.py add --name binlogs --user backup --backup-dir /var/backups/mysql --mode incremental --frequency Hourly --at 15 --password-ref env:MYSQL_BACKUP_PASSWORD
+#   python mysql_backup_scheduler.py daemon --max-concurrent 2 --jitter 300
+
+import os
+import sys
+import json
+import random
+import signal
+import getpass
+import argparse
+import datetime
+import tempfile
+import threading
+from collections import namedtuple
+
+try:
+    import keyring  # Optional, pip install keyring
+except ImportError:
+    keyring = None
+
+from mysql_backup_core import (BACKUP_LOCK_NAME, COMPRESSION_EXTENSIONS, DEFAULT_COMPRESSION, BackupCancelled, BackupError,
+                               FileLock, backup_all_databases, backup_incremental, backup_tables_parallel, prune_backups)
+
+DEFAULT_JOBS_PATH = os.path.join(os.path.expanduser("~"), ".mysql_backup", "jobs.json")
+FREQUENCIES = ("Hourly", "Daily", "Weekly")
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+BACKUP_MODES = ("full", "parallel", "incremental")
+TICK_INTERVAL = 5.0  # Seconds between two checks for due jobs
+DEFAULT_MAX_CONCURRENT = 2  # Backups running at the same time
+DEFAULT_MAX_JITTER = 120  # Longest random delay in seconds added to the start of a due run
+DEFAULT_KEEP_FULL = 7  # Full backups kept with their incremental backups by the retention policy
+KEYRING_SERVICE = "mysql_backup"  # Keyring service holding the passwords of the jobs, see store_keyring_password
+HISTORY_SIZE = 200  # Runs kept in the history of the job file
+
+# When a job runs: minute for every frequency, hour for Daily and Weekly, weekday (0 = Monday) for Weekly
+Schedule = namedtuple("Schedule", ["frequency", "weekday", "hour", "minute"])
+
+
+def resolve_credential(reference, user=None):
+    """
+    Returns the password a credential reference points to. Neither the job file nor the inventory of the
+    orchestrator holds the passwords themselves.
+
+    Args:
+        reference (str): "env:NAME" (an environment variable), "file:PATH" (the first line of a file) or
+            "keyring:SERVICE" (the system keyring, needs the keyring package). None for an empty password.
+        user (str): The MySQL user, looked up in the keyring service.
+
+    Returns:
+        str: The password.
+
+    Raises:
+        ValueError: If the reference is malformed or points to nothing.
+    """
+    if reference is None:
+        return ""
+    kind, _, value = str(reference).partition(":")
+    if kind == "env":
+        if value not in os.environ:
+            raise ValueError(f"The environment variable {value} is not set.")
+        return os.environ[value]
+    if kind == "file":
+        try:
+            with open(os.path.expanduser(value), encoding="utf-8") as f:
+                return f.readline().rstrip("\r\n")
+        except OSError as e:
+            raise ValueError(f"Could not read the password file: {e}") from e
+    if kind == "keyring":
+        if keyring is None:
+            raise ValueError("keyring: references need the keyring package: pip install keyring")
+        password = keyring.get_password(value, user)
+        if password is None:
+            raise ValueError(f"The keyring service {value} has no password for {user}.")
+        return password
+    raise ValueError("Passwords must be given as references: env:NAME, file:PATH or keyring:SERVICE.")
+
+
+def store_keyring_password(user, password, host=None):
+    """
+    Saves a password in the system keyring, for a job to reference it instead of holding it.
+
+    Args:
+        user (str): The MySQL user.
+        password (str): Its password.
+        host (str): The server host, each host has its own keyring service.
+
+    Returns:
+        str: The credential reference of the password, see resolve_credential.
+
+    Raises:
+        ValueError: If the keyring package is not installed or has no usable keyring.
+    """
+    if keyring is None:
+        raise ValueError("Saving the password needs the keyring package (pip install keyring), "
+                         "or reference it as env:NAME or file:PATH.")
+    service = f"{KEYRING_SERVICE}/{host}" if host else KEYRING_SERVICE
+    try:
+        keyring.set_password(service, user, password)
+    except keyring.errors.KeyringError as e:
+        raise ValueError(f"Could not save the password in the keyring: {e}") from e
+    return f"keyring:{service}"
+
+
+def parse_schedule(frequency, at):
+    """
+    Parses the time of a job as it is typed in the GUI.
+
+    Args:
+        frequency (str): "Hourly", "Daily" or "Weekly".
+        at (str): Minutes past the hour for Hourly ("15"), "HH:MM" for Daily and day and time for Weekly ("Mon 14:00").
+
+    Returns:
+        Schedule: The parsed schedule.
+
+    Raises:
+        ValueError: If the frequency is unknown or the time does not match it.
+    """
+    examples = {"Hourly": "minutes past the hour, e.g. 15", "Daily": "HH:MM, e.g. 02:30", "Weekly": "day and time, e.g. Mon 14:00"}
+    if frequency not in examples:
+        raise ValueError(f"Unknown frequency {frequency!r}, use Hourly, Daily or Weekly.")
+    try:
+        if frequency == "Hourly":
+            minute = int(at)
+            if not 0 <= minute <= 59:
+                raise ValueError
+            return Schedule(frequency, None, None, minute)
+
+        parts = at.split()
+        weekday = [day.lower() for day in WEEKDAYS].index(parts.pop(0)[:3].lower()) if frequency == "Weekly" else None
+        if len(parts) != 1:
+            raise ValueError
+        hour, minute = (int(part) for part in parts[0].split(":"))
+        if not (0 <= hour <= 23 and 0 <= minute <= 59):
+            raise ValueError
+        return Schedule(frequency, weekday, hour, minute)
+    except (ValueError, IndexError):
+        raise ValueError(f"Invalid {frequency} time {at!r}, expected {examples[frequency]}.") from None
+
+
+def next_run_time(schedule, after):
+    """
+    Returns the first time strictly after a given time at which a schedule is due.
+
+    Args:
+        schedule (Schedule): The schedule.
+        after (datetime.datetime): The time to start from, in local time.
+    """
+    candidate = after.replace(minute=schedule.minute, second=0, microsecond=0)
+    if schedule.frequency == "Hourly":
+        step = datetime.timedelta(hours=1)
+    else:
+        candidate = candidate.replace(hour=schedule.hour)
+        step = datetime.timedelta(days=1)
+        if schedule.frequency == "Weekly":
+            candidate += datetime.timedelta(days=(schedule.weekday - candidate.weekday()) % 7)
+            step = datetime.timedelta(days=7)
+    while candidate <= after:
+        candidate += step
+    return candidate
+
+
+class JobStore:
+    """
+    The scheduled jobs, the queue of their due runs and the run history, persisted in a JSON file.
+
+    Every change re-reads the file under a lock and writes it back atomically, so the GUI and a daemon can
+    edit the same file. The jobs only hold references to their MySQL passwords, see resolve_credential,
+    and the file is only readable by its owner.
+    """
+
+    def __init__(self, path=DEFAULT_JOBS_PATH):
+        """
+        Args:
+            path (str): The job file, created on the first change.
+        """
+        self.path = path
+        self.lock = threading.Lock()  # The file lock only keeps other processes out
+
+    def load(self):
+        """Returns the content of the job file: {"jobs": [...], "queue": [...], "history": [...]}."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        for key in ("jobs", "queue", "history"):
+            data.setdefault(key, [])
+        return data
+
+    def update(self, change):
+        """
+        Applies a change to the job file.
+
+        Args:
+            change (callable): Called with the freshly loaded content, which it modifies in place.
+
+        Returns:
+            The return value of change.
+        """
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+        with self.lock, FileLock(self.path + ".lock"):
+            data = self.load()
+            result = change(data)
+            fd, temp_path = tempfile.mkstemp(dir=folder, prefix=".jobs_", suffix=".json")  # Created readable by its owner only
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        return result
+
+    def jobs(self):
+        """Returns the list of jobs."""
+        return self.load()["jobs"]
+
+    def add_job(self, job):
+        """Adds a job, replacing the job of the same name."""
+        def add(data):
+            data["jobs"] = [other for other in data["jobs"] if other["name"] != job["name"]] + [job]
+        self.update(add)
+
+    def remove_job(self, name):
+        """
+        Removes a job and its queued runs.
+
+        Returns:
+            bool: False if there was no job of that name.
+        """
+        def remove(data):
+            count = len(data["jobs"])
+            data["jobs"] = [job for job in data["jobs"] if job["name"] != name]
+            data["queue"] = [entry for entry in data["queue"] if entry["job"] != name]
+            return len(data["jobs"]) < count
+        return self.update(remove)
+
+
+def make_job(name, user, password_ref, backup_dir, frequency, at, mode="full", host=None, port=None,
+             compression=DEFAULT_COMPRESSION, threads=None, workers=4, keep_full=DEFAULT_KEEP_FULL, keep_days=None,
+             dedup=False):
+    """
+    Builds a job after checking its settings.
+
+    Args:
+        name (str): Unique name of the job.
+        user (str): MySQL user.
+        password_ref (str): Reference to the MySQL password, see resolve_credential. None for an empty password.
+        backup_dir (str): Directory receiving the backup folders.
+        frequency (str): "Hourly", "Daily" or "Weekly".
+        at (str): The time of the runs, see parse_schedule.
+        mode (str): "full" (one mysqldump), "parallel" (per table) or "incremental" (binary logs).
+        host (str): Server host.
+        port (int): Server port.
+        compression (str): "zstd", "gzip" or "none".
+        threads (int): Number of compression threads.
+        workers (int): Number of tables dumped at the same time in parallel mode.
+        keep_full (int): Number of full backups kept with their incremental backups.
+        keep_days (float): Also keep the backups of the last keep_days days.
+        dedup (bool): Store full backups as deduplicated chunks, see backup_all_databases.
+
+    Returns:
+        dict: The job.
+
+    Raises:
+        ValueError: If a setting is invalid.
+    """
+    parse_schedule(frequency, at)
+    if not name:
+        raise ValueError("The job needs a name.")
+    if mode not in BACKUP_MODES:
+        raise ValueError(f"Unknown backup mode {mode!r}, use one of {', '.join(BACKUP_MODES)}.")
+    if compression not in COMPRESSION_EXTENSIONS:
+        raise ValueError(f"Unknown compression {compression!r}.")
+    if keep_full < 1:
+        raise ValueError("At least one full backup must be kept.")
+    if dedup and mode != "full":
+        raise ValueError("Deduplicated backups are only available in full mode.")
+    if password_ref is not None and password_ref.partition(":")[0] not in ("env", "file", "keyring"):
+        raise ValueError("Passwords must be given as references: env:NAME, file:PATH or keyring:SERVICE.")
+    return {"name": name, "user": user, "password_ref": password_ref, "host": host, "port": port,
+            "backup_dir": os.path.abspath(backup_dir), "mode": mode, "compression": compression, "threads": threads,
+            "workers": workers, "frequency": frequency, "at": at, "keep_full": keep_full, "keep_days": keep_days,
+            "dedup": dedup, "next_run": None}
+
+
+def run_backup_job(job, cancel_event=None, log=None, limits=None):
+    """
+    Takes the backup of a job.
+
+    Args:
+        job (dict): The job, see make_job.
+        cancel_event (threading.Event): Set to stop the backup.
+        log (callable): Called with each log message.
+        limits (TransferLimits): Read and write rates shared with the other backups of the process.
+
+    Returns:
+        tuple: (backup folder, summary message).
+
+    Raises:
+        ValueError: If the password reference of the job points to nothing.
+    """
+    if "password" in job and "password_ref" not in job:
+        raise ValueError("The job was saved with its password in clear text, save it again to store a reference.")
+    password = resolve_credential(job.get("password_ref"), job["user"])
+    settings = {"host": job.get("host"), "port": job.get("port"), "compression": job["compression"],
+                "threads": job.get("threads"), "log": log, "cancel_event": cancel_event, "limits": limits}
+    if job["mode"] == "parallel":
+        dump_info = backup_tables_parallel(job["user"], password, job["backup_dir"], workers=job.get("workers", 4),
+                                           databases=job.get("databases"), **settings)
+        return dump_info["folder"], f"{len(dump_info['tables'])} tables dumped in {dump_info['seconds']:.1f}s"
+    if job["mode"] == "incremental":
+        dump_info = backup_incremental(job["user"], password, job["backup_dir"], **settings)
+        return dump_info["folder"], f"{len(dump_info['files'])} binary logs copied"
+    stats = backup_all_databases(job["user"], password, job["backup_dir"], dedup=job.get("dedup", False), **settings)
+    return os.path.dirname(stats.path), f"{stats.bytes_out / (1024 * 1024):.1f} MB written in {stats.seconds:.1f}s"
+
+
+class BackupScheduler:
+    """
+    Runs the jobs of a JobStore at their scheduled times.
+
+    A due job is put on the queue persisted in the job file with a random delay of up to max_jitter seconds,
+    so jobs of several servers scheduled at the same time do not all start dumping at once, and at most
+    max_concurrent backups run at the same time. A job is not queued again while its previous run is queued
+    or running, and runs of jobs sharing a backup directory wait for each other. A lock file in the backup
+    directory also keeps out the backups of other processes. A run missed while no scheduler was running is
+    made up once when the scheduler starts. Only one scheduler runs the jobs of a job file at a time.
+    """
+
+    def __init__(self, store, max_concurrent=DEFAULT_MAX_CONCURRENT, max_jitter=DEFAULT_MAX_JITTER, log=None):
+        """
+        Args:
+            store (JobStore): The jobs to run.
+            max_concurrent (int): Number of backups running at the same time.
+            max_jitter (float): Longest random delay in seconds added to the start of a due run.
+            log (callable): Called with each log message, from the scheduler and backup threads.
+        """
+        self.store = store
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_jitter = max(0, max_jitter)
+        self.log = log or (lambda message: None)
+        self.stop_event = threading.Event()
+        self.cancel_event = threading.Event()  # Set to stop the running backups
+        self.running = {}  # Job name -> backup thread
+        self.running_lock = threading.Lock()
+        self.owner_lock = FileLock(store.path + ".scheduler.lock")
+        self.thread = None
+
+    def start(self):
+        """
+        Runs the scheduler on a background thread.
+
+        Raises:
+            BackupError: If another scheduler is already running the jobs of the job file.
+        """
+        self._acquire_owner_lock()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """Runs the scheduler on the calling thread until stop() is called."""
+        self._acquire_owner_lock()
+        self._loop()
+
+    def stop(self, cancel_running=False, timeout=None):
+        """
+        Stops starting new runs.
+
+        Args:
+            cancel_running (bool): Also cancel the running backups, which delete their incomplete files.
+            timeout (float): Seconds to wait for the running backups, None to wait until they end.
+        """
+        self.stop_event.set()
+        if cancel_running:
+            self.cancel_event.set()
+        with self.running_lock:
+            threads = list(self.running.values())
+        for thread in threads:
+            thread.join(timeout)
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def _acquire_owner_lock(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.store.path)), exist_ok=True)
+        if not self.owner_lock.acquire(blocking=False):
+            raise BackupError(f"Another scheduler is already running the jobs of {self.store.path}.")
+
+    def _loop(self):
+        """Checks for due jobs every TICK_INTERVAL seconds until stopped."""
+        self.log(f"Scheduler started with {len(self.store.jobs())} jobs from {self.store.path}")
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    self.tick()
+                except (OSError, ValueError) as e:
+                    self.log(f"Scheduler error: {e}")
+                self.stop_event.wait(TICK_INTERVAL)
+        finally:
+            self.owner_lock.release()
+            self.log("Scheduler stopped")
+
+    def tick(self, now=None):
+        """
+        Queues the jobs that are due and starts the queued runs whose time has come, within the limits.
+
+        Args:
+            now (datetime.datetime): The current time.
+        """
+        now = now or datetime.datetime.now()
+        to_start = []
+
+        def plan(data):
+            with self.running_lock:
+                queued = {entry["job"] for entry in data["queue"]}
+                for job in data["jobs"]:
+                    try:
+                        schedule = parse_schedule(job["frequency"], job["at"])
+                    except ValueError as e:
+                        self.log(f"{job['name']}: {e}")
+                        continue
+                    if job.get("next_run") is None:  # New job, its first run is at the next scheduled time
+                        job["next_run"] = next_run_time(schedule, now).isoformat(timespec="seconds")
+                        continue
+                    if datetime.datetime.fromisoformat(job["next_run"]) > now:
+                        continue
+                    job["next_run"] = next_run_time(schedule, now).isoformat(timespec="seconds")
+                    if job["name"] in queued or job["name"] in self.running:
+                        self.log(f"{job['name']}: skipped, the previous run is still going")
+                        data["history"].append({"job": job["name"], "started": now.isoformat(timespec="seconds"),
+                                                "status": "skipped", "message": "The previous run is still going"})
+                        continue
+                    due = now + datetime.timedelta(seconds=random.uniform(0, self.max_jitter))
+                    data["queue"].append({"job": job["name"], "due": due.isoformat(timespec="seconds")})
+                    queued.add(job["name"])
+                    self.log(f"{job['name']}: queued to start at {due:%H:%M:%S}")
+
+                jobs = {job["name"]: job for job in data["jobs"]}
+                busy_dirs = {os.path.normcase(jobs[name]["backup_dir"]) for name in self.running if name in jobs}
+                for entry in list(data["queue"]):
+                    job = jobs.get(entry["job"])
+                    if job is None:
+                        data["queue"].remove(entry)  # The job was removed
+                        continue
+                    if (len(self.running) >= self.max_concurrent or self.stop_event.is_set()
+                            or datetime.datetime.fromisoformat(entry["due"]) > now):
+                        continue
+                    if job["name"] in self.running or os.path.normcase(job["backup_dir"]) in busy_dirs:
+                        continue  # Waits for the run writing to the same directory
+                    data["queue"].remove(entry)
+                    busy_dirs.add(os.path.normcase(job["backup_dir"]))
+                    self.running[job["name"]] = threading.Thread(target=self.run_job, args=(job,), daemon=True)
+                    to_start.append(job["name"])
+                del data["history"][:-HISTORY_SIZE]
+
+        try:
+            self.store.update(plan)
+        except BaseException:
+            with self.running_lock:
+                for name in to_start:
+                    del self.running[name]
+            raise
+        with self.running_lock:
+            threads = [self.running[name] for name in to_start]
+        for thread in threads:  # Started once their removal from the queue is saved
+            thread.start()
+
+    def run_job(self, job):
+        """
+        Takes the backup of a job, prunes its old backups and records the run in the history.
+        Runs on a backup thread.
+
+        Args:
+            job (dict): The job.
+        """
+        started = datetime.datetime.now()
+        status, message, folder = "failed", "", None
+        self.log(f"{job['name']}: {job['mode']} backup started")
+        try:
+            os.makedirs(job["backup_dir"], exist_ok=True)
+            backup_lock = FileLock(os.path.join(job["backup_dir"], BACKUP_LOCK_NAME))
+            if not backup_lock.acquire(blocking=False):
+                status, message = "skipped", "Another process is backing up into the same directory"
+            else:
+                try:
+                    folder, message = run_backup_job(job, self.cancel_event, lambda line: self.log(f"{job['name']}: {line}"))
+                    status = "ok"
+                    deleted = prune_backups(job["backup_dir"], job.get("keep_full", DEFAULT_KEEP_FULL), job.get("keep_days"))
+                    if deleted:
+                        message += f", pruned {len(deleted)} old backup folders"
+                finally:
+                    backup_lock.release()
+        except BackupCancelled:
+            status, message = "cancelled", "The backup was cancelled"
+        except (BackupError, OSError, ValueError) as e:
+            message = str(e)
+        except Exception as e:
+            message = repr(e)
+        finally:
+            with self.running_lock:
+                self.running.pop(job["name"], None)
+
+        self.log(f"{job['name']}: {status}, {message}")
+        record = {"job": job["name"], "started": started.isoformat(timespec="seconds"),
+                  "finished": datetime.datetime.now().isoformat(timespec="seconds"), "status": status,
+                  "message": message, "folder": folder}
+        try:
+            self.store.update(lambda data: data["history"].append(record))
+        except OSError as e:
+            self.log(f"Could not record the run of {job['name']}: {e}")
+
+
+def main(argv=None):
+    """
+    Command line entry point: manages the jobs of a job file and runs them as a daemon.
+
+    Args:
+        argv (list): Command line arguments, defaults to sys.argv[1:].
+
+    Returns:
+        int: The process exit code.
+    """
+    parser = argparse.ArgumentParser(description="Schedule MySQL backups and run them in the background.")
+    parser.add_argument("--jobs", default=DEFAULT_JOBS_PATH, help="The job file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = commands.add_parser("add", help="Add or replace a job")
+    add_parser.add_argument("--name", required=True, help="Unique name of the job")
+    add_parser.add_argument("--user", default="root", help="MySQL user (default: root)")
+    add_parser.add_argument("--password-ref", help="Reference to the MySQL password: env:NAME, file:PATH or keyring:SERVICE. "
+                                                   "When omitted, the password is prompted for and saved in the keyring")
+    add_parser.add_argument("--host", help="Server host")
+    add_parser.add_argument("--port", type=int, help="Server port")
+    add_parser.add_argument("--backup-dir", required=True, help="Directory receiving the backup folders")
+    add_parser.add_argument("--mode", choices=BACKUP_MODES, default="full", help="Backup mode (default: full)")
+    add_parser.add_argument("--compression", choices=list(COMPRESSION_EXTENSIONS), default=DEFAULT_COMPRESSION)
+    add_parser.add_argument("--threads", type=int, help="Compression threads (default: number of CPUs)")
+    add_parser.add_argument("--workers", type=int, default=4, help="Tables dumped at the same time in parallel mode")
+    add_parser.add_argument("--frequency", choices=FREQUENCIES, required=True)
+    add_parser.add_argument("--at", required=True, help="Minutes past the hour (Hourly), HH:MM (Daily) or 'Mon 14:00' (Weekly)")
+    add_parser.add_argument("--keep", type=int, default=DEFAULT_KEEP_FULL, help="Full backups kept (default: %(default)s)")
+    add_parser.add_argument("--keep-days", type=float, help="Also keep the backups of the last N days")
+    add_parser.add_argument("--dedup", action="store_true", help="Store full backups as deduplicated chunks")
+
+    remove_parser = commands.add_parser("remove", help="Remove a job")
+    remove_parser.add_argument("name")
+
+    commands.add_parser("list", help="List the jobs and their last run")
+
+    daemon_parser = commands.add_parser("daemon", help="Run the jobs until interrupted")
+    daemon_parser.add_argument("--max-concurrent", type=int, default=DEFAULT_MAX_CONCURRENT,
+                               help="Backups running at the same time (default: %(default)s)")
+    daemon_parser.add_argument("--jitter", type=float, default=DEFAULT_MAX_JITTER,
+                               help="Longest random delay in seconds added to each run (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    store = JobStore(args.jobs)
+    if args.command == "add":
+        try:
+            password_ref = args.password_ref
+            if password_ref is None and keyring is None:
+                parser.error("Give --password-ref env:NAME or file:PATH, or pip install keyring to save the password.")
+            if password_ref is None:
+                password_ref = store_keyring_password(args.user, getpass.getpass("MySQL password: "), args.host)
+            job = make_job(args.name, args.user, password_ref, args.backup_dir, args.frequency, args.at, args.mode, args.host,
+                           args.port, args.compression, args.threads, args.workers, args.keep, args.keep_days, args.dedup)
+        except ValueError as e:
+            parser.error(str(e))
+        store.add_job(job)
+        print(f"Job {job['name']} saved to {store.path}")
+        return 0
+
+    if args.command == "remove":
+        if not store.remove_job(args.name):
+            print(f"No job named {args.name}", file=sys.stderr)
+            return 1
+        return 0
+
+    if args.command == "list":
+        data = store.load()
+        last_runs = {record["job"]: record for record in data["history"]}
+        for job in data["jobs"]:
+            last = last_runs.get(job["name"])
+            last_text = f"last {last['status']} at {last['started']}" if last else "never run"
+            print(f"{job['name']}: {job['mode']} {job['frequency']} at {job['at']} into {job['backup_dir']}, "
+                  f"next {job.get('next_run') or 'when the scheduler starts'}, {last_text}")
+        return 0
+
+    scheduler = BackupScheduler(store, args.max_concurrent, args.jitter,
+                                log=lambda message: print(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} {message}", flush=True))
+
+    def shut_down(signal_number, frame):
+        scheduler.stop_event.set()
+        scheduler.cancel_event.set()
+
+    signal.signal(signal.SIGINT, shut_down)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, shut_down)
+    try:
+        scheduler.run()
+    except BackupError as e:
+        print(e, file=sys.stderr)
+        return 1
+    scheduler.stop(cancel_running=True)  # Waits for the cancelled backups to delete their files
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# [END OF SCRIPT mysql_backup_scheduler.py]
@@ -0,0 +1,87 @@
+import datetime
+import os
+
+import pytest
+
+from mysql_backup_core import BackupError, parse_binlog_position, prune_backups, restore_chain, write_dump_info
+
+
+def add_backup(backup_dir, name, mode, created, base=None):
+    folder = os.path.join(backup_dir, f"backup_{name}")
+    os.makedirs(folder)
+    dump_info = {"mode": mode, "created": created}
+    if base is not None:
+        dump_info["base"] = f"backup_{base}"
+    write_dump_info(folder, dump_info)
+    return folder
+
+
+@pytest.fixture
+def backup_dir(tmp_path):
+    """Two full backups, each followed by two incremental backups chained to it."""
+    add_backup(tmp_path, "20240101_0000", "full", "2024-01-01T00:00:00")
+    add_backup(tmp_path, "20240101_0100", "incremental", "2024-01-01T01:00:00", base="20240101_0000")
+    add_backup(tmp_path, "20240101_0200", "incremental", "2024-01-01T02:00:00", base="20240101_0100")
+    add_backup(tmp_path, "20240102_0000", "parallel", "2024-01-02T00:00:00")
+    add_backup(tmp_path, "20240102_0100", "incremental", "2024-01-02T01:00:00", base="20240102_0000")
+    add_backup(tmp_path, "20240102_0200", "incremental", "2024-01-02T02:00:00", base="20240102_0100")
+    return str(tmp_path)
+
+
+def names(backups):
+    return [os.path.basename(folder) for folder, _ in backups]
+
+
+@pytest.mark.parametrize("header, position", [
+    (b"-- CHANGE MASTER TO MASTER_LOG_FILE='binlog.000042', MASTER_LOG_POS=157;\n", {"file": "binlog.000042", "position": 157}),
+    (b"-- CHANGE REPLICATION SOURCE TO SOURCE_LOG_FILE='mysql-bin.000003', SOURCE_LOG_POS=4;\n",
+     {"file": "mysql-bin.000003", "position": 4}),
+    (b"-- MySQL dump 10.13\n-- Server version 8.0.36\n", None),
+])
+def test_parse_binlog_position(header, position):
+    assert parse_binlog_position(header) == position
+
+
+def test_restore_chain_takes_latest_full_backup_and_its_incrementals(backup_dir):
+    full, incrementals = restore_chain(backup_dir)
+    assert os.path.basename(full[0]) == "backup_20240102_0000"
+    assert names(incrementals) == ["backup_20240102_0100", "backup_20240102_0200"]
+
+
+def test_restore_chain_stops_at_first_incremental_after_point_in_time(backup_dir):
+    full, incrementals = restore_chain(backup_dir, until=datetime.datetime(2024, 1, 1, 0, 30))
+    assert os.path.basename(full[0]) == "backup_20240101_0000"
+    assert names(incrementals) == ["backup_20240101_0100"]  # Holds the events up to 00:30
+
+
+def test_restore_chain_skips_incrementals_of_other_chains(tmp_path):
+    add_backup(tmp_path, "20240101_0000", "full", "2024-01-01T00:00:00")
+    add_backup(tmp_path, "20240101_0100", "incremental", "2024-01-01T01:00:00", base="20231231_0000")
+    add_backup(tmp_path, "20240101_0200", "incremental", "2024-01-01T02:00:00", base="20240101_0000")
+    _, incrementals = restore_chain(str(tmp_path))
+    assert names(incrementals) == ["backup_20240101_0200"]
+
+
+def test_restore_chain_needs_a_full_backup_before_point_in_time(backup_dir):
+    with pytest.raises(BackupError):
+        restore_chain(backup_dir, until=datetime.datetime(2023, 12, 31))
+
+
+def test_prune_backups_deletes_whole_chains(backup_dir):
+    deleted = prune_backups(backup_dir, keep_full=1)
+    assert [os.path.basename(folder) for folder in deleted] == [
+        "backup_20240101_0000", "backup_20240101_0100", "backup_20240101_0200"]
+    assert sorted(os.listdir(backup_dir)) == ["backup_20240102_0000", "backup_20240102_0100", "backup_20240102_0200"]
+
+
+def test_prune_backups_keeps_recent_chains(backup_dir):
+    now = datetime.datetime(2024, 1, 2, 12, 0)
+    assert prune_backups(backup_dir, keep_full=1, keep_days=1.5, now=now) == []  # The first chain ends at 02:00 the day before
+    assert len(prune_backups(backup_dir, keep_full=1, keep_days=0.25, now=now)) == 3
+
+
+def test_prune_backups_leaves_unfinished_backups(backup_dir):
+    unfinished = os.path.join(backup_dir, "backup_20231231_0000")
+    os.makedirs(unfinished)  # No dump_info.json yet
+    prune_backups(backup_dir, keep_full=1)
+    assert os.path.isdir(unfinished)
@@ -0,0 +1,140 @@
+import os
+import random
+
+import pytest
+
+from mysql_backup_core import (CHUNK_STORE_NAME, ChunkStore, ContentChunker, BackupError, DedupWriter, ManifestReader,
+                               collect_chunk_garbage, read_manifest)
+
+
+def make_dump(rows, seed=0):
+    """An extended INSERT dump of some rows, one statement per 500 rows."""
+    generator = random.Random(seed)
+    statements = []
+    for start in range(0, len(rows), 500):
+        values = b"),(".join(rows[start:start + 500])
+        statements.append(b"INSERT INTO `t` VALUES (" + values + b");\n")
+    return b"-- header\n" + b"".join(statements) + bytes(generator.randrange(256) for _ in range(100))
+
+
+def make_rows(count, seed=0):
+    generator = random.Random(seed)
+    return [b"%d,'%s'" % (index, bytes(generator.choice(b"abcdefgh") for _ in range(generator.randrange(10, 80))))
+            for index in range(count)]
+
+
+def chunk(data, feed_size, **sizes):
+    chunker = ContentChunker(**sizes)
+    chunks = []
+    for start in range(0, len(data), feed_size):
+        chunks += chunker.feed(data[start:start + feed_size])
+    return chunks + chunker.finish()
+
+
+@pytest.mark.parametrize("feed_size", [1, 1000, 65536, 10 ** 7])
+def test_chunks_do_not_depend_on_feed_size(feed_size):
+    data = make_dump(make_rows(20000))
+    chunks = chunk(data, feed_size, min_size=1024, average_size=4096, max_size=32768)
+    assert b"".join(chunks) == data
+    assert chunks == chunk(data, len(data), min_size=1024, average_size=4096, max_size=32768)
+
+
+def test_chunk_sizes_stay_within_bounds():
+    data = make_dump(make_rows(20000))
+    chunks = chunk(data, 65536, min_size=1024, average_size=4096, max_size=32768)
+    assert all(1024 <= len(part) <= 32768 for part in chunks[:-1])
+
+
+def test_data_without_boundaries_is_cut_at_max_size():
+    data = b"x" * 100000
+    assert [len(part) for part in chunk(data, 7000, min_size=1024, average_size=4096, max_size=32768)] == [
+        32768, 32768, 32768, 100000 - 3 * 32768]
+
+
+def test_inserted_rows_only_change_nearby_chunks():
+    rows = make_rows(20000)
+    before = chunk(make_dump(rows), 65536, min_size=1024, average_size=4096, max_size=32768)
+    after = chunk(make_dump(rows[:10000] + [b"-1,'inserted'"] + rows[10000:]), 65536,
+                  min_size=1024, average_size=4096, max_size=32768)
+    assert len(set(before) - set(after)) <= 0.1 * len(before)
+
+
+@pytest.mark.parametrize("compression", ["gzip", "none"])
+def test_manifest_round_trip(tmp_path, compression):
+    store = ChunkStore(str(tmp_path / CHUNK_STORE_NAME), compression)
+    data = make_dump(make_rows(50000))
+    manifest_path = str(tmp_path / "backup_1" / "backup.sql.manifest")
+    os.makedirs(os.path.dirname(manifest_path))
+    writer = DedupWriter(manifest_path, store, threads=2)
+    for start in range(0, len(data), 100000):
+        writer.write(data[start:start + 100000])
+    writer.close()
+
+    assert writer.bytes_in == len(data)
+    assert writer.new_chunks == len({digest for digest, _ in writer.chunks})
+    read_store, manifest = read_manifest(manifest_path)
+    assert read_store.path == store.path and manifest["bytes"] == len(data)
+    with ManifestReader(manifest_path, read_ahead=2) as reader:
+        assert reader.read(10) == data[:10]
+        assert reader.read(12345) == data[10:12355]
+        assert reader.read() == data[12355:]
+        assert reader.read() == b""
+
+
+def test_second_backup_of_same_data_adds_no_chunks(tmp_path):
+    store = ChunkStore(str(tmp_path / CHUNK_STORE_NAME), "none")
+    data = make_dump(make_rows(20000))
+    for name in ("first.manifest", "second.manifest"):
+        writer = DedupWriter(str(tmp_path / name), store, threads=2)
+        writer.write(data)
+        writer.close()
+    assert writer.new_chunks == 0 and writer.bytes_out == 0
+
+
+def test_damaged_chunk_is_detected(tmp_path):
+    store = ChunkStore(str(tmp_path / CHUNK_STORE_NAME), "none")
+    manifest_path = str(tmp_path / "backup.sql.manifest")
+    writer = DedupWriter(manifest_path, store, threads=1)
+    writer.write(make_dump(make_rows(1000)))
+    writer.close()
+    digest, _ = writer.chunks[0]
+    with open(store.chunk_path(digest), "r+b") as f:
+        f.write(b"X")
+    with ManifestReader(manifest_path) as reader, pytest.raises(BackupError):
+        reader.read()
+
+
+def store_files(store):
+    return sorted(os.path.relpath(os.path.join(directory, name), store.path)
+                  for directory, _, names in os.walk(store.path) for name in names)
+
+
+def test_garbage_collection_waits_for_running_writer(tmp_path):
+    store = ChunkStore(str(tmp_path / CHUNK_STORE_NAME), "none")
+    os.makedirs(tmp_path / "backup_1")
+    manifest_path = str(tmp_path / "backup_1" / "backup.sql.manifest")
+    data = make_dump(make_rows(20000))
+    writer = DedupWriter(manifest_path, store, threads=2)
+    writer.write(data)
+    while writer.pending:
+        writer._collect()  # Every chunk written so far is on disk, none listed by a manifest yet
+    written = store_files(store)
+    assert written
+
+    assert collect_chunk_garbage(str(tmp_path)) is None
+    assert store_files(store) == written
+    writer.close()
+    assert collect_chunk_garbage(str(tmp_path)) == (0, 0)
+    with ManifestReader(manifest_path) as reader:
+        assert reader.read() == data
+
+
+def test_garbage_collection_deletes_chunks_of_deleted_backups(tmp_path):
+    store = ChunkStore(str(tmp_path / CHUNK_STORE_NAME), "none")
+    os.makedirs(tmp_path / "backup_1")
+    writer = DedupWriter(str(tmp_path / "backup_1" / "backup.sql.manifest"), store, threads=2)
+    writer.write(make_dump(make_rows(1000)))
+    writer.close()
+    os.remove(writer.path)
+    deleted, freed = collect_chunk_garbage(str(tmp_path))
+    assert deleted == len({digest for digest, _ in writer.chunks}) and freed > 0 and store_files(store) == []
@@ -0,0 +1,31 @@
+"""
+Reads the catalog of a MySQL server and backs it up. Skipped unless MYSQL_TEST_USER is set, with MYSQL_TEST_PASSWORD,
+MYSQL_TEST_HOST and MYSQL_TEST_PORT as needed. The backed-up server is not modified.
+"""
+import os
+import shutil
+
+import pytest
+
+from mysql_backup_core import backup_all_databases, list_backups, server_catalog
+
+USER = os.environ.get("MYSQL_TEST_USER")
+PASSWORD = os.environ.get("MYSQL_TEST_PASSWORD", "")
+HOST = os.environ.get("MYSQL_TEST_HOST")
+PORT = int(os.environ["MYSQL_TEST_PORT"]) if os.environ.get("MYSQL_TEST_PORT") else None
+
+pytestmark = pytest.mark.skipif(USER is None, reason="needs a MySQL server, set MYSQL_TEST_USER")
+
+
+def test_catalog_reads_server_version():
+    catalog = server_catalog(USER, PASSWORD, HOST, PORT, max_age=0)
+    assert catalog.version
+
+
+@pytest.mark.skipif(shutil.which("mysqldump") is None, reason="needs mysqldump")
+@pytest.mark.parametrize("dedup", [False, True])
+def test_full_backup_is_recorded(tmp_path, dedup):
+    stats = backup_all_databases(USER, PASSWORD, str(tmp_path), HOST, PORT, compression="gzip", dedup=dedup)
+    [(folder, dump_info)] = list_backups(str(tmp_path))
+    assert os.path.dirname(stats.path) == folder
+    assert dump_info["mode"] == "full" and dump_info["bytes_in"] > 0
@@ -0,0 +1,21 @@
+import pytest
+
+from mysql_backup_core import escape_like, is_generated_column
+
+
+@pytest.mark.parametrize("extra, generated", [
+    ("VIRTUAL GENERATED", True),
+    ("STORED GENERATED", True),
+    ("PERSISTENT GENERATED", True),  # MariaDB
+    ("DEFAULT_GENERATED", False),  # MySQL 8.0.13+ for DEFAULT CURRENT_TIMESTAMP and other expression defaults
+    ("DEFAULT_GENERATED on update CURRENT_TIMESTAMP", False),
+    ("auto_increment", False),
+    (None, False),
+])
+def test_only_computed_columns_are_generated(extra, generated):
+    assert is_generated_column(extra) is generated
+
+
+def test_escape_like_escapes_wildcards():
+    assert escape_like("order_items") == "order\\_items"
+    assert escape_like("100%\\done") == "100\\%\\\\done"
@@ -0,0 +1,101 @@
+import pytest
+
+import mysql_backup_core
+from mysql_backup_core import RESTORE_MARKER_PATTERN, ParallelRestorer, defer_secondary_indexes, open_dump_file
+
+
+def create_table(*lines, engine=b"InnoDB"):
+    body = b",\n".join(lines)
+    return b"CREATE TABLE `t` (\n" + body + b"\n) ENGINE=" + engine + b" DEFAULT CHARSET=utf8mb4;\n"
+
+
+ID = b"  `id` int NOT NULL AUTO_INCREMENT"
+A = b"  `a` int NOT NULL"
+B = b"  `b` varchar(10) DEFAULT NULL"
+
+
+def test_plain_keys_are_deferred():
+    statement = create_table(ID, A, B, b"  PRIMARY KEY (`id`)", b"  KEY `kb` (`b`(5),`a`)", b"  KEY `ka` (`a`)")
+    create, alter = defer_secondary_indexes(statement, "t")
+    assert create == create_table(ID, A, B, b"  PRIMARY KEY (`id`)")
+    assert alter == b"ALTER TABLE `t` ADD KEY `kb` (`b`(5),`a`), ADD KEY `ka` (`a`);\n"
+
+
+def test_unique_keys_stay_in_place():
+    statement = create_table(ID, A, B, b"  PRIMARY KEY (`id`)", b"  UNIQUE KEY `ua` (`a`)", b"  KEY `kb` (`b`)")
+    create, alter = defer_secondary_indexes(statement, "t")
+    assert create == create_table(ID, A, B, b"  PRIMARY KEY (`id`)", b"  UNIQUE KEY `ua` (`a`)")
+    assert alter == b"ALTER TABLE `t` ADD KEY `kb` (`b`);\n"
+
+
+def test_unique_key_of_table_without_primary_key_is_kept():
+    # InnoDB clusters the table on its first NOT NULL unique key, deferring it would rebuild the table
+    statement = create_table(A, B, b"  UNIQUE KEY `ua` (`a`)")
+    assert defer_secondary_indexes(statement, "t") == (statement, b"")
+
+
+def test_key_starting_with_auto_increment_column_is_kept():
+    statement = create_table(ID, A, b"  KEY `kid` (`id`,`a`)", b"  KEY `ka` (`a`)")
+    create, alter = defer_secondary_indexes(statement, "t")
+    assert create == create_table(ID, A, b"  KEY `kid` (`id`,`a`)")
+    assert alter == b"ALTER TABLE `t` ADD KEY `ka` (`a`);\n"
+
+
+def test_tables_with_foreign_keys_and_other_engines_are_unchanged():
+    with_foreign_key = create_table(ID, A, b"  PRIMARY KEY (`id`)", b"  KEY `ka` (`a`)",
+                                    b"  CONSTRAINT `fk` FOREIGN KEY (`a`) REFERENCES `p` (`id`)")
+    assert defer_secondary_indexes(with_foreign_key, "t") == (with_foreign_key, b"")
+    myisam = create_table(ID, A, b"  PRIMARY KEY (`id`)", b"  KEY `ka` (`a`)", engine=b"MyISAM")
+    assert defer_secondary_indexes(myisam, "t") == (myisam, b"")
+
+
+def test_table_name_is_quoted():
+    statement = create_table(A, b"  KEY `ka` (`a`)")
+    assert defer_secondary_indexes(statement, "odd`name")[1].startswith(b"ALTER TABLE `odd``name` ")
+
+
+DUMP = (b"-- MySQL dump 10.13\n/*!40101 SET NAMES utf8mb4 */;\n"
+        b"\n--\n-- Current Database: `shop`\n--\n\nCREATE DATABASE `shop`;\nUSE `shop`;\n"
+        b"\n--\n-- Table structure for table `order``items`\n--\n\nCREATE TABLE `order``items` (`id` int);\n"
+        b"INSERT INTO `order``items` VALUES (1),(2);\n"
+        b"\n--\n-- Temporary view structure for view `totals`\n--\n\nCREATE TABLE `totals` (`n` tinyint);\n"
+        b"\n--\n-- Dumping routines for database 'shop'\n--\n\n"
+        b"\n--\n-- Final view structure for view `totals`\n--\n\nCREATE VIEW `totals` AS SELECT 1 AS `n`;\n"
+        b"-- Dump completed on 2024-05-01 12:00:00\n")
+
+
+def test_restore_markers_name_the_sections():
+    markers = [(match.group(1), match.group(2)) for match in RESTORE_MARKER_PATTERN.finditer(DUMP)]
+    assert markers == [(b"Current Database: `", b"shop"), (b"Table structure for table `", b"order``items"),
+                       (b"Temporary view structure for view `", b"totals"), (b"Dumping routines for database '", b"shop"),
+                       (b"Final view structure for view `", b"totals")]
+
+
+def test_restore_markers_ignore_data_lines():
+    assert RESTORE_MARKER_PATTERN.search(b"INSERT INTO `t` VALUES ('\n-- Table structure for table `x`');\n") is None
+
+
+class RecordingRestorer(ParallelRestorer):
+    """Keeps the sections a dump is split into instead of loading them."""
+
+    def __init__(self, **kwargs):
+        super().__init__(["mysql"], **kwargs)
+        self.loaded = []
+
+    def _dispatch(self, section):
+        with open_dump_file(section.path) as f:
+            self.loaded.append((section.kind, section.database, section.name, f.read()))
+
+
+@pytest.mark.parametrize("read_size", [7, 1024 * 1024])
+def test_dump_is_split_at_markers(tmp_path, monkeypatch, read_size):
+    monkeypatch.setattr(mysql_backup_core, "PIPE_READ_SIZE", read_size)  # Markers split between two reads
+    path = tmp_path / "backup.sql"
+    path.write_bytes(DUMP)
+    restorer = RecordingRestorer()
+    restorer._split_dump(str(path), str(tmp_path))
+    assert [section[:3] for section in restorer.loaded] == [
+        ("header", None, None), ("database", None, "shop"), ("table", "shop", "order`items"), ("view", "shop", "totals"),
+        ("objects", "shop", "shop"), ("views", "shop", "totals")]
+    assert b"".join(section[3] for section in restorer.loaded) == DUMP
+    assert restorer.loaded[2][3].startswith(b"-- Table structure for table `order``items`\n")
@@ -0,0 +1,60 @@
+import datetime
+
+import pytest
+
+from mysql_backup_scheduler import Schedule, make_job, next_run_time, parse_schedule, resolve_credential
+
+
+@pytest.mark.parametrize("frequency, at, schedule", [
+    ("Hourly", "15", Schedule("Hourly", None, None, 15)),
+    ("Daily", "02:30", Schedule("Daily", None, 2, 30)),
+    ("Weekly", "Mon 14:00", Schedule("Weekly", 0, 14, 0)),
+    ("Weekly", "sunday 7:05", Schedule("Weekly", 6, 7, 5)),
+])
+def test_parse_schedule(frequency, at, schedule):
+    assert parse_schedule(frequency, at) == schedule
+
+
+@pytest.mark.parametrize("frequency, at", [
+    ("Hourly", "60"), ("Hourly", "a"), ("Daily", "24:00"), ("Daily", "2"), ("Weekly", "14:00"), ("Weekly", "Xyz 14:00"),
+    ("Monthly", "1"),
+])
+def test_parse_schedule_rejects_invalid_times(frequency, at):
+    with pytest.raises(ValueError):
+        parse_schedule(frequency, at)
+
+
+@pytest.mark.parametrize("frequency, at, after, expected", [
+    ("Hourly", "15", datetime.datetime(2024, 5, 1, 10, 14), datetime.datetime(2024, 5, 1, 10, 15)),
+    ("Hourly", "15", datetime.datetime(2024, 5, 1, 10, 15), datetime.datetime(2024, 5, 1, 11, 15)),  # Strictly after
+    ("Hourly", "0", datetime.datetime(2024, 5, 1, 23, 30), datetime.datetime(2024, 5, 2, 0, 0)),
+    ("Daily", "02:30", datetime.datetime(2024, 5, 1, 1, 0), datetime.datetime(2024, 5, 1, 2, 30)),
+    ("Daily", "02:30", datetime.datetime(2024, 12, 31, 3, 0), datetime.datetime(2025, 1, 1, 2, 30)),
+    ("Weekly", "Mon 14:00", datetime.datetime(2024, 5, 1, 9, 0), datetime.datetime(2024, 5, 6, 14, 0)),  # A Wednesday
+    ("Weekly", "Wed 14:00", datetime.datetime(2024, 5, 1, 9, 0), datetime.datetime(2024, 5, 1, 14, 0)),
+    ("Weekly", "Wed 14:00", datetime.datetime(2024, 5, 1, 14, 0), datetime.datetime(2024, 5, 8, 14, 0)),
+])
+def test_next_run_time(frequency, at, after, expected):
+    assert next_run_time(parse_schedule(frequency, at), after) == expected
+
+
+def test_resolve_credential(tmp_path, monkeypatch):
+    monkeypatch.setenv("MYSQL_BACKUP_TEST_PASSWORD", "from env")
+    password_file = tmp_path / "password"
+    password_file.write_text("from file\nsecond line\n", encoding="utf-8")
+    assert resolve_credential("env:MYSQL_BACKUP_TEST_PASSWORD") == "from env"
+    assert resolve_credential(f"file:{password_file}") == "from file"
+    assert resolve_credential(None) == ""
+
+
+@pytest.mark.parametrize("reference", ["env:MYSQL_BACKUP_TEST_UNSET", "file:/nonexistent/password", "secret"])
+def test_resolve_credential_rejects_missing_or_plain_passwords(reference):
+    with pytest.raises(ValueError):
+        resolve_credential(reference)
+
+
+def test_job_holds_password_reference(tmp_path):
+    job = make_job("nightly", "backup", "env:MYSQL_PASSWORD", str(tmp_path), "Daily", "02:30")
+    assert job["password_ref"] == "env:MYSQL_PASSWORD" and "password" not in job
+    with pytest.raises(ValueError):
+        make_job("nightly", "backup", "secret", str(tmp_path), "Daily", "02:30")
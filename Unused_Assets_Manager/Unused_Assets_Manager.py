@@ -1,17 +1,26 @@
 
 import os
-import shutil
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext
 from tkinter import ttk
-import re
 from datetime import datetime
 import threading
-from concurrent.futures import ThreadPoolExecutor
+import queue
+import time
+from collections import deque
+from unused_assets_core import (ProjectInventory, ScanCache, UnusedAssetsScanner, DEFAULT_SCAN_CACHE_PATH, REFERENCE_SOURCES,
+                                MoveManifest, relocate_files, restore_from_manifest, LiveAssetIndex)
 
 #[SCRIPT_CREATED ON 2024-04-05 10:00 UTC+3]
 # SCRIPT_DETAILS: UnusedAssetsManager_202405051000.py
-# This script finds unused asset files in a project and moves them to a timestamped backup location while generating restore scripts.
+# This script finds unused asset files in a project and moves them to a timestamped backup location while writing a move manifest to restore them.
+
+# Output pane refresh settings
+UI_FRAME_INTERVAL_MS = 50  # How often the event queue is drained on the Tk main loop
+UI_FRAME_BUDGET = 0.02  # Seconds of queue draining allowed per frame
+MAX_OUTPUT_LINES = 5000  # Log lines kept in the output pane, older lines are dropped
+RESULTS_PER_FRAME = 5000  # Unused files added to the results list per frame
+WATCH_REFRESH_MS = 500  # How often the results list is refreshed from the live index while watching
 
 class UnusedAssetsManager:
     """Manages the identification and movement of unused asset files in a project."""
@@ -34,6 +43,24 @@ class UnusedAssetsManager:
         self.all_extensions = set()  # Set of all unique file extensions in the project
         self.asset_extensions = set()  # Set of user-selected extensions to check for assets
         self.is_running = False  # Flag to control running status
+        self.project_inventory = None  # ProjectInventory shared by the steps of a run
+        self.scan_mode = "thread"  # Execution mode of the reference search: "thread" or "process"
+        self.worker_count = os.cpu_count() or 1  # Number of scan workers
+        self.chunk_size = 64  # Number of PHP files handed to a worker at a time
+        self.progress_queue = queue.Queue()  # Events posted by the search thread, drained on the Tk main loop
+        self.pending_results = deque()  # Result lines waiting to be added to the results list
+        self.search_finished = None  # Final ("done" or "error", message) event of the search
+        self.cancel_event = threading.Event()  # Set to stop a running move
+        self.copy_workers = 8  # Concurrent copies when the backup is on another filesystem
+        self.use_scan_cache = tk.BooleanVar(value=True)  # Reuse the results of unchanged PHP files from earlier runs
+        self.cache_enabled = True  # Value of use_scan_cache read when the search starts
+        self.reference_source_vars = {name: tk.BooleanVar(value=(name == "php"))
+                                      for name in REFERENCE_SOURCES if name != "text"}  # Reference file types to search
+        self.reference_sources = ["php"]  # Selected reference sources read when the search starts
+        self.scan_cache_path = DEFAULT_SCAN_CACHE_PATH  # SQLite database of the scan cache
+        self.live_index = None  # LiveAssetIndex kept current by the watch thread
+        self.watch_stop_event = None  # Set to stop the watch thread
+        self.displayed_watch_version = -1  # Version of the live index shown in the results list
 
         # Create and configure styles for the scrollbars
         self.style = ttk.Style()
@@ -114,16 +141,57 @@ class UnusedAssetsManager:
         ttk.Button(button_frame, text="Select All", command=self.select_all_extensions).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Find Extensions", command=self.find_extensions).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Find Unused Assets", command=self.start_find_unused_assets_thread).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Find Duplicates", command=self.start_find_duplicates_thread).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Move Selected Files", command=self.move_selected_files).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Cancel", command=self.cancel_event.set).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Restore From Manifest", command=self.restore_moved_files).pack(side=tk.LEFT, padx=5)
+        self.watch_button = ttk.Button(button_frame, text="Start Watch", command=self.toggle_watch)
+        self.watch_button.pack(side=tk.LEFT, padx=5)
+
+        # Scan Settings Frame
+        scan_frame = ttk.Frame(self.frame)
+        scan_frame.pack(pady=10)
+        ttk.Label(scan_frame, text="Scan Mode:").pack(side=tk.LEFT, padx=5)
+        self.scan_mode_option = ttk.Combobox(scan_frame, values=["thread", "process"], width=8, state="readonly")
+        self.scan_mode_option.set(self.scan_mode)
+        self.scan_mode_option.pack(side=tk.LEFT, padx=5)
+        ttk.Label(scan_frame, text="Workers:").pack(side=tk.LEFT, padx=5)
+        self.worker_count_entry = ttk.Spinbox(scan_frame, from_=1, to=256, width=5)
+        self.worker_count_entry.set(self.worker_count)
+        self.worker_count_entry.pack(side=tk.LEFT, padx=5)
+        ttk.Label(scan_frame, text="Chunk Size:").pack(side=tk.LEFT, padx=5)
+        self.chunk_size_entry = ttk.Spinbox(scan_frame, from_=1, to=10000, width=6)
+        self.chunk_size_entry.set(self.chunk_size)
+        self.chunk_size_entry.pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(scan_frame, text="Use Scan Cache", variable=self.use_scan_cache).pack(side=tk.LEFT, padx=5)
+        ttk.Button(scan_frame, text="Clear Scan Cache", command=self.clear_scan_cache).pack(side=tk.LEFT, padx=5)
+
+        # Reference Sources Frame
+        sources_frame = ttk.Frame(self.frame)
+        sources_frame.pack(pady=5)
+        ttk.Label(sources_frame, text="Search References In:").pack(side=tk.LEFT, padx=5)
+        for name, variable in self.reference_source_vars.items():
+            ttk.Checkbutton(sources_frame, text=name, variable=variable).pack(side=tk.LEFT, padx=5)
 
         # Progress Bar
         self.progress = ttk.Progressbar(self.frame, length=400, mode='determinate')
         self.progress.pack(pady=10)
 
-        # Output Text Frame
+        # Output Text Frame, a log capped at MAX_OUTPUT_LINES
         self.output_text = scrolledtext.ScrolledText(self.frame, width=100, height=20, wrap=tk.NONE)
         self.output_text.pack(pady=10)
 
+        # Results Frame, a listbox only draws the visible rows so it stays responsive with 100k+ files
+        results_frame = ttk.Frame(self.frame)
+        results_frame.pack(pady=10)
+        self.results_label = ttk.Label(results_frame, text="Unused Files Found:")
+        self.results_label.pack(pady=5)
+        self.results_listbox = tk.Listbox(results_frame, width=100, height=15)
+        self.results_scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.results_listbox.yview)
+        self.results_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.results_listbox.config(yscrollcommand=self.results_scrollbar.set)
+        self.results_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
     def select_all_extensions(self):
         """
         Selects or deselects all extensions in the listbox.
@@ -145,6 +213,7 @@ class UnusedAssetsManager:
         self.project_path = filedialog.askdirectory(title="Select Project Directory", initialdir=os.getcwd())
         self.project_entry.delete(0, tk.END)
         self.project_entry.insert(0, self.project_path)
+        self.project_inventory = None  # The inventory belongs to the previous project
 
     def browse_backup(self):
         """
@@ -170,124 +239,342 @@ class UnusedAssetsManager:
         self.all_extensions.clear()  # Reset the set of extensions
         self.extension_listbox.delete(0, tk.END)  # Clear the listbox
 
-        # Walk through the project and collect file extensions
-        for root, dirs, files in os.walk(self.project_path):
-            for file in files:
-                _, extension = os.path.splitext(file)
-                if extension:  # Only add non-empty extensions
-                    self.all_extensions.add(extension)
+        # Walk through the project once and collect file extensions
+        self.project_inventory = ProjectInventory(self.project_path)
+        self.all_extensions.update(self.project_inventory.extensions())
 
         # Populate the listbox with found extensions
         for ext in sorted(self.all_extensions):
             self.extension_listbox.insert(tk.END, ext)
 
+    def get_project_inventory(self):
+        """
+        Returns the inventory of the current project, walking the project directory only if no inventory
+        was built for it yet.
+
+        Returns:
+            ProjectInventory: The shared project inventory.
+        """
+        if self.project_inventory is None or self.project_inventory.project_path != self.project_path:
+            self.project_inventory = ProjectInventory(self.project_path)
+        return self.project_inventory
+
+    def clear_scan_cache(self):
+        """
+        Invalidates the whole scan cache so the next run rescans every PHP file.
+        """
+        if self.is_running:
+            messagebox.showwarning("Warning", "The search is already running.")
+            return
+        cache = ScanCache(self.scan_cache_path, self.project_path)
+        cache.clear()
+        cache.close()
+        messagebox.showinfo("Success", "Scan cache cleared.")
+
     def start_find_unused_assets_thread(self):
         """
-        Starts the unused assets search in a separate thread.
+        Validates the selections and starts the unused assets search in a separate thread.
         """
         if self.is_running:
             messagebox.showwarning("Warning", "The search is already running.")
             return
-        
+
+        if not self.project_path or not self.backup_path:
+            messagebox.showerror("Error", "Please select both project and backup directories.")
+            return
+
+        selected_indices = self.extension_listbox.curselection()
+        if not selected_indices:
+            messagebox.showerror("Error", "Please select at least one asset extension.")
+            return
+        self.asset_extensions = {self.extension_listbox.get(i) for i in selected_indices}  # Set of selected extensions
+
+        # Read the scan settings on the main thread
+        try:
+            self.worker_count = max(1, int(self.worker_count_entry.get()))
+            self.chunk_size = max(1, int(self.chunk_size_entry.get()))
+        except ValueError:
+            messagebox.showerror("Error", "Workers and chunk size must be whole numbers.")
+            return
+        self.scan_mode = self.scan_mode_option.get()
+        self.cache_enabled = self.use_scan_cache.get()
+        self.reference_sources = [name for name, variable in self.reference_source_vars.items() if variable.get()]
+        if not self.reference_sources:
+            messagebox.showerror("Error", "Please select at least one reference file type.")
+            return
+
         self.is_running = True
         self.progress.start()  # Start the progress bar animation
         self.output_text.delete(1.0, tk.END)  # Clear output text
-        self.thread = threading.Thread(target=self.find_unused_assets)
+        self.results_listbox.delete(0, tk.END)  # Clear previous results
+        self.results_label.config(text="Unused Files Found:")
+        self.pending_results.clear()
+        self.search_finished = None
+        self.thread = threading.Thread(target=self.find_unused_assets, daemon=True)
         self.thread.start()  # Start the thread
+        self.root.after(UI_FRAME_INTERVAL_MS, self.poll_progress_queue)  # Start draining events
+
+    def post_log(self, message):
+        """
+        Queues a line for the output pane. Safe to call from any thread.
+
+        Args:
+            message (str): The line to display.
+        """
+        self.progress_queue.put(("log", message))
+
+    def append_output(self, lines):
+        """
+        Appends lines to the output pane in a single insert and drops the oldest lines above MAX_OUTPUT_LINES.
+
+        Args:
+            lines (list): The lines to append.
+        """
+        self.output_text.insert(tk.END, "\n".join(lines) + "\n")
+        line_count = int(self.output_text.index("end-1c").split(".")[0]) - 1
+        if line_count > MAX_OUTPUT_LINES:
+            self.output_text.delete("1.0", f"{line_count - MAX_OUTPUT_LINES + 1}.0")
+        self.output_text.see(tk.END)  # Scroll to the end of the text area
+
+    def poll_progress_queue(self):
+        """
+        Drains the events posted by the search thread once per frame and applies them in batches.
+
+        Progress events are coalesced so only the latest one updates the progress widgets, log lines are
+        written to the output pane in one insert and result lines are added RESULTS_PER_FRAME at a time.
+        Runs on the Tk main loop and reschedules itself until the search has finished and been displayed.
+        """
+        log_lines = []
+        last_progress = None
+        finished = None
+        deadline = time.perf_counter() + UI_FRAME_BUDGET
+        while time.perf_counter() < deadline:
+            try:
+                event = self.progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == "progress":
+                last_progress = event[1:]
+            elif event[0] == "log":
+                log_lines.append(event[1])
+            elif event[0] == "results":
+                self.pending_results.extend(event[1])
+            else:
+                finished = event  # ("done", message) or ("error", message)
+
+        if last_progress:
+            processed, total, last_file = last_progress
+            percentage = (processed / total) * 100 if total > 0 else 0  # Calculate percentage
+            self.progress.stop()  # Switch from the animation to the real progress
+            self.progress["maximum"] = max(total, 1)
+            self.progress["value"] = processed
+            self.progress_percentage_label.config(text=f"{int(percentage)}%")  # Update percentage label
+            # Display the processing status with total files
+            log_lines.append(f"Processing {processed} of {total}: {os.path.basename(last_file)} Remaining {total - processed} {int(percentage)}%")
+        if log_lines:
+            self.append_output(log_lines)
+
+        if self.pending_results:
+            batch = [self.pending_results.popleft() for _ in range(min(RESULTS_PER_FRAME, len(self.pending_results)))]
+            self.results_listbox.insert(tk.END, *batch)
+
+        if finished:
+            self.search_finished = finished  # Reported once the remaining results are displayed
+        if self.search_finished and not self.pending_results:
+            finished, self.search_finished = self.search_finished, None
+            self.is_running = False
+            self.progress.stop()
+            if finished[0] == "done":
+                messagebox.showinfo("Success", finished[1])
+            else:
+                messagebox.showerror("Error", finished[1])
+            return
+        self.root.after(UI_FRAME_INTERVAL_MS, self.poll_progress_queue)
 
     def find_unused_assets(self):
         """
         Identifies unused assets by comparing files in the project directory with those referenced in project files.
         The user-selected extensions are considered for the asset search.
+
+        Runs on the search thread and only reports to the UI through self.progress_queue.
         """
-        if not self.project_path or not self.backup_path:
-            messagebox.showerror("Error", "Please select both project and backup directories.")
-            self.is_running = False
-            self.progress.stop()  # Stop the progress bar
+        try:
+            self.unused_files.clear()  # Clear previous unused files
+
+            # Find all asset files with the selected extensions, reusing the inventory built by find_extensions
+            all_files = self.get_project_inventory().files_with_extensions(self.asset_extensions)
+
+            total_files = len(all_files)  # Count total files found
+            self.post_log(f"Total files found: {total_files}")  # Display total files found
+
+            # Identify used files by running search_refs_in_php in parallel
+            self.search_refs_in_php_parallel(all_files)
+
+            # Identify unused files
+            for file in all_files:
+                if file not in self.used_files:
+                    self.unused_files.add(file)
+
+            # Display results in the results list
+            self.progress_queue.put(("results", [f"{i + 1}. {file}" for i, file in enumerate(sorted(self.unused_files))]))
+            self.progress_queue.put(("done", f"Identified {len(self.unused_files)} unused files."))
+        except Exception as e:
+            self.progress_queue.put(("error", f"The search failed: {e!r}"))
+
+    def start_find_duplicates_thread(self):
+        """
+        Starts the search for byte-identical asset files in a separate thread.
+        Each group shows which of its files are referenced when Find Unused Assets ran before.
+        """
+        if self.is_running:
+            messagebox.showwarning("Warning", "The search is already running.")
+            return
+
+        if not self.project_path:
+            messagebox.showerror("Error", "Please select the project directory first.")
             return
 
         selected_indices = self.extension_listbox.curselection()
         if not selected_indices:
             messagebox.showerror("Error", "Please select at least one asset extension.")
-            self.is_running = False
-            self.progress.stop()  # Stop the progress bar
             return
-        
         self.asset_extensions = {self.extension_listbox.get(i) for i in selected_indices}  # Set of selected extensions
-        self.unused_files.clear()  # Clear previous unused files
 
-        # Find all asset files with the selected extensions
-        all_files = []
-        for root, dirs, files in os.walk(self.project_path):
-            for file in files:
-                _, ext = os.path.splitext(file)
-                if ext in self.asset_extensions:
-                    all_files.append(os.path.join(root, file))
+        self.is_running = True
+        self.progress.start()  # Start the progress bar animation
+        self.results_listbox.delete(0, tk.END)  # Clear previous results
+        self.results_label.config(text="Duplicate Files Found ([used] = referenced):")
+        self.pending_results.clear()
+        self.search_finished = None
+        self.thread = threading.Thread(target=self.find_duplicate_assets, daemon=True)
+        self.thread.start()  # Start the thread
+        self.root.after(UI_FRAME_INTERVAL_MS, self.poll_progress_queue)  # Start draining events
 
-        total_files = len(all_files)  # Count total files found
-        self.output_text.insert(tk.END, f"Total files found: {total_files}\n")  # Display total files found
+    def find_duplicate_assets(self):
+        """
+        Groups the byte-identical asset files of the selected extensions.
+        Runs on the search thread and only reports to the UI through self.progress_queue.
+        """
+        try:
+            scanner = UnusedAssetsScanner(self.project_path, self.asset_extensions, inventory=self.get_project_inventory())
+            scanner.used_files = self.used_files  # Referenced assets from the last search, if any
+            groups = scanner.find_duplicate_assets(workers=self.copy_workers,
+                                                   progress=lambda done, total, last_file: self.progress_queue.put(("progress", done, total, last_file)))
+
+            lines = []
+            for i, group in enumerate(groups):
+                lines.append(f"{i + 1}. {len(group.paths)} copies of {group.size} bytes")
+                lines.extend(f"    {'[used] ' if path in group.used_paths else ''}{path}" for path in group.paths)
+            self.progress_queue.put(("results", lines))
+
+            wasted_mb = sum(group.size * (len(group.paths) - 1) for group in groups) / (1024 * 1024)
+            self.progress_queue.put(("done", f"Found {len(groups)} groups of duplicate files wasting {wasted_mb:.1f} MB."))
+        except Exception as e:
+            self.progress_queue.put(("error", f"The duplicate search failed: {e!r}"))
+
+    def toggle_watch(self):
+        """
+        Starts or stops watch mode, where a live index keeps the unused files current as project files are
+        created, modified or deleted, without rescanning the project.
+        """
+        if self.watch_stop_event is not None:
+            self.watch_stop_event.set()
+            self.watch_stop_event = None
+            self.live_index = None
+            self.watch_button.config(text="Start Watch")
+            return
 
-        # Identify used files by running search_refs_in_php in parallel
-        self.search_refs_in_php_parallel(all_files)
+        if self.is_running:
+            messagebox.showwarning("Warning", "The search is already running.")
+            return
 
-        # Identify unused files
-        for file in all_files:
-            if file not in self.used_files:
-                self.unused_files.add(file)
+        if not self.project_path:
+            messagebox.showerror("Error", "Please select the project directory first.")
+            return
 
-        # Display results in the output text area
-        self.output_text.insert(tk.END, "Unused Files Found:\n\n")
-        for i, file in enumerate(sorted(self.unused_files)):
-            self.output_text.insert(tk.END, f"{i + 1}. {file}\n")
+        selected_indices = self.extension_listbox.curselection()
+        if not selected_indices:
+            messagebox.showerror("Error", "Please select at least one asset extension.")
+            return
+        self.asset_extensions = {self.extension_listbox.get(i) for i in selected_indices}  # Set of selected extensions
+        self.reference_sources = [name for name, variable in self.reference_source_vars.items() if variable.get()]
+        if not self.reference_sources:
+            messagebox.showerror("Error", "Please select at least one reference file type.")
+            return
 
-        # Notify completion and stop the progress bar
-        self.is_running = False
-        self.progress.stop()
-        messagebox.showinfo("Success", f"Identified {len(self.unused_files)} unused files.")
+        self.live_index = LiveAssetIndex(self.project_path, self.asset_extensions, reference_sources=self.reference_sources,
+                                         progress=lambda done, total, last_file: self.progress_queue.put(("progress", done, total, last_file)),
+                                         log=self.post_log)
+        self.watch_stop_event = threading.Event()
+        self.displayed_watch_version = -1
+        self.watch_button.config(text="Stop Watch")
+
+        self.is_running = True  # Until the initial build is done
+        self.progress.start()  # Start the progress bar animation
+        self.results_listbox.delete(0, tk.END)  # Clear previous results
+        self.pending_results.clear()
+        self.search_finished = None
+        self.thread = threading.Thread(target=self.watch_project, args=(self.live_index, self.watch_stop_event), daemon=True)
+        self.thread.start()  # Start the thread
+        self.root.after(UI_FRAME_INTERVAL_MS, self.poll_progress_queue)  # Start draining events
+        self.root.after(WATCH_REFRESH_MS, self.refresh_watch_results)
+
+    def watch_project(self, live_index, stop_event):
+        """
+        Builds the live index and applies file changes to it until stop_event is set.
+        Runs on the watch thread and only reports to the UI through self.progress_queue.
+
+        Args:
+            live_index (LiveAssetIndex): The index to build and keep current.
+            stop_event (threading.Event): Set by toggle_watch to stop watching.
+        """
+        try:
+            live_index.watch(stop_event, ready=lambda: self.progress_queue.put(
+                ("done", f"Watching {self.project_path}: {len(live_index.unused_files)} unused files. The list updates as files change.")))
+        except Exception as e:
+            stop_event.set()
+            self.progress_queue.put(("error", f"Watching failed: {e!r}"))
+
+    def refresh_watch_results(self):
+        """
+        Shows the unused files of the live index in the results list whenever they changed.
+        Runs on the Tk main loop every WATCH_REFRESH_MS while watching, a query of the index takes milliseconds.
+        """
+        live_index = self.live_index
+        if live_index is None or self.watch_stop_event is None or self.watch_stop_event.is_set():
+            if self.watch_stop_event is not None:  # Stopped by an error
+                self.watch_stop_event = None
+                self.live_index = None
+                self.watch_button.config(text="Start Watch")
+            return
+
+        # Leave the list alone while a search or a move is using it
+        if not self.is_running and live_index.version != self.displayed_watch_version:
+            self.displayed_watch_version = live_index.version
+            unused_files = live_index.unused_assets()
+            self.unused_files = set(unused_files)  # What Move Selected Files moves
+            self.results_label.config(text=f"Unused Files Found (live, {len(unused_files)}):")
+            self.results_listbox.delete(0, tk.END)
+            self.results_listbox.insert(tk.END, *[f"{i + 1}. {file}" for i, file in enumerate(unused_files)])
+        self.root.after(WATCH_REFRESH_MS, self.refresh_watch_results)
 
     def search_refs_in_php_parallel(self, all_files):
         """
-        Uses a thread pool to search for references to asset files within PHP files concurrently.
+        Searches the selected reference files (PHP, JS, CSS, ...) for references to asset files with the
+        GUI-free engine of unused_assets_core.
+        Progress and log messages are posted to self.progress_queue and drained on the Tk main loop.
 
         Args:
             all_files (list): List of all asset files to check for references.
         """
-        total_php_files = sum(len(files) for _, _, files in os.walk(self.project_path) if any(file.endswith(".php") for file in files))
-        php_files = []
+        scanner = UnusedAssetsScanner(self.project_path, self.asset_extensions, reference_sources=self.reference_sources,
+                                      worker_count=self.worker_count, chunk_size=self.chunk_size, scan_mode=self.scan_mode,
+                                      cache_path=self.scan_cache_path if self.cache_enabled else None,
+                                      inventory=self.get_project_inventory(),
+                                      progress=lambda processed, total, last_file: self.progress_queue.put(("progress", processed, total, last_file)),
+                                      log=self.post_log)
+        self.used_files = scanner.find_used_assets(all_files)
 
-        # Gather all PHP files in the project directory
-        for root, dirs, files in os.walk(self.project_path):
-            for file in files:
-                if file.endswith(".php"):
-                    php_files.append(os.path.join(root, file))
-
-        # Define a worker function to search for references in each PHP file
-        def worker(php_file_path):
-            try:
-                with open(php_file_path, "r", encoding="utf-8", errors="ignore") as php_file:
-                    php_content = php_file.read()
-                    for asset_file in all_files:
-                        if re.search(r'\b' + re.escape(os.path.basename(asset_file)) + r'\b', php_content):
-                            self.used_files.add(asset_file)  # Add the asset to used files
-
-                    # Update progress for each processed PHP file
-                    with threading.Lock():  # Ensure thread-safe access to GUI components
-                        processed_php_files = len(self.used_files)  # Update processed file count
-                        remaining_php_files = total_php_files - processed_php_files  # Calculate remaining PHP files
-                        remaining_percentage = (processed_php_files / total_php_files) * 100 if total_php_files > 0 else 0  # Calculate percentage
-                        self.progress["value"] = processed_php_files
-                        self.progress_percentage_label.config(text=f"{int(remaining_percentage)}%")  # Update percentage label
-                        # Display the processing status with total files
-                        self.output_text.insert(tk.END, f"Processing {processed_php_files} of {total_php_files}: {os.path.basename(php_file_path)} Remaining {remaining_php_files} {int(remaining_percentage)}%\n")
-                        self.output_text.see(tk.END)  # Scroll to the end of the text area
-                        self.root.update()  # Update the GUI
-
-            except Exception as e:
-                print(f"Error reading file {php_file_path}: {repr(e)}")  # Error handling for file read
-
-        # Use ThreadPoolExecutor to run the worker function on each PHP file
-        with ThreadPoolExecutor() as executor:
-            executor.map(worker, php_files)
     def create_backup_directory(self):
         """
         Creates a timestamped backup directory for storing unused asset files named as the project folder. 
@@ -319,8 +606,15 @@ class UnusedAssetsManager:
     def move_selected_files(self):
         """
         Moves the identified unused files to a timestamped backup folder while preserving the original directory structure.
-        Creates restore scripts in Python, PowerShell, and Batch format inside the backup folder.
+        Every file is recorded in a move manifest inside the backup folder before it is moved.
+
+        The files are moved on a separate thread with progress reported through self.progress_queue and can be
+        stopped with the Cancel button.
         """
+        if self.is_running:
+            messagebox.showwarning("Warning", "The search is already running.")
+            return
+
         if not self.unused_files:
             messagebox.showinfo("Info", "No unused files to move.")
             return
@@ -328,76 +622,89 @@ class UnusedAssetsManager:
         # Create a timestamped backup directory
         timestamped_backup_dir = self.create_backup_directory()
 
-        # Create a restore scripts directory
-        restore_scripts_dir = os.path.join(timestamped_backup_dir, "restore_scripts")
-        os.makedirs(restore_scripts_dir, exist_ok=True)
+        self.is_running = True
+        self.cancel_event.clear()
+        self.search_finished = None
+        self.progress.start()  # Start the progress bar animation
+        self.thread = threading.Thread(target=self.relocate_unused_files, args=(timestamped_backup_dir,), daemon=True)
+        self.thread.start()  # Start the thread
+        self.root.after(UI_FRAME_INTERVAL_MS, self.poll_progress_queue)  # Start draining events
+
+    def relocate_unused_files(self, timestamped_backup_dir):
+        """
+        Moves the unused files into the backup directory, journaling them in its move manifest.
+        Runs on the move thread and only reports to the UI through self.progress_queue.
 
-        # Move unused files and preserve directory structure
-        for file in self.unused_files:
-            relative_path = os.path.relpath(file, self.project_path)  # Get the relative path of the unused file
-            backup_file_path = os.path.join(timestamped_backup_dir, relative_path)
-            backup_file_dir = os.path.dirname(backup_file_path)
-            os.makedirs(backup_file_dir, exist_ok=True)  # Create directories if they don't exist
-            shutil.move(file, backup_file_path)  # Move the file to the backup location
+        Args:
+            timestamped_backup_dir (str): The backup directory created for this move.
+        """
+        try:
+            # Move unused files and preserve directory structure
+            moves = [(file, os.path.join(timestamped_backup_dir, os.path.relpath(file, self.project_path)))
+                     for file in sorted(self.unused_files)]
+            manifest = MoveManifest(timestamped_backup_dir, self.project_path)
+            try:
+                moved, failed = relocate_files(moves, copy_workers=self.copy_workers, cancel_event=self.cancel_event, manifest=manifest,
+                                               progress=lambda done, total, last_file: self.progress_queue.put(("progress", done, total, last_file)))
+            finally:
+                manifest.close()
+            for source, _, error in failed:
+                self.post_log(f"Could not move {source}: {error}")
+
+            # The moved files are no longer in the project
+            self.unused_files.difference_update(source for source, _ in moved)
+            self.project_inventory = None
+
+            # Display a success message
+            message = f"Moved {len(moved)} of {len(moves)} unused files to {timestamped_backup_dir}"
+            if self.cancel_event.is_set():
+                message += " (cancelled)"
+            if failed:
+                message += f", {len(failed)} failed"
+            self.progress_queue.put(("done", message + f". Move manifest written to {manifest.path}"))
+        except Exception as e:
+            self.progress_queue.put(("error", f"The move failed: {e!r}"))
+
+    def restore_moved_files(self):
+        """
+        Asks for the move manifest of a backup folder and moves its files back into the project on a separate thread.
+        Files are verified against the manifest, and an interrupted restore continues where it stopped.
+        """
+        if self.is_running:
+            messagebox.showwarning("Warning", "The search is already running.")
+            return
 
-        # Generate restore scripts
-        self.generate_restore_scripts(restore_scripts_dir, timestamped_backup_dir)
+        manifest_path = filedialog.askopenfilename(title="Select Move Manifest", initialdir=self.backup_path or os.getcwd(),
+                                                   filetypes=[("Move manifest", "*.jsonl"), ("All files", "*.*")])
+        if not manifest_path:
+            return
 
-        # Display a success message
-        messagebox.showinfo("Success", f"Moved {len(self.unused_files)} unused files to {timestamped_backup_dir}")
+        self.is_running = True
+        self.cancel_event.clear()
+        self.search_finished = None
+        self.progress.start()  # Start the progress bar animation
+        self.thread = threading.Thread(target=self.restore_from_manifest_thread, args=(manifest_path,), daemon=True)
+        self.thread.start()  # Start the thread
+        self.root.after(UI_FRAME_INTERVAL_MS, self.poll_progress_queue)  # Start draining events
 
-    def generate_restore_scripts(self, restore_scripts_dir, backup_dir):
+    def restore_from_manifest_thread(self, manifest_path):
         """
-        Generates restore scripts in Python, PowerShell, and Batch format to restore the moved files.
+        Restores the files of a move manifest. Runs on the restore thread and only reports to the UI through
+        self.progress_queue.
 
         Args:
-            restore_scripts_dir (str): The directory to save restore scripts.
-            backup_dir (str): The directory from which to restore files.
-        """
-        # Python restore script
-        python_script = os.path.join(restore_scripts_dir, "restore_files.py")
-        with open(python_script, "w") as f:
-            f.write("# Restore script generated to restore unused assets\n")
-            f.write(f"import shutil\nimport os\n\n")
-            f.write(f"backup_dir = r'{backup_dir}'\n")
-            f.write(f"original_project_dir = r'{self.project_path}'\n\n")
-            f.write("for root, dirs, files in os.walk(backup_dir):\n")
-            f.write("    for file in files:\n")
-            f.write("        backup_file = os.path.join(root, file)\n")
-            f.write("        relative_path = os.path.relpath(backup_file, backup_dir)\n")
-            f.write("        original_file_path = os.path.join(original_project_dir, relative_path)\n")
-            f.write("        shutil.move(backup_file, original_file_path)\n")
-            f.write("print('Files restored successfully!')\n")
-
-        # PowerShell restore script
-        powershell_script = os.path.join(restore_scripts_dir, "restore_files.ps1")
-        with open(powershell_script, "w") as f:
-            f.write("# Restore script generated to restore unused assets\n")
-            f.write(f"$backup_dir = '{backup_dir}'\n")
-            f.write(f"$original_project_dir = '{self.project_path}'\n\n")
-            f.write("Get-ChildItem -Path $backup_dir -Recurse | ForEach-Object {\n")
-            f.write("    $relativePath = $_.FullName.Substring($backup_dir.Length + 1)\n")
-            f.write("    $originalPath = Join-Path -Path $original_project_dir -ChildPath $relativePath\n")
-            f.write("    Move-Item -Path $_.FullName -Destination $originalPath\n")
-            f.write("}\n")
-            f.write("Write-Host 'Files restored successfully!'\n")
-
-        # Batch restore script
-        batch_script = os.path.join(restore_scripts_dir, "restore_files.bat")
-        with open(batch_script, "w") as f:
-            f.write("@echo off\n")
-            f.write(f"set backup_dir={backup_dir}\n")
-            f.write(f"set original_project_dir={self.project_path}\n\n")
-            f.write("for /r \"%backup_dir%\" %%F in (*) do (\n")
-            f.write("    setlocal enabledelayedexpansion\n")
-            f.write("    set relative_path=%%~pnxF\n")
-            f.write("    set relative_path=!relative_path:%backup_dir%=!\n")
-            f.write("    move \"%%F\" \"%original_project_dir%!relative_path!\"\n")
-            f.write("    endlocal\n")
-            f.write(")\n")
-            f.write("echo Files restored successfully!\n")
-
-        messagebox.showinfo("Success", "Restore scripts created successfully!")
+            manifest_path (str): Path of the move manifest.
+        """
+        try:
+            restored, failed = restore_from_manifest(manifest_path, workers=self.copy_workers, cancel_event=self.cancel_event,
+                                                     progress=lambda done, total, last_file: self.progress_queue.put(("progress", done, total, last_file)))
+            for source, error in failed:
+                self.post_log(f"Could not restore {source}: {error}")
+            self.project_inventory = None  # The restored files are back in the project
+            self.progress_queue.put(("done", f"Restored {len(restored)} files, {len(failed)} failed."))
+        except Exception as e:
+            self.progress_queue.put(("error", f"The restore failed: {e!r}"))
+
 # Entry point for the script
 # Main application execution
 if __name__ == "__main__":
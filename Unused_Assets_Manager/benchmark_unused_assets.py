@@ -0,0 +1,232 @@
+# [START OF SCRIPT benchmark_unused_assets.py]
+# SCRIPT DETAILS: Headless benchmark of the Unused Assets Manager scanning engine.
+# It generates a synthetic project tree and times each phase of a run (walk, index build, reference scan,
+# diff, move) for the thread and process scan modes, each mode run in a fresh process, e.g.:
+#   python benchmark_unused_assets.py --assets 40000 --php-files 12000 --php-size-kb 32 --ref-density 0.6
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource  # Peak memory on Unix, not available on Windows
+except ImportError:
+    resource = None
+
+from unused_assets_core import ProjectInventory, UnusedAssetsScanner, MoveManifest, relocate_files
+
+# File contents used to pad the synthetic PHP files
+FILLER_LINES = [
+    "<?php echo $row['title']; ?>\n",
+    "<div class=\"card\"><span><?= htmlspecialchars($name) ?></span></div>\n",
+    "$items = array_map(function ($item) { return $item->id; }, $list);\n",
+    "// TODO: move this block into a partial template\n",
+    "if (isset($_GET['page'])) { $page = (int) $_GET['page']; }\n",
+]
+
+
+def generate_project(project_path, asset_count, php_count, php_size_kb, ref_density, depth, asset_size_kb, seed):
+    """
+    Writes a synthetic project tree.
+
+    Assets are spread over nested directories and a ref_density share of them is referenced from randomly
+    chosen PHP files, which are padded with PHP-like lines up to php_size_kb.
+
+    Args:
+        project_path (str): Directory to create the project in.
+        asset_count (int): Number of asset files.
+        php_count (int): Number of PHP files.
+        php_size_kb (int): Approximate size of each PHP file in KB.
+        ref_density (float): Share of the assets referenced by at least one PHP file, from 0 to 1.
+        depth (int): Directory depth of the asset and PHP trees.
+        asset_size_kb (int): Size of each asset file in KB.
+        seed (int): Random seed, the same arguments always give the same project.
+
+    Returns:
+        set: Paths of the assets that are referenced.
+    """
+    rng = random.Random(seed)
+
+    def nested_dir(root_name, index):
+        parts = [root_name] + [f"d{(index >> (3 * level)) % 8}" for level in range(depth)]
+        return os.path.join(project_path, *parts)
+
+    # Asset files
+    asset_data = os.urandom(asset_size_kb * 1024)
+    assets = []
+    for i in range(asset_count):
+        asset_dir = nested_dir("assets", i)
+        os.makedirs(asset_dir, exist_ok=True)
+        asset_path = os.path.join(asset_dir, f"asset_{i}.png")
+        with open(asset_path, "wb") as f:
+            f.write(asset_data)
+        assets.append(asset_path)
+
+    # Spread the references to the used assets over the PHP files
+    referenced = set(rng.sample(assets, int(asset_count * ref_density)))
+    refs_by_php = [[] for _ in range(max(php_count, 1))]
+    for asset_path in referenced:
+        refs_by_php[rng.randrange(len(refs_by_php))].append(os.path.basename(asset_path))
+
+    for i in range(php_count):
+        php_dir = nested_dir("templates", i)
+        os.makedirs(php_dir, exist_ok=True)
+        lines = [f"<img src=\"/assets/{basename}\" alt=\"\">\n" for basename in refs_by_php[i]]
+        size = sum(map(len, lines))
+        while size < php_size_kb * 1024:
+            line = rng.choice(FILLER_LINES)
+            lines.append(line)
+            size += len(line)
+        rng.shuffle(lines)
+        with open(os.path.join(php_dir, f"page_{i}.php"), "w", encoding="utf-8") as f:
+            f.writelines(lines)
+    return referenced
+
+
+def peak_memory_mb():
+    """
+    Returns the peak resident memory of this process and of its largest finished child process in MB, or None
+    where the resource module is not available. Both are peaks over the whole lifetime of the process, which is
+    why every mode is benchmarked in a fresh process.
+    """
+    if resource is None:
+        return None
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # ru_maxrss is in bytes on macOS, KB elsewhere
+    return {"run": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+            "workers": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale}
+
+
+def run_benchmark(project_path, backup_path, scan_mode, worker_count, chunk_size, expected_used):
+    """
+    Runs every phase of an unused-asset run on a generated project and measures it.
+
+    Args:
+        project_path (str): The generated project.
+        backup_path (str): Directory receiving the moved files.
+        scan_mode (str): "thread" or "process".
+        worker_count (int): Number of scan workers.
+        chunk_size (int): Number of reference files handed to a worker at a time.
+        expected_used (set): Assets the generator referenced, used to check the results.
+
+    Returns:
+        dict: Seconds, item counts and throughput per phase, plus the lifetime peak memory of the process.
+    """
+    phases = {}
+
+    start = time.perf_counter()
+    inventory = ProjectInventory(project_path)
+    phases["walk"] = {"seconds": time.perf_counter() - start, "files": len(inventory.entries),
+                      "mb": sum(record.size for record in inventory.entries) / (1024 * 1024)}
+
+    scanner = UnusedAssetsScanner(project_path, {".png"}, worker_count=worker_count, chunk_size=chunk_size,
+                                  scan_mode=scan_mode, cache_path=None, inventory=inventory)
+    asset_files = scanner.asset_files()
+    used_files = scanner.find_used_assets(asset_files)
+    reference_count = len(inventory.by_extension.get(".php", []))
+    phases["index"] = {"seconds": scanner.timings["index"], "files": len(asset_files)}
+    phases["scan"] = {"seconds": scanner.timings["scan"], "files": reference_count,
+                      "mb": scanner.scanned_bytes / (1024 * 1024)}
+
+    start = time.perf_counter()
+    unused_files = [path for path in asset_files if path not in used_files]
+    phases["diff"] = {"seconds": time.perf_counter() - start, "files": len(asset_files)}
+
+    start = time.perf_counter()
+    moves = [(path, os.path.join(backup_path, os.path.relpath(path, project_path))) for path in unused_files]
+    os.makedirs(backup_path, exist_ok=True)
+    manifest = MoveManifest(backup_path, project_path)
+    moved, failed = relocate_files(moves, manifest=manifest)
+    manifest.close()
+    phases["move"] = {"seconds": time.perf_counter() - start, "files": len(moved),
+                      "mb": sum(os.path.getsize(target) for _, target in moved) / (1024 * 1024)}
+
+    for phase in phases.values():
+        seconds = max(phase["seconds"], 1e-9)
+        phase["files_per_s"] = phase["files"] / seconds
+        if "mb" in phase:
+            phase["mb_per_s"] = phase["mb"] / seconds
+
+    return {"mode": scan_mode, "workers": worker_count, "phases": phases, "peak_memory_mb": peak_memory_mb(),
+            "correct": used_files == expected_used and not failed}
+
+
+def print_report(result):
+    """Prints one benchmark result as a table."""
+    print(f"\nMode: {result['mode']} ({result['workers']} workers)  results correct: {result['correct']}")
+    print(f"{'phase':<8}{'seconds':>10}{'files':>10}{'files/s':>14}{'MB':>10}{'MB/s':>10}")
+    for name, phase in result["phases"].items():
+        mb = f"{phase['mb']:.1f}" if "mb" in phase else "-"
+        mb_per_s = f"{phase['mb_per_s']:.1f}" if "mb_per_s" in phase else "-"
+        print(f"{name:<8}{phase['seconds']:>10.3f}{phase['files']:>10}{phase['files_per_s']:>14.0f}{mb:>10}{mb_per_s:>10}")
+    memory = result["peak_memory_mb"]
+    if memory:
+        print(f"Peak memory over the lifetime of the benchmark process: {memory['run']:.0f} MB, "
+              f"{memory['workers']:.0f} MB (largest scan worker process)")
+
+
+def main(argv=None):
+    """
+    Command line entry point: generates a project per scan mode and prints the timings of every phase.
+
+    Args:
+        argv (list): Command line arguments, defaults to sys.argv[1:].
+
+    Returns:
+        int: The process exit code, 1 if a mode returned wrong results.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the unused-asset scanner on a synthetic project.")
+    parser.add_argument("--assets", type=int, default=5000, help="Number of asset files (default: 5000)")
+    parser.add_argument("--php-files", type=int, default=1000, help="Number of PHP files (default: 1000)")
+    parser.add_argument("--php-size-kb", type=int, default=16, help="Size of each PHP file in KB (default: 16)")
+    parser.add_argument("--asset-size-kb", type=int, default=4, help="Size of each asset file in KB (default: 4)")
+    parser.add_argument("--ref-density", type=float, default=0.5, help="Share of referenced assets (default: 0.5)")
+    parser.add_argument("--depth", type=int, default=3, help="Directory depth (default: 3)")
+    parser.add_argument("--modes", nargs="+", choices=["thread", "process"], default=["thread", "process"])
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="Number of scan workers")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Reference files handed to a worker at a time")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed of the generator")
+    parser.add_argument("--work-dir", help="Directory for the generated projects (default: a temporary directory)")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per mode instead of tables")
+    args = parser.parse_args(argv)
+
+    if not 0 <= args.ref_density <= 1:
+        parser.error("--ref-density must be between 0 and 1")
+
+    work_dir = tempfile.mkdtemp(prefix="unused_assets_bench_", dir=args.work_dir)
+    exit_code = 0
+    try:
+        for scan_mode in args.modes:
+            # Every mode gets a fresh project because the move phase empties it
+            project_path = os.path.join(work_dir, f"project_{scan_mode}")
+            start = time.perf_counter()
+            expected_used = generate_project(project_path, args.assets, args.php_files, args.php_size_kb,
+                                             args.ref_density, args.depth, args.asset_size_kb, args.seed)
+            if not args.json:
+                print(f"Generated {project_path} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+            # A fresh process per mode, so its peak memory leaves out the generator and the other modes
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                result = executor.submit(run_benchmark, project_path, os.path.join(work_dir, f"backup_{scan_mode}"),
+                                         scan_mode, args.workers, args.chunk_size, expected_used).result()
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print_report(result)
+            if not result["correct"]:
+                exit_code = 1
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# [END OF SCRIPT benchmark_unused_assets.py]
@@ -0,0 +1,112 @@
+import os
+import shutil
+
+import pytest
+
+import unused_assets_core
+from unused_assets_core import MANIFEST_NAME, MoveManifest, relocate_files, restore_from_manifest
+
+
+@pytest.fixture
+def project(tmp_path):
+    """A project with two assets and an empty backup directory."""
+    (tmp_path / "project" / "img").mkdir(parents=True)
+    (tmp_path / "project" / "img" / "a.png").write_bytes(b"a" * 1000)
+    (tmp_path / "project" / "img" / "b.png").write_bytes(b"b" * 2000)
+    (tmp_path / "backup").mkdir()
+    return tmp_path
+
+
+def move_assets(project, monkeypatch, rename_works=True):
+    if not rename_works:
+        def refuse(source, target):
+            raise OSError("cross-device link")
+        monkeypatch.setattr(unused_assets_core.os, "rename", refuse)
+    manifest = MoveManifest(str(project / "backup"), str(project / "project"))
+    moves = [(str(project / "project" / "img" / name), str(project / "backup" / "img" / name)) for name in ("a.png", "b.png")]
+    moved, failed = relocate_files(moves, manifest=manifest)
+    manifest.close()
+    monkeypatch.undo()
+    assert len(moved) == 2 and failed == []
+    return str(project / "backup" / MANIFEST_NAME)
+
+
+def test_renamed_files_are_not_hashed(project, monkeypatch):
+    def no_digest(path):
+        raise AssertionError(f"{path} was hashed")
+    monkeypatch.setattr(unused_assets_core, "file_digest", no_digest)
+    manifest_path = move_assets(project, monkeypatch)
+    records = MoveManifest.read(manifest_path)
+    assert sorted(record["size"] for record in records) == [1000, 2000]
+    assert all("mtime_ns" in record and "hash" not in record for record in records)
+
+
+def test_refused_renames_are_recorded_again_with_hash(project, monkeypatch):
+    records = MoveManifest.read(move_assets(project, monkeypatch, rename_works=False))
+    assert len(records) == 2
+    assert all("hash" in record for record in records)
+
+
+@pytest.mark.parametrize("rename_works", [True, False])
+def test_moved_files_are_restored(project, monkeypatch, rename_works):
+    manifest_path = move_assets(project, monkeypatch, rename_works)
+    restored, failed = restore_from_manifest(manifest_path)
+    assert len(restored) == 2 and failed == []
+    assert (project / "project" / "img" / "b.png").read_bytes() == b"b" * 2000
+
+
+@pytest.mark.parametrize("rename_works", [True, False])
+def test_changed_files_are_not_restored(project, monkeypatch, rename_works):
+    manifest_path = move_assets(project, monkeypatch, rename_works)
+    changed = project / "backup" / "img" / "a.png"
+    changed.write_bytes(b"x" * 1000)
+    os.utime(changed, ns=(0, 0))
+    restored, failed = restore_from_manifest(manifest_path)
+    assert restored == [str(project / "project" / "img" / "b.png")]
+    assert [source for source, _ in failed] == [str(project / "project" / "img" / "a.png")]
+
+
+def interrupted_assets(project):
+    """Paths of a.png in the project and in the backup directory."""
+    return project / "project" / "img" / "a.png", project / "backup" / "img" / "a.png"
+
+
+@pytest.mark.parametrize("rename_works", [True, False])
+def test_restore_resumes_move_interrupted_before_removing_original(project, monkeypatch, rename_works):
+    manifest_path = move_assets(project, monkeypatch, rename_works)
+    source, target = interrupted_assets(project)
+    shutil.copy2(target, source)  # The copy was complete, the original not removed yet
+    restored, failed = restore_from_manifest(manifest_path)
+    assert len(restored) == 2 and failed == []
+    assert source.read_bytes() == b"a" * 1000 and not target.exists()
+
+
+@pytest.mark.parametrize("rename_works", [True, False])
+def test_restore_resumes_move_interrupted_while_copying(project, monkeypatch, rename_works):
+    manifest_path = move_assets(project, monkeypatch, rename_works)
+    source, target = interrupted_assets(project)
+    shutil.copy2(target, source)
+    with open(target, "r+b") as f:
+        f.truncate(400)  # The copy into the backup directory stopped part way
+    restored, failed = restore_from_manifest(manifest_path)
+    assert len(restored) == 2 and failed == []
+    assert source.read_bytes() == b"a" * 1000 and not target.exists()
+
+
+@pytest.mark.parametrize("rename_works", [True, False])
+def test_restore_overwrites_partial_copy_of_interrupted_restore(project, monkeypatch, rename_works):
+    manifest_path = move_assets(project, monkeypatch, rename_works)
+    source, target = interrupted_assets(project)
+    source.write_bytes(b"a" * 400)  # A restore from another filesystem stopped part way
+    backup_dir = str(project / "backup")
+    replace = os.replace
+
+    def replace_within_filesystem(source_path, target_path):
+        if str(source_path).startswith(backup_dir):
+            raise OSError("cross-device link")
+        replace(source_path, target_path)
+    monkeypatch.setattr(unused_assets_core.os, "replace", replace_within_filesystem)
+    restored, failed = restore_from_manifest(manifest_path)
+    assert len(restored) == 2 and failed == []
+    assert source.read_bytes() == b"a" * 1000 and not target.exists()
+    assert sorted(os.listdir(source.parent)) == ["a.png", "b.png"]  # No temporary copy left
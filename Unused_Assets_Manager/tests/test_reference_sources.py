@@ -0,0 +1,55 @@
+import pytest
+
+from unused_assets_core import AssetReferenceMatcher, UnusedAssetsScanner, extract_references, scan_reference_chunk
+
+
+@pytest.mark.parametrize("content, source_name, reference", [
+    ("<p>Don't</p><img src='b.png'>", "html", "'b.png'"),
+    ("/* don't */ .a{background:url('bg.png')}", "css", "'bg.png'"),
+    ("/* user's */ const y = 'hero.jpg';", "js", "'hero.jpg'"),
+])
+def test_apostrophes_in_text_and_comments_do_not_hide_references(content, source_name, reference):
+    assert extract_references(content, source_name) == reference
+
+
+def test_html_keeps_inline_scripts_and_attributes():
+    content = ("<!-- it's old --><script>var a = 'c.png'; // don't\n</script>"
+               "<a href=page.html>Bob's <img src=\"d.png\"></a>")
+    fragments = extract_references(content, "html")
+    assert fragments.startswith("<script>var a = 'c.png';")
+    assert fragments.endswith("</script>\nhref=page.html\n\"d.png\"")
+    assert "old" not in fragments and "Bob" not in fragments
+
+
+def test_twig_expressions_between_text():
+    content = "<p>Bob's {{ asset('e.png') }} isn't {# it's #}</p>"
+    assert extract_references(content, "twig") == "'e.png'"
+
+
+def test_scan_finds_asset_referenced_after_an_apostrophe(tmp_path):
+    (tmp_path / "b.png").write_bytes(b"png")
+    (tmp_path / "unused.png").write_bytes(b"png")
+    (tmp_path / "index.html").write_text("<p>Don't</p><img src='b.png'>")
+    scanner = UnusedAssetsScanner(str(tmp_path), {".png"}, reference_sources=("php", "html"), cache_path=None)
+    unused = [record.path for record in scanner.iter_unused_assets()]
+    assert unused == [str(tmp_path / "unused.png")]
+
+
+def test_unchanged_large_file_is_not_tokenized(tmp_path, monkeypatch):
+    page = tmp_path / "page.php"
+    page.write_text("<img src='a.png'>\n" * 1000)
+    matcher = AssetReferenceMatcher(["a.png"])
+    [(_, content_hash, basenames)] = scan_reference_chunk([(str(page), None, "php")], matcher, large_file_threshold=100)
+    assert basenames == {"a.png"}
+
+    def find_basenames_in_chunks(chunks):
+        raise AssertionError("an unchanged file was tokenized")
+    monkeypatch.setattr(matcher, "find_basenames_in_chunks", find_basenames_in_chunks)
+    assert scan_reference_chunk([(str(page), content_hash, "php")], matcher, large_file_threshold=100) == [
+        (str(page), content_hash, None)]
+    monkeypatch.undo()
+
+    page.write_text("<img src='b.png'>\n" * 1000)
+    [(_, changed_hash, basenames)] = scan_reference_chunk([(str(page), content_hash, "php")], matcher,
+                                                         large_file_threshold=100)
+    assert changed_hash != content_hash and basenames == set()
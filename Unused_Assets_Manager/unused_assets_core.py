@@ -0,0 +1,1794 @@
+# [START OF SCRIPT unused_assets_core.py]
+# SCRIPT DETAILS: GUI-free scanning engine of the Unused Assets Manager.
+# It is imported by Unused_Assets_Manager.py and can be run on its own as a command line tool that streams
+# the unused assets of a project as JSON Lines, or restores the files of a backup from its move manifest, e.g.:
+#   python unused_assets_core.py scan /path/to/project -e .png .jpg --sources php js css --workers 8 > unused.jsonl
+#   python unused_assets_core.py restore /path/to/backup/move_manifest.jsonl
+#   python unused_assets_core.py watch /path/to/project -e .png .jpg --sources php js css
+
+import os
+import sys
+import re
+import json
+import time
+import shutil
+import sqlite3
+import codecs
+import hashlib
+import fnmatch
+import argparse
+import errno
+import threading
+import select
+import struct
+import ctypes
+import ctypes.util
+import multiprocessing
+from functools import partial
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+# Default location of the persistent scan cache
+DEFAULT_SCAN_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".unused_assets_manager", "scan_cache.sqlite")
+
+# Reference files above this size are streamed in fixed-size chunks instead of being read whole
+DEFAULT_LARGE_FILE_THRESHOLD = 32 * 1024 * 1024
+READ_CHUNK_SIZE = 4 * 1024 * 1024  # Bytes read at a time from a large reference file
+
+# Bytes hashed at each end of a file before duplicate candidates are fully hashed
+DUPLICATE_BLOCK_SIZE = 64 * 1024
+
+# Seconds between two snapshots of the project when watching without inotify
+DEFAULT_POLL_INTERVAL = 2.0
+
+# Journals written into a backup directory by a move and by a restore
+MANIFEST_NAME = "move_manifest.jsonl"
+RESTORE_LOG_NAME = "restore_progress.jsonl"
+RESTORE_TEMP_SUFFIX = ".restoring"  # Copy of a file restored from another filesystem, renamed once complete
+
+# Fragments of source text that can hold a file reference. The whole match is kept, quotes and brackets
+# included, so word boundaries around a basename are the same as in the original text.
+_DOUBLE_QUOTED = r'"(?:[^"\\\n]|\\.)*"'
+_SINGLE_QUOTED = r"'(?:[^'\\\n]|\\.)*'"
+_TEMPLATE_LITERAL = r'`(?:[^`\\]|\\.)*`'
+_CSS_URL = r'url\(\s*[^)"\'\s]*\s*\)'  # Unquoted url(...), quoted ones are string literals
+_HTML_ATTRIBUTE = r'\b(?:src|href|srcset|poster|data-[\w-]+)\s*=\s*[^\s"\'>]+'  # Unquoted attribute values
+# Inline scripts and styles are kept whole, they are searched like the text of a php file
+_HTML_RAW_ELEMENT = r'<(?i:script|style)\b[\s\S]*?</(?i:script|style)\s*>'
+
+# Text that never holds a reference. It is matched, so an apostrophe in a comment or in prose cannot be taken
+# for the opening quote of a string, and then dropped.
+_BLOCK_COMMENT = r'/\*[\s\S]*?\*/'
+_LINE_COMMENT = r'//[^\n]*'
+_HTML_COMMENT = r'<!--[\s\S]*?-->'
+_TWIG_COMMENT = r'\{#[\s\S]*?#\}'
+# Text between tags (or Twig tags), up to the next tag or Twig tag
+_HTML_TEXT = r'(?:(?<=>)|(?<=\}\})|(?<=%\})|(?<=#\})|^)(?:[^<{]|\{(?![{%#]))+'
+
+
+def _extractor(fragments, skipped):
+    """
+    Compiles the fragments of a reference source and the text it skips into one pattern scanned in one pass.
+    The skipped text comes first: text starting right after a tag is prose even when it starts with a quote.
+    """
+    return re.compile("(?P<skip>" + "|".join(skipped) + ")|" + "|".join(fragments))
+
+
+# A kind of file searched for asset references: its glob patterns and the extractor applied to its text.
+# An extractor of None searches the whole text.
+ReferenceSource = namedtuple("ReferenceSource", ["name", "globs", "extractor"])
+
+REFERENCE_SOURCES = {
+    "php": ReferenceSource("php", ("*.php",), None),
+    "js": ReferenceSource("js", ("*.js", "*.mjs", "*.jsx", "*.ts"),
+                          _extractor([_DOUBLE_QUOTED, _SINGLE_QUOTED, _TEMPLATE_LITERAL], [_BLOCK_COMMENT, _LINE_COMMENT])),
+    "css": ReferenceSource("css", ("*.css", "*.scss", "*.less"),
+                           _extractor([_DOUBLE_QUOTED, _SINGLE_QUOTED, _CSS_URL], [_BLOCK_COMMENT])),
+    "html": ReferenceSource("html", ("*.html", "*.htm"),
+                            _extractor([_HTML_RAW_ELEMENT, _DOUBLE_QUOTED, _SINGLE_QUOTED, _HTML_ATTRIBUTE, _CSS_URL],
+                                       [_HTML_COMMENT, _HTML_TEXT])),
+    "twig": ReferenceSource("twig", ("*.twig",),
+                            _extractor([_HTML_RAW_ELEMENT, _DOUBLE_QUOTED, _SINGLE_QUOTED, _HTML_ATTRIBUTE, _CSS_URL],
+                                       [_HTML_COMMENT, _TWIG_COMMENT, _HTML_TEXT])),
+    "json": ReferenceSource("json", ("*.json",), re.compile(_DOUBLE_QUOTED)),
+    "text": ReferenceSource("text", (), None),  # Files given by custom glob patterns
+}
+
+def extract_references(content, source_name):
+    """
+    Returns the parts of a text that can reference asset files for the given reference source.
+
+    Quoted strings cover import and require paths, src and href values, url("...") and JSON values;
+    unquoted url(...) and attribute values are matched separately. Comments, and the text between HTML
+    tags, are matched in the same pass and left out, so their apostrophes cannot pair with real quotes.
+
+    Args:
+        content (str): The file content.
+        source_name (str): Name of the reference source in REFERENCE_SOURCES.
+
+    Returns:
+        str: The fragments joined by newlines, or the whole text for sources without an extractor.
+    """
+    extractor = REFERENCE_SOURCES[source_name].extractor
+    if extractor is None:
+        return content
+    return "\n".join(match.group(0) for match in extractor.finditer(content) if match.lastgroup != "skip")
+
+# One file of the project inventory
+InventoryEntry = namedtuple("InventoryEntry", ["path", "extension", "size", "mtime"])
+
+class ProjectInventory:
+    """
+    Lists every file of a project directory in a single os.scandir traversal.
+
+    The inventory is built once and shared by every step of a run (extension listing, asset collection
+    and the reference scan) so the project tree is never walked more than once.
+    """
+
+    def __init__(self, project_path):
+        """
+        Walks the project directory and indexes its files by extension.
+
+        Args:
+            project_path (str): The project directory to scan.
+        """
+        self.project_path = project_path
+        self.entries = []  # List of InventoryEntry for every file in the project
+        self.by_extension = {}  # Extension -> list of InventoryEntry
+        self.scan()
+
+    def scan(self):
+        """
+        Traverses the project directory iteratively, recording path, extension, size and mtime of each file.
+        Like os.walk, unreadable directories are skipped and symlinked directories are not followed.
+        """
+        pending_dirs = [self.project_path]
+        while pending_dirs:
+            current_dir = pending_dirs.pop()
+            try:
+                with os.scandir(current_dir) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir():
+                                if not entry.is_symlink():
+                                    pending_dirs.append(entry.path)
+                                continue
+                            stat = entry.stat()
+                            size, mtime = stat.st_size, stat.st_mtime
+                        except OSError:
+                            size, mtime = 0, 0.0  # Broken symlink or file removed during the scan
+                        _, extension = os.path.splitext(entry.name)
+                        record = InventoryEntry(entry.path, extension, size, mtime)
+                        self.entries.append(record)
+                        self.by_extension.setdefault(extension, []).append(record)
+            except OSError as e:
+                print(f"Error scanning directory {current_dir}: {repr(e)}", file=sys.stderr)
+
+    def extensions(self):
+        """
+        Returns the set of non-empty file extensions found in the project.
+        """
+        return {extension for extension in self.by_extension if extension}
+
+    def files_with_extensions(self, extensions):
+        """
+        Returns the paths of all files having one of the given extensions.
+
+        Args:
+            extensions (iterable): Extensions to look up, e.g. {".png", ".jpg"}.
+
+        Returns:
+            list: Paths of the matching files.
+        """
+        return [record.path for extension in extensions for record in self.by_extension.get(extension, [])]
+
+    def entries_matching(self, patterns):
+        """
+        Returns the inventory entries whose file name matches one of the given glob patterns.
+        Patterns of the form "*.ext" are looked up in the extension index instead of being matched.
+
+        Args:
+            patterns (iterable): Glob patterns such as "*.php" or "header_*.html".
+
+        Returns:
+            list: The matching InventoryEntry records, each listed once.
+        """
+        extension_patterns = set()
+        name_patterns = []
+        for pattern in patterns:
+            suffix = pattern[1:]
+            if pattern.startswith("*.") and suffix.count(".") == 1 and not any(c in suffix for c in "*?["):
+                extension_patterns.add(suffix)
+            else:
+                name_patterns.append(pattern)
+
+        matches = [record for extension in extension_patterns for record in self.by_extension.get(extension, [])]
+        if name_patterns:
+            matches.extend(record for record in self.entries
+                           if record.extension not in extension_patterns
+                           and any(fnmatch.fnmatchcase(os.path.basename(record.path), pattern) for pattern in name_patterns))
+        return matches
+
+
+class AssetReferenceMatcher:
+    """
+    Finds every asset basename referenced in a text in a single pass over that text.
+
+    The matcher is built once per run from the list of asset files and shared by all workers.
+    It gives the same results as searching each escaped basename between word boundaries with re.search.
+    """
+
+    WORD_RUN = re.compile(r'\w+')  # Maximal runs of word characters, the tokens used for indexing
+
+    def __init__(self, asset_files):
+        """
+        Builds the token index for the given asset files.
+
+        Every word-character run inside a basename must appear as a complete token in any text where the
+        basename matches with word boundaries, so a basename is only verified with its regex when all of
+        its runs are present in the text's token set.
+
+        Args:
+            asset_files (iterable): Asset file paths, or bare basenames, to look for.
+        """
+        self.assets_by_basename = {}  # Basename -> list of asset paths sharing that basename
+        for asset_file in asset_files:
+            self.assets_by_basename.setdefault(os.path.basename(asset_file), []).append(asset_file)
+
+        self.candidates_by_anchor = {}  # Anchor token -> list of (basename, required tokens, pattern)
+        self.untokenized = []  # (basename, pattern) for basenames without any word characters
+        for basename in self.assets_by_basename:
+            pattern = re.compile(r'\b' + re.escape(basename) + r'\b')
+            tokens = frozenset(self.WORD_RUN.findall(basename))
+            if not tokens:
+                self.untokenized.append((basename, pattern))
+                continue
+            anchor = max(tokens, key=len)  # The longest token is the most selective one
+            self.candidates_by_anchor.setdefault(anchor, []).append((basename, tokens, pattern))
+
+        # Longest basename, a match plus its boundary characters always fits in this many characters + 2
+        self.max_basename_length = max(map(len, self.assets_by_basename), default=0)
+
+    def find_basenames(self, content, start=0, limit=None, content_tokens=None):
+        """
+        Returns the set of asset basenames referenced in the given text.
+
+        Args:
+            content (str): The text to search.
+            start (int): Only matches starting at or after this index count. The characters before it are still
+                used to decide word boundaries.
+            limit (int): Only matches starting before this index count, defaults to the end of the text.
+            content_tokens (set): The word-character runs of the text when the caller already has them.
+
+        Returns:
+            set: Basenames matched with word-boundary semantics.
+        """
+        found = set()
+        if content_tokens is None:
+            content_tokens = set(self.WORD_RUN.findall(content))  # One scan of the text
+        for anchor in content_tokens.intersection(self.candidates_by_anchor):
+            for basename, tokens, pattern in self.candidates_by_anchor[anchor]:
+                if tokens <= content_tokens and self._search(pattern, content, start, limit):
+                    found.add(basename)
+        for basename, pattern in self.untokenized:
+            if self._search(pattern, content, start, limit):
+                found.add(basename)
+        return found
+
+    @staticmethod
+    def _search(pattern, content, start, limit):
+        """Returns True if the pattern matches at an index in [start, limit) of the text."""
+        match = pattern.search(content, start)
+        return match is not None and (limit is None or match.start() < limit)
+
+    def find_basenames_in_chunks(self, chunks):
+        """
+        Returns the set of asset basenames referenced in a text given as a sequence of chunks.
+
+        Only a window of one chunk plus an overlap of the longest basename is kept in memory. Matches are
+        only accepted once the characters on both sides of them are in the window, so the results are the
+        same as find_basenames on the whole text.
+
+        Args:
+            chunks (iterable): The consecutive str chunks of the text.
+
+        Returns:
+            set: Basenames matched with word-boundary semantics.
+        """
+        found = set()
+        overlap = self.max_basename_length + 1
+        window = ""
+        start = 0  # Index where unsearched matches can start, the character before it is boundary context
+        for chunk in chunks:
+            window += chunk
+            limit = len(window) - overlap  # A match starting before this index ends inside the window
+            if limit > start:
+                found |= self.find_basenames(window, start, limit)
+                window = window[limit - 1:]
+                start = 1
+        found |= self.find_basenames(window, start)
+        return found
+
+    def find_used_assets(self, content):
+        """
+        Returns the asset paths whose basename is referenced in the given text.
+
+        Args:
+            content (str): The text to search.
+
+        Returns:
+            set: Paths of referenced asset files.
+        """
+        used = set()
+        for basename in self.find_basenames(content):
+            used.update(self.assets_by_basename[basename])
+        return used
+
+
+# Matcher shared by the files scanned in a worker process, set once by the pool initializer
+_process_matcher = None
+
+def _init_scan_worker(matcher):
+    """
+    Stores the asset matcher in a worker process of the scan pool.
+
+    Args:
+        matcher (AssetReferenceMatcher): The matcher built by the parent process.
+    """
+    global _process_matcher
+    _process_matcher = matcher
+
+def _read_text_chunks(binary_file, digest):
+    """
+    Reads a file in fixed-size chunks, feeding the raw bytes to a hash and yielding them decoded as UTF-8.
+
+    Args:
+        binary_file: A file opened in binary mode.
+        digest: A hashlib object updated with every chunk read.
+
+    Yields:
+        str: The decoded chunks, multi-byte characters split between reads are decoded as a whole.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    while True:
+        data = binary_file.read(READ_CHUNK_SIZE)
+        if not data:
+            break
+        digest.update(data)
+        yield decoder.decode(data)
+    yield decoder.decode(b"", final=True)
+
+def scan_reference_chunk(reference_files, matcher=None, large_file_threshold=DEFAULT_LARGE_FILE_THRESHOLD):
+    """
+    Searches a chunk of reference files for references to asset basenames.
+
+    Runs in a worker thread or a worker process and only returns its results, it never touches the
+    caller's state. Each file is read once and passed through the extractor of its reference source.
+    A file whose content hash equals the hash known from the scan cache is not tokenized.
+
+    Files larger than large_file_threshold are streamed in chunks with bounded memory and their whole text is
+    searched, skipping the extractor, so they can only gain references compared to the extracted search. When
+    their hash is known they are hashed in a first pass and only streamed through the matcher if it changed.
+
+    Args:
+        reference_files (list): (path, known content hash or None, reference source name) of the files in this chunk.
+        matcher (AssetReferenceMatcher): The matcher to use, defaults to the one set by _init_scan_worker.
+        large_file_threshold (int): Size in bytes above which a file is streamed in chunks.
+
+    Returns:
+        list: (path, content hash, referenced basenames) per file. The basenames are None when the content
+        hash is unchanged, and the hash is None when the file could not be read.
+    """
+    matcher = matcher or _process_matcher
+    results = []
+    for file_path, known_hash, source_name in reference_files:
+        try:
+            with open(file_path, "rb") as ref_file:
+                if os.fstat(ref_file.fileno()).st_size > large_file_threshold:
+                    basenames = None
+                    content_hash = file_digest(file_path) if known_hash else None
+                    if content_hash is None or content_hash != known_hash:
+                        digest = hashlib.blake2b(digest_size=16)
+                        basenames = matcher.find_basenames_in_chunks(_read_text_chunks(ref_file, digest))
+                        content_hash = digest.hexdigest()
+                else:
+                    data = ref_file.read()
+                    content_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+                    basenames = None
+                    if content_hash != known_hash:
+                        content = extract_references(data.decode("utf-8", errors="ignore"), source_name)
+                        basenames = matcher.find_basenames(content)
+            if content_hash == known_hash:
+                basenames = None  # Only the mtime changed
+            results.append((file_path, content_hash, basenames))
+        except Exception as e:
+            print(f"Error reading file {file_path}: {repr(e)}", file=sys.stderr)  # Error handling for file read
+            results.append((file_path, None, set()))
+    return results
+
+
+class ScanCache:
+    """
+    On-disk SQLite cache of the reference search results of a project.
+
+    For every scanned reference file it stores size, mtime, content hash, reference source and the asset
+    basenames the file references. The basenames searched so far form the cache vocabulary: cached results
+    are only valid while every current asset basename is part of it.
+    """
+
+    SCHEMA_VERSION = 2  # Databases written with another layout are emptied on open
+
+    def __init__(self, cache_path, project_path):
+        """
+        Opens (and creates if needed) the cache database.
+
+        Args:
+            cache_path (str): Path of the SQLite database file.
+            project_path (str): The project the cached results belong to.
+        """
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        self.project_path = project_path
+        self.connection = sqlite3.connect(cache_path)
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+            with self.connection:
+                self.connection.execute("DROP TABLE IF EXISTS files")
+                self.connection.execute("DROP TABLE IF EXISTS vocabulary")
+                self.connection.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS files (project TEXT, path TEXT, size INTEGER, mtime REAL, "
+                                "hash TEXT, source TEXT, refs TEXT, PRIMARY KEY (project, path))")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS vocabulary (project TEXT, basename TEXT, "
+                                "PRIMARY KEY (project, basename))")
+
+    def vocabulary(self):
+        """
+        Returns the set of asset basenames the cached results were searched for.
+        """
+        rows = self.connection.execute("SELECT basename FROM vocabulary WHERE project = ?", (self.project_path,))
+        return {basename for (basename,) in rows}
+
+    def load(self):
+        """
+        Returns the cached entries of the project.
+
+        Returns:
+            dict: Path -> (size, mtime, hash, reference source name, set of referenced basenames).
+        """
+        rows = self.connection.execute("SELECT path, size, mtime, hash, source, refs FROM files WHERE project = ?", (self.project_path,))
+        return {path: (size, mtime, content_hash, source, set(json.loads(refs)))
+                for path, size, mtime, content_hash, source, refs in rows}
+
+    def replace(self, entries, vocabulary):
+        """
+        Replaces the cached entries and vocabulary of the project.
+
+        Args:
+            entries (dict): Path -> (size, mtime, hash, reference source name, set of referenced basenames).
+            vocabulary (set): The basenames the entries were searched for.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM files WHERE project = ?", (self.project_path,))
+            self.connection.execute("DELETE FROM vocabulary WHERE project = ?", (self.project_path,))
+            self.connection.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                        ((self.project_path, path, size, mtime, content_hash, source, json.dumps(sorted(refs)))
+                                         for path, (size, mtime, content_hash, source, refs) in entries.items()))
+            self.connection.executemany("INSERT INTO vocabulary VALUES (?, ?)",
+                                        ((self.project_path, basename) for basename in vocabulary))
+
+    def clear(self):
+        """
+        Invalidates the whole cache, for every project.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM files")
+            self.connection.execute("DELETE FROM vocabulary")
+
+    def close(self):
+        """Closes the database connection."""
+        self.connection.close()
+
+
+class UnusedAssetsScanner:
+    """
+    Finds the unused asset files of a project without any user interface.
+
+    An asset is used when its basename appears, between word boundaries, in the reference fragments of one
+    of the reference files (see REFERENCE_SOURCES). Progress and log messages are reported through optional callbacks so the same engine drives the
+    Tk window and the command line.
+    """
+
+    def __init__(self, project_path, asset_extensions, reference_sources=("php",), reference_globs=(), worker_count=None,
+                 chunk_size=64, scan_mode="thread", cache_path=DEFAULT_SCAN_CACHE_PATH, inventory=None, progress=None, log=None,
+                 large_file_threshold=DEFAULT_LARGE_FILE_THRESHOLD):
+        """
+        Stores the scan settings.
+
+        Args:
+            project_path (str): The project directory to scan.
+            asset_extensions (iterable): Extensions of the asset files, e.g. {".png", ".jpg"}.
+            reference_sources (iterable): Names of the REFERENCE_SOURCES whose files are searched for references.
+            reference_globs (iterable): Glob patterns of additional files whose whole text is searched.
+            worker_count (int): Number of scan workers, defaults to the number of CPUs.
+            chunk_size (int): Number of reference files handed to a worker at a time.
+            scan_mode (str): "thread" or "process".
+            cache_path (str): Path of the scan cache database, or None to disable the cache.
+            inventory (ProjectInventory): An inventory of the project already built by the caller.
+            progress (callable): Called with (processed, total, last file) after each scanned chunk.
+            log (callable): Called with each log message.
+            large_file_threshold (int): Reference files above this size in bytes are streamed in chunks.
+        """
+        self.project_path = project_path
+        self.asset_extensions = set(asset_extensions)
+        unknown_sources = set(reference_sources) - set(REFERENCE_SOURCES)
+        if unknown_sources:
+            raise ValueError(f"Unknown reference sources: {', '.join(sorted(unknown_sources))}")
+        self.reference_sources = list(reference_sources)
+        self.reference_globs = list(reference_globs)
+        self.worker_count = worker_count or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.scan_mode = scan_mode
+        self.cache_path = cache_path
+        self.inventory = inventory
+        self.progress = progress or (lambda processed, total, last_file: None)
+        self.log = log or (lambda message: None)
+        self.large_file_threshold = large_file_threshold
+        self.used_files = set()  # Assets referenced by at least one reference file
+        self.timings = {}  # Seconds spent in the "index" and "scan" phases of the last find_used_assets call
+        self.scanned_bytes = 0  # Size of the reference files read by the last find_used_assets call
+
+    def get_inventory(self):
+        """
+        Returns the project inventory, walking the project directory on first use.
+        """
+        if self.inventory is None or self.inventory.project_path != self.project_path:
+            self.inventory = ProjectInventory(self.project_path)
+        return self.inventory
+
+    def asset_entries(self):
+        """
+        Returns the inventory entries of all asset files with the selected extensions.
+        """
+        inventory = self.get_inventory()
+        return [record for extension in self.asset_extensions for record in inventory.by_extension.get(extension, [])]
+
+    def asset_files(self):
+        """
+        Returns the paths of all asset files with the selected extensions.
+        """
+        return [record.path for record in self.asset_entries()]
+
+    def active_reference_sources(self):
+        """
+        Returns the ReferenceSource of every selected source, in priority order, followed by a "text" source
+        holding the custom glob patterns if any were given.
+        """
+        sources = [REFERENCE_SOURCES[name] for name in self.reference_sources]
+        if self.reference_globs:
+            sources.append(REFERENCE_SOURCES["text"]._replace(globs=tuple(self.reference_globs)))
+        return sources
+
+    def reference_entries(self):
+        """
+        Assigns every reference file of the project to the first reference source that matches it, so each
+        file is read only once even when several sources match it.
+
+        Returns:
+            list: (InventoryEntry, reference source name) pairs.
+        """
+        inventory = self.get_inventory()
+        assigned = {}
+        for source in self.active_reference_sources():
+            for record in inventory.entries_matching(source.globs):
+                if record.path not in assigned:
+                    assigned[record.path] = (record, source.name)
+        return list(assigned.values())
+
+    def find_used_assets(self, asset_files):
+        """
+        Searches the reference files concurrently for references to the given asset files.
+
+        The reference files are split into chunks of self.chunk_size and scanned by self.worker_count workers,
+        either threads or processes depending on self.scan_mode. Workers return the basenames they found and
+        only this method updates self.used_files.
+
+        When the scan cache is enabled, files whose size and mtime are unchanged since the last run are not
+        read again, and files whose content hash is unchanged are not tokenized again.
+
+        Args:
+            asset_files (list): List of all asset files to check for references.
+
+        Returns:
+            set: The referenced asset files.
+        """
+        reference_records = self.reference_entries()
+
+        assets_by_basename = {}  # Basename -> asset paths sharing that basename
+        for asset_file in asset_files:
+            assets_by_basename.setdefault(os.path.basename(asset_file), []).append(asset_file)
+        search_names = set(assets_by_basename)
+
+        # Load the cached results, they are only usable if they were searched for every current basename
+        cache = None
+        cached = {}
+        if self.cache_path:
+            cache = ScanCache(self.cache_path, self.project_path)
+            vocabulary = cache.vocabulary()
+            if search_names <= vocabulary:
+                cached = cache.load()
+            search_names |= vocabulary  # Keep the cache valid for basenames searched in earlier runs
+
+        # Split the reference files into reusable cache entries and files to scan
+        file_entries = {}  # Path -> (size, mtime, hash, reference source name, referenced basenames)
+        to_scan = []
+        for record, source_name in reference_records:
+            entry = cached.get(record.path)
+            if entry and entry[3] != source_name:
+                entry = None  # Extracted with another reference source, the cached references don't apply
+            if entry and entry[0] == record.size and entry[1] == record.mtime:
+                file_entries[record.path] = entry
+            else:
+                to_scan.append((record.path, entry[2] if entry else None, source_name))
+        records_by_path = {record.path: (record, source_name) for record, source_name in reference_records}
+        self.log(f"Reusing cached results for {len(file_entries)} of {len(reference_records)} reference files")
+
+        # Build the matcher once and share it between all workers
+        index_start = time.perf_counter()
+        matcher = AssetReferenceMatcher(search_names)
+        self.timings["index"] = time.perf_counter() - index_start
+        scan_start = time.perf_counter()
+        self.scanned_bytes = sum(records_by_path[path][0].size for path, _, _ in to_scan)
+        chunks = [to_scan[i:i + self.chunk_size] for i in range(0, len(to_scan), self.chunk_size)]
+
+        if self.scan_mode == "process":
+            # Spawned processes don't inherit the Tk interpreter or the running threads
+            executor = ProcessPoolExecutor(max_workers=self.worker_count, mp_context=multiprocessing.get_context("spawn"),
+                                           initializer=_init_scan_worker, initargs=(matcher,))
+            scan_chunk = partial(scan_reference_chunk, large_file_threshold=self.large_file_threshold)
+        else:
+            executor = ThreadPoolExecutor(max_workers=self.worker_count)
+            scan_chunk = partial(scan_reference_chunk, matcher=matcher, large_file_threshold=self.large_file_threshold)
+
+        processed_files = 0
+        with executor:
+            futures = [executor.submit(scan_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                results = future.result()
+                for file_path, content_hash, basenames in results:
+                    record, source_name = records_by_path[file_path]
+                    if basenames is None:
+                        basenames = cached[file_path][4]  # Content unchanged, reuse the cached references
+                    file_entries[file_path] = (record.size, record.mtime, content_hash, source_name, basenames)
+                processed_files += len(results)
+                self.progress(processed_files, len(to_scan), results[-1][0])
+
+        # Merge the references of every reference file into the used files
+        for _, _, _, _, basenames in file_entries.values():
+            for basename in basenames:
+                self.used_files.update(assets_by_basename.get(basename, ()))
+
+        if cache is not None:
+            # Files that could not be read have no hash and are scanned again next time
+            cache.replace({path: entry for path, entry in file_entries.items() if entry[2] is not None}, search_names)
+            cache.close()
+        self.timings["scan"] = time.perf_counter() - scan_start
+        return self.used_files
+
+    def iter_unused_assets(self):
+        """
+        Scans the project and yields the inventory entry of every unused asset file, one at a time.
+        """
+        asset_records = self.asset_entries()
+        used_files = self.find_used_assets([record.path for record in asset_records])
+        for record in asset_records:
+            if record.path not in used_files:
+                yield record
+
+    def find_duplicate_assets(self, workers=8, progress=None):
+        """
+        Groups the byte-identical asset files of the project, see find_duplicate_assets.
+        The used members of each group come from the last find_used_assets call.
+
+        Args:
+            workers (int): Number of concurrent hashing threads.
+            progress (callable): Called with (hashed, total, last file) while hashing.
+
+        Returns:
+            list: DuplicateGroup tuples, largest wasted space first.
+        """
+        return find_duplicate_assets(self.asset_entries(), used_files=self.used_files, workers=workers, progress=progress)
+
+
+def file_digest(path):
+    """
+    Returns the BLAKE2b hex digest of a file, read in fixed-size chunks.
+
+    Args:
+        path (str): The file to hash.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for data in iter(lambda: f.read(READ_CHUNK_SIZE), b""):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+# A set of byte-identical files: their size, content hash, paths and the paths that are referenced
+DuplicateGroup = namedtuple("DuplicateGroup", ["size", "hash", "paths", "used_paths"])
+
+def _edge_digest(path, size, block_size):
+    """
+    Returns a hash of the first and last block_size bytes of a file. For files of at most two blocks this
+    covers the whole content.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        if size <= 2 * block_size:
+            digest.update(f.read())
+        else:
+            digest.update(f.read(block_size))
+            f.seek(-block_size, os.SEEK_END)
+            digest.update(f.read(block_size))
+    return digest.hexdigest()
+
+def find_duplicate_assets(records, used_files=(), workers=8, block_size=DUPLICATE_BLOCK_SIZE, progress=None):
+    """
+    Finds the groups of byte-identical files among inventory entries.
+
+    Files are compared in three stages, each only on the candidates left by the previous one: by size from
+    the inventory, by a hash of their first and last blocks, and by a hash of their whole content. Hashes are
+    computed by a pool of threads. Empty files are ignored.
+
+    Args:
+        records (list): InventoryEntry records of the files to compare.
+        used_files (set): Paths of the referenced files, reported for each group.
+        workers (int): Number of concurrent hashing threads.
+        block_size (int): Bytes hashed at each end of a file in the second stage.
+        progress (callable): Called with (hashed, total, last file) while hashing.
+
+    Returns:
+        list: DuplicateGroup tuples, largest wasted space first.
+    """
+    progress = progress or (lambda hashed, total, last_file: None)
+
+    by_size = {}
+    for record in records:
+        if record.size > 0:
+            by_size.setdefault(record.size, []).append(record)
+    candidates = [record for group in by_size.values() if len(group) > 1 for record in group]
+
+    def group_by_hash(group_records, hash_file, total, hashed_before):
+        """Hashes the records in parallel and returns the groups of two or more records with equal hashes."""
+        groups = {}
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {executor.submit(hash_file, record): record for record in group_records}
+            for hashed, future in enumerate(as_completed(futures), start=1):
+                record = futures[future]
+                try:
+                    groups.setdefault((record.size, future.result()), []).append(record)
+                except OSError as e:
+                    print(f"Error hashing file {record.path}: {repr(e)}", file=sys.stderr)
+                progress(hashed_before + hashed, total, record.path)
+        return {key: group for key, group in groups.items() if len(group) > 1}
+
+    # Hash both ends of every candidate; files of at most two blocks are then fully compared
+    edge_groups = group_by_hash(candidates, lambda record: _edge_digest(record.path, record.size, block_size),
+                                len(candidates), 0)
+    final_groups = {key: group for key, group in edge_groups.items() if key[0] <= 2 * block_size}
+    large = [record for key, group in edge_groups.items() if key[0] > 2 * block_size for record in group]
+    final_groups.update(group_by_hash(large, lambda record: file_digest(record.path), len(candidates) + len(large), len(candidates)))
+
+    used_files = set(used_files)
+    duplicates = [DuplicateGroup(size, content_hash, sorted(record.path for record in group),
+                                 sorted(record.path for record in group if record.path in used_files))
+                  for (size, content_hash), group in final_groups.items()]
+    duplicates.sort(key=lambda group: group.size * (len(group.paths) - 1), reverse=True)
+    return duplicates
+
+
+class MoveManifest:
+    """
+    Append-only journal of the files moved into a backup directory.
+
+    The first line is a header, then every file gets one JSON line with its original path, its path relative
+    to the backup directory and its size. A file moved by a rename keeps its inode, so its modification time
+    identifies it; a file copied to another filesystem also gets its hash. A line is written and flushed before
+    the file is moved, so after an interruption the manifest lists every file that may have left the project.
+    """
+
+    def __init__(self, backup_dir, project_path):
+        """
+        Opens the manifest of a backup directory for appending, writing the header if it is new.
+
+        Args:
+            backup_dir (str): The backup directory receiving the files.
+            project_path (str): The project the files are moved out of.
+        """
+        self.backup_dir = backup_dir
+        self.path = os.path.join(backup_dir, MANIFEST_NAME)
+        self.lock = threading.Lock()  # Moves are recorded from several copy threads
+        is_new = not os.path.exists(self.path)
+        self.stream = open(self.path, "a", encoding="utf-8")
+        if is_new:
+            self._write({"type": "header", "project": project_path, "created": time.strftime("%Y-%m-%d %H:%M:%S")})
+
+    def _write(self, record):
+        """Appends one record and flushes it to the operating system."""
+        with self.lock:
+            self.stream.write(json.dumps(record) + "\n")
+            self.stream.flush()
+
+    def record_move(self, source, target, copied=True):
+        """
+        Records a file that is about to be moved.
+
+        Args:
+            source (str): The original path of the file.
+            target (str): Its path inside the backup directory.
+            copied (bool): The file is copied and removed, so its hash is recorded. A file renamed on its
+                filesystem only gets its modification time, hashing it would read every byte of a move that
+                reads none.
+        """
+        info = os.stat(source)
+        record = {"type": "move", "source": source, "target": os.path.relpath(target, self.backup_dir), "size": info.st_size}
+        if copied:
+            record["hash"] = file_digest(source)
+        else:
+            record["mtime_ns"] = info.st_mtime_ns
+        self._write(record)
+
+    def close(self):
+        """Flushes the manifest to disk and closes it."""
+        with self.lock:
+            self.stream.flush()
+            os.fsync(self.stream.fileno())
+            self.stream.close()
+
+    @staticmethod
+    def read(manifest_path):
+        """
+        Reads the move records of a manifest, skipping a last line truncated by an interruption. A file
+        recorded again, after a rename the filesystem refused, keeps its last record.
+
+        Args:
+            manifest_path (str): Path of the manifest file.
+
+        Returns:
+            list: Move records with the target resolved to an absolute path.
+        """
+        backup_dir = os.path.dirname(os.path.abspath(manifest_path))
+        records = {}
+        with open(manifest_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("type") == "move":
+                    record["target"] = os.path.join(backup_dir, record["target"])
+                    records[record["source"]] = record
+        return list(records.values())
+
+    @staticmethod
+    def matches(path, record):
+        """
+        Checks a file against its move record: its size, then its hash or, for a renamed file, its modification time.
+
+        Args:
+            path (str): The moved file, or its original path.
+            record (dict): Its record from read().
+
+        Returns:
+            bool: True if the file is the one that was moved.
+        """
+        info = os.stat(path)
+        if info.st_size != record["size"]:
+            return False
+        if "hash" in record:
+            return file_digest(path) == record["hash"]
+        return info.st_mtime_ns == record["mtime_ns"]
+
+
+def _move_file(source, target, same_device, manifest, cancel_event):
+    """
+    Moves one file, recording it in the manifest first.
+
+    Same-device moves use os.rename; other moves, or renames the filesystem refuses, copy the file with its
+    metadata and remove the original. Only copied files are hashed for the manifest.
+
+    Returns:
+        bool: False if the move was skipped because of a cancellation.
+    """
+    if cancel_event is not None and cancel_event.is_set():
+        return False
+    if same_device:
+        if manifest is not None:
+            manifest.record_move(source, target, copied=False)
+        try:
+            os.rename(source, target)  # Same filesystem, a metadata-only move
+            return True
+        except OSError:
+            pass  # Fall back to a copy, e.g. for bind mounts reporting the same device
+    if manifest is not None:
+        manifest.record_move(source, target)
+    shutil.copy2(source, target)
+    os.remove(source)
+    return True
+
+def relocate_files(moves, copy_workers=8, progress=None, cancel_event=None, manifest=None):
+    """
+    Moves many files to new locations, creating every target directory once.
+
+    Target directories are created on the calling thread, the moves themselves run on a pool of copy_workers
+    threads. Moves within one filesystem are renames, moves to another filesystem are copies.
+
+    Args:
+        moves (list): (source path, target path) pairs.
+        copy_workers (int): Maximum number of concurrent moves.
+        progress (callable): Called with (moved, total, last source path) after every move.
+        cancel_event (threading.Event): When set, moves that have not started yet are skipped.
+        manifest (MoveManifest): Journal receiving a record for every file before it is moved.
+
+    Returns:
+        tuple: The list of moved (source, target) pairs and the list of failed (source, target, error) tuples.
+    """
+    progress = progress or (lambda moved, total, last_file: None)
+    moved, failed = [], []
+    total = len(moves)
+
+    # Group the moves by target directory so each directory is created and checked once
+    moves_by_dir = {}
+    for source, target in moves:
+        moves_by_dir.setdefault(os.path.dirname(target), []).append((source, target))
+
+    device_by_dir = {}  # Directory -> st_dev, cached because many files share a directory
+    def device_of(directory):
+        if directory not in device_by_dir:
+            device_by_dir[directory] = os.stat(directory).st_dev
+        return device_by_dir[directory]
+
+    with ThreadPoolExecutor(max_workers=max(1, copy_workers)) as executor:
+        jobs = {}
+        for target_dir, dir_moves in moves_by_dir.items():
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            try:
+                os.makedirs(target_dir, exist_ok=True)
+                target_device = device_of(target_dir)
+            except OSError as e:
+                failed.extend((source, target, repr(e)) for source, target in dir_moves)
+                continue
+
+            for source, target in dir_moves:
+                try:
+                    same_device = device_of(os.path.dirname(source)) == target_device
+                except OSError:
+                    same_device = False
+                jobs[executor.submit(_move_file, source, target, same_device, manifest, cancel_event)] = (source, target)
+
+        for future in as_completed(jobs):
+            source, target = jobs[future]
+            try:
+                if future.result():
+                    moved.append((source, target))
+                    progress(len(moved), total, source)
+            except OSError as e:
+                failed.append((source, target, repr(e)))
+    return moved, failed
+
+
+def restore_from_manifest(manifest_path, workers=8, progress=None, cancel_event=None):
+    """
+    Moves the files listed in a move manifest back to their original locations in parallel.
+
+    Every file is checked against its manifest record before it is restored, see MoveManifest.matches. Restored
+    files are appended to a restore log next to the manifest, so an interrupted restore resumes with the files
+    that are left. A file still matching its record at its original path was never moved or its move or
+    restore was interrupted after the copy: it is kept and the leftover backup copy is deleted. A file at its
+    original path that does not match is the partial copy of an interrupted restore and is overwritten.
+    Files are restored from another filesystem through a temporary copy renamed once complete.
+
+    Args:
+        manifest_path (str): Path of the move manifest.
+        workers (int): Number of concurrent restores.
+        progress (callable): Called with (restored, total, last original path) after every file.
+        cancel_event (threading.Event): When set, files that have not started yet are skipped.
+
+    Returns:
+        tuple: The list of restored original paths and the list of failed (original path, error) pairs.
+    """
+    progress = progress or (lambda restored, total, last_file: None)
+    records = MoveManifest.read(manifest_path)
+    log_path = os.path.join(os.path.dirname(os.path.abspath(manifest_path)), RESTORE_LOG_NAME)
+
+    # Skip the files a previous run already restored
+    done = set()
+    if os.path.exists(log_path):
+        with open(log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["source"])
+                except (ValueError, KeyError):
+                    continue
+    pending = [record for record in records if record["source"] not in done]
+
+    log_lock = threading.Lock()
+    restored, failed = [], []
+    with open(log_path, "a", encoding="utf-8") as log_stream:
+
+        def restore_one(record):
+            if cancel_event is not None and cancel_event.is_set():
+                return False
+            source, target = record["source"], record["target"]
+            if os.path.exists(source) and MoveManifest.matches(source, record):
+                # Never moved, restored by an interrupted run before it could log it, or its move was
+                # interrupted between the copy and the removal of the original
+                if os.path.exists(target):
+                    os.remove(target)
+            else:
+                if not MoveManifest.matches(target, record):
+                    raise ValueError(f"{target} does not match the size, hash or modification time in the manifest")
+                os.makedirs(os.path.dirname(source), exist_ok=True)
+                try:
+                    os.replace(target, source)  # Overwrites the partial copy of an interrupted restore
+                except OSError:
+                    expected = record.get("hash") or file_digest(target)  # Renamed files were not hashed when moved
+                    temp_path = source + RESTORE_TEMP_SUFFIX
+                    shutil.copy2(target, temp_path)  # The backup is on another filesystem
+                    if file_digest(temp_path) != expected:
+                        os.remove(temp_path)
+                        raise ValueError(f"{source} was corrupted while copying")
+                    os.replace(temp_path, source)
+                    os.remove(target)
+            with log_lock:
+                log_stream.write(json.dumps({"source": source}) + "\n")
+                log_stream.flush()
+            return True
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {executor.submit(restore_one, record): record["source"] for record in pending}
+            for future in as_completed(futures):
+                source = futures[future]
+                try:
+                    if future.result():
+                        restored.append(source)
+                        progress(len(done) + len(restored), len(records), source)
+                except (OSError, ValueError) as e:
+                    failed.append((source, repr(e)))
+    return restored, failed
+
+
+def index_reference_file(file_path, source_name, matcher, large_file_threshold=DEFAULT_LARGE_FILE_THRESHOLD):
+    """
+    Reads one reference file and returns its word tokens along with the asset basenames it references.
+
+    Args:
+        file_path (str): The reference file.
+        source_name (str): Name of its reference source in REFERENCE_SOURCES.
+        matcher (AssetReferenceMatcher): The basenames to look for.
+        large_file_threshold (int): Size in bytes above which the file is streamed in chunks.
+
+    Returns:
+        tuple: (tokens, basenames). tokens is the frozenset of word-character runs of the searched text, or
+        None for a streamed file whose tokens are not collected.
+    """
+    with open(file_path, "rb") as ref_file:
+        if os.fstat(ref_file.fileno()).st_size > large_file_threshold:
+            digest = hashlib.blake2b(digest_size=16)
+            return None, matcher.find_basenames_in_chunks(_read_text_chunks(ref_file, digest))
+        content = extract_references(ref_file.read().decode("utf-8", errors="ignore"), source_name)
+    tokens = frozenset(matcher.WORD_RUN.findall(content))
+    return tokens, matcher.find_basenames(content, content_tokens=tokens)
+
+
+class PollingWatcher:
+    """
+    Reports the files changed in a project by comparing inventory snapshots taken every few seconds.
+    Used where inotify is not available.
+    """
+
+    def __init__(self, project_path, interval=DEFAULT_POLL_INTERVAL):
+        """
+        Takes the first snapshot of the project.
+
+        Args:
+            project_path (str): The project directory to watch.
+            interval (float): Seconds between two snapshots.
+        """
+        self.project_path = project_path
+        self.interval = interval
+        self.snapshot = self.take_snapshot()
+        self.next_poll = time.monotonic() + interval
+
+    def take_snapshot(self):
+        """Returns the size and mtime of every file of the project, by path."""
+        return {record.path: (record.size, record.mtime) for record in ProjectInventory(self.project_path).entries}
+
+    def read_events(self, timeout):
+        """
+        Waits up to timeout seconds for the next snapshot and returns the differences with the previous one.
+
+        Args:
+            timeout (float): Maximum number of seconds to wait.
+
+        Returns:
+            list: (kind, path) events, kind is "changed" or "deleted".
+        """
+        wait = self.next_poll - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return []
+        time.sleep(max(wait, 0))
+        snapshot = self.take_snapshot()
+        self.next_poll = time.monotonic() + self.interval
+        events = [("deleted", path) for path in self.snapshot.keys() - snapshot.keys()]
+        events.extend(("changed", path) for path, stat in snapshot.items() if self.snapshot.get(path) != stat)
+        self.snapshot = snapshot
+        return events
+
+    def close(self):
+        """Nothing to release, present for symmetry with InotifyWatcher."""
+
+
+class InotifyWatcher:
+    """
+    Reports the files changed in a project with Linux inotify, called through ctypes so no extra package is needed.
+    Every directory of the project is watched, including the ones created while watching.
+    """
+
+    # Flags from <sys/inotify.h>
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_DONT_FOLLOW = 0x02000000
+    IN_ISDIR = 0x40000000
+    WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR | IN_DONT_FOLLOW
+    EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, length of the name that follows
+
+    def __init__(self, project_path):
+        """
+        Opens an inotify instance and watches every directory of the project.
+
+        Args:
+            project_path (str): The project directory to watch.
+
+        Raises:
+            OSError: If inotify is not available or the watch limit is reached.
+        """
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}  # Watch descriptor -> watched directory
+        try:
+            self.add_tree(project_path)
+        except OSError:
+            self.close()
+            raise
+
+    def add_tree(self, directory):
+        """
+        Watches a directory and every directory below it.
+
+        Args:
+            directory (str): The top directory.
+
+        Returns:
+            list: The files found below the directory, for directories created or moved in while watching.
+        """
+        files = []
+        pending_dirs = [directory]
+        while pending_dirs:
+            current_dir = pending_dirs.pop()
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(current_dir), self.WATCH_MASK)
+            if wd < 0:
+                error_code = ctypes.get_errno()
+                if error_code == errno.ENOSPC:
+                    raise OSError(error_code, "inotify watch limit reached, see /proc/sys/fs/inotify/max_user_watches")
+                continue  # Removed or unreadable directory
+            self.directories[wd] = current_dir
+            try:
+                with os.scandir(current_dir) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending_dirs.append(entry.path)
+                        else:
+                            files.append(entry.path)
+            except OSError:
+                continue
+        return files
+
+    def read_events(self, timeout):
+        """
+        Waits up to timeout seconds for inotify events and returns the ones available.
+
+        Args:
+            timeout (float): Maximum number of seconds to wait.
+
+        Returns:
+            list: (kind, path) events, kind is "changed", "deleted", "deleted_tree" for a directory removed or
+            moved out, or "rescan" with a None path when the kernel queue overflowed.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 1024 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+            if mask & self.IN_Q_OVERFLOW:
+                events.append(("rescan", None))
+                continue
+            if mask & self.IN_IGNORED:
+                self.directories.pop(wd, None)  # The directory was removed
+                continue
+            directory = self.directories.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    events.extend(("changed", file_path) for file_path in self.add_tree(path))
+                elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                    events.append(("deleted_tree", path))
+            elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                events.append(("deleted", path))
+            else:
+                events.append(("changed", path))
+        return events
+
+    def close(self):
+        """Closes the inotify instance, which removes all of its watches."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class LiveAssetIndex:
+    """
+    Keeps the asset inventory and the reference graph of a project in memory and updates them from file
+    system events, so the used and unused assets stay current without rescanning the project.
+
+    The reference graph maps every referenced basename to the reference files mentioning it. The word tokens
+    of each reference file are kept too, so when an asset with a new basename appears only the reference files
+    holding all of its tokens are read again. A changed reference file is the only file re-tokenized for its
+    event. Queries never touch the disk and can be made from any thread.
+    """
+
+    def __init__(self, project_path, asset_extensions, reference_sources=("php",), reference_globs=(), worker_count=None,
+                 large_file_threshold=DEFAULT_LARGE_FILE_THRESHOLD, progress=None, log=None):
+        """
+        Stores the index settings, the index itself is built by build() or watch().
+
+        Args:
+            project_path (str): The project directory to index.
+            asset_extensions (iterable): Extensions of the asset files, e.g. {".png", ".jpg"}.
+            reference_sources (iterable): Names of the REFERENCE_SOURCES whose files are searched for references.
+            reference_globs (iterable): Glob patterns of additional files whose whole text is searched.
+            worker_count (int): Number of threads reading reference files during the initial build.
+            large_file_threshold (int): Reference files above this size in bytes are streamed in chunks.
+            progress (callable): Called with (indexed, total, last file) during the initial build.
+            log (callable): Called with each log message.
+        """
+        # The scanner holds the shared settings and classifies the files of the initial inventory
+        self.scanner = UnusedAssetsScanner(project_path, asset_extensions, reference_sources, reference_globs,
+                                           worker_count=worker_count, cache_path=None, progress=progress, log=log,
+                                           large_file_threshold=large_file_threshold)
+        self.project_path = project_path
+        self.sources = self.scanner.active_reference_sources()
+        self.lock = threading.RLock()  # Guards every attribute below
+        self.assets_by_basename = {}  # Basename -> set of asset paths sharing that basename
+        self.sources_by_file = {}  # Reference file -> reference source name
+        self.tokens_by_file = {}  # Reference file -> frozenset of its tokens, None for streamed files
+        self.basenames_by_file = {}  # Reference file -> set of basenames it references
+        self.referrers = {}  # Basename -> set of reference files referencing it
+        self.vocabulary = set()  # Basenames every indexed reference file has been searched for
+        self.matcher = None  # AssetReferenceMatcher over the vocabulary, rebuilt after it grows
+        self.used_files = set()  # Assets referenced by at least one reference file
+        self.unused_files = set()  # Assets not referenced anywhere
+        self.changes = []  # (asset path, "used", "unused" or "deleted") collected while applying events
+        self.version = 0  # Incremented whenever the used or unused files change
+
+    def reference_source_of(self, path):
+        """
+        Returns the name of the first selected reference source matching a file name, or None.
+
+        Args:
+            path (str): The file path.
+        """
+        name = os.path.basename(path)
+        for source in self.sources:
+            if any(fnmatch.fnmatchcase(name, pattern) for pattern in source.globs):
+                return source.name
+        return None
+
+    def build(self):
+        """
+        Walks the project once and indexes every asset and reference file, reading the reference files with
+        a pool of threads.
+        """
+        self.scanner.inventory = ProjectInventory(self.project_path)
+        asset_files = self.scanner.asset_files()
+        reference_records = self.scanner.reference_entries()
+
+        with self.lock:
+            self.assets_by_basename = {}
+            for asset_file in asset_files:
+                self.assets_by_basename.setdefault(os.path.basename(asset_file), set()).add(asset_file)
+            self.sources_by_file, self.tokens_by_file, self.basenames_by_file, self.referrers = {}, {}, {}, {}
+            self.vocabulary = set(self.assets_by_basename)
+            self.matcher = AssetReferenceMatcher(self.vocabulary)
+            matcher = self.matcher
+
+        index_file = partial(index_reference_file, matcher=matcher, large_file_threshold=self.scanner.large_file_threshold)
+        with ThreadPoolExecutor(max_workers=self.scanner.worker_count) as executor:
+            futures = {executor.submit(index_file, record.path, source_name): (record.path, source_name)
+                       for record, source_name in reference_records}
+            for indexed, future in enumerate(as_completed(futures), 1):
+                file_path, source_name = futures[future]
+                try:
+                    tokens, basenames = future.result()
+                except OSError as e:
+                    self.scanner.log(f"Error reading file {file_path}: {repr(e)}")
+                    continue
+                with self.lock:
+                    self._set_references(file_path, source_name, tokens, basenames, update_assets=False)
+                self.scanner.progress(indexed, len(futures), file_path)
+
+        with self.lock:
+            self.used_files = {path for basename, paths in self.assets_by_basename.items() if basename in self.referrers
+                               for path in paths}
+            self.unused_files = set(asset_files) - self.used_files
+            self.changes = []
+            self.version += 1
+
+    def watch(self, stop_event, on_change=None, ready=None, poll_interval=None):
+        """
+        Builds the index and keeps it current until stop_event is set.
+
+        The watcher is started before the initial build so no change made during the build is lost.
+        inotify is used when available, otherwise the project is polled.
+
+        Args:
+            stop_event (threading.Event): Set to stop watching.
+            on_change (callable): Called with the list of (asset path, new state) after each batch of events.
+            ready (callable): Called once the initial build is done.
+            poll_interval (float): Poll every this many seconds instead of using inotify.
+        """
+        watcher = None
+        if poll_interval is None:
+            try:
+                watcher = InotifyWatcher(self.project_path)
+            except OSError as e:
+                self.scanner.log(f"inotify is not available ({repr(e)}), polling every {DEFAULT_POLL_INTERVAL} seconds")
+        if watcher is None:
+            watcher = PollingWatcher(self.project_path, poll_interval or DEFAULT_POLL_INTERVAL)
+
+        try:
+            self.build()
+            if ready:
+                ready()
+            while not stop_event.is_set():
+                events = watcher.read_events(0.5)
+                while events:
+                    more_events = watcher.read_events(0.05)  # Let a burst of events settle into one batch
+                    if not more_events:
+                        break
+                    events.extend(more_events)
+                if events:
+                    changes = self.apply_events(events)
+                    if changes and on_change:
+                        on_change(changes)
+        finally:
+            watcher.close()
+
+    def apply_events(self, events):
+        """
+        Updates the index for a batch of watcher events, reading each changed file at most once.
+
+        Args:
+            events (list): (kind, path) events from a watcher.
+
+        Returns:
+            list: (asset path, new state) for every asset whose state changed, the state being "used", "unused"
+            or "deleted".
+        """
+        if any(kind == "rescan" for kind, _ in events):
+            return self._rebuild()
+
+        latest = {}  # Path -> last event kind, so a file written several times is read once
+        for kind, path in events:
+            latest.pop(path, None)
+            latest[path] = kind
+        for path, kind in latest.items():
+            if kind == "deleted_tree":
+                self._remove_tree(path)
+            else:
+                self.refresh_file(path)
+
+        with self.lock:
+            changes, self.changes = self.changes, []
+            if changes:
+                self.version += 1
+        return changes
+
+    def _rebuild(self):
+        """Rebuilds the whole index, after the event queue overflowed, and returns the state changes."""
+        with self.lock:
+            before = dict.fromkeys(self.unused_files, "unused")
+            before.update(dict.fromkeys(self.used_files, "used"))
+        self.build()
+        with self.lock:
+            after = dict.fromkeys(self.unused_files, "unused")
+            after.update(dict.fromkeys(self.used_files, "used"))
+        changes = [(path, state) for path, state in after.items() if before.get(path) != state]
+        changes.extend((path, "deleted") for path in before.keys() - after.keys())
+        return changes
+
+    def refresh_file(self, path):
+        """
+        Brings the index up to date with one file after it was created, modified or deleted.
+
+        Args:
+            path (str): The file path.
+        """
+        exists = os.path.isfile(path)
+        if os.path.splitext(path)[1] in self.scanner.asset_extensions:
+            if exists:
+                self._add_asset(path)
+            else:
+                self._remove_asset(path)
+
+        source_name = self.reference_source_of(path)
+        if source_name is None:
+            return
+        if exists:
+            with self.lock:
+                if self.matcher is None:
+                    self.matcher = AssetReferenceMatcher(self.vocabulary)
+                matcher = self.matcher
+            try:
+                tokens, basenames = index_reference_file(path, source_name, matcher, self.scanner.large_file_threshold)
+            except OSError:
+                exists = False  # Removed since the event
+            else:
+                with self.lock:
+                    self._set_references(path, source_name, tokens, basenames)
+        if not exists:
+            with self.lock:
+                self._remove_references(path)
+
+    def _add_asset(self, path):
+        """Adds an asset file, first searching the indexed reference files for its basename if it is new."""
+        basename = os.path.basename(path)
+        with self.lock:
+            if path in self.assets_by_basename.get(basename, ()):
+                return
+            is_new_basename = basename not in self.vocabulary
+        if is_new_basename:
+            self._search_new_basename(basename)
+        with self.lock:
+            self.assets_by_basename.setdefault(basename, set()).add(path)
+            self._set_state(path, basename in self.referrers)
+
+    def _search_new_basename(self, basename):
+        """
+        Adds a basename to the vocabulary, reading only the reference files that contain all of its tokens.
+
+        Args:
+            basename (str): The basename of a new asset.
+        """
+        matcher = AssetReferenceMatcher([basename])
+        tokens = frozenset(matcher.WORD_RUN.findall(basename))
+        with self.lock:
+            candidates = [(path, self.sources_by_file[path]) for path, file_tokens in self.tokens_by_file.items()
+                          if file_tokens is None or tokens <= file_tokens]
+        referencing = []
+        for path, source_name in candidates:
+            try:
+                _, basenames = index_reference_file(path, source_name, matcher, self.scanner.large_file_threshold)
+            except OSError:
+                continue  # Removed meanwhile, its own event will follow
+            if basenames:
+                referencing.append(path)
+        with self.lock:
+            self.vocabulary.add(basename)
+            self.matcher = None  # Rebuilt with the new basename when a reference file changes
+            for path in referencing:
+                if path in self.basenames_by_file:
+                    self.basenames_by_file[path].add(basename)
+                    self.referrers.setdefault(basename, set()).add(path)
+
+    def _remove_asset(self, path):
+        """Removes an asset file from the index. The lock is taken by the caller or here."""
+        with self.lock:
+            basename = os.path.basename(path)
+            paths = self.assets_by_basename.get(basename)
+            if not paths or path not in paths:
+                return
+            paths.discard(path)
+            if not paths:
+                del self.assets_by_basename[basename]  # Stays in the vocabulary, the references are still valid
+            self.used_files.discard(path)
+            self.unused_files.discard(path)
+            self.changes.append((path, "deleted"))
+
+    def _remove_tree(self, directory):
+        """Removes every asset and reference file below a directory that was deleted or moved out."""
+        prefix = os.path.join(directory, "")
+        with self.lock:
+            assets = [path for paths in self.assets_by_basename.values() for path in paths if path.startswith(prefix)]
+            reference_files = [path for path in self.basenames_by_file if path.startswith(prefix)]
+            for path in assets:
+                self._remove_asset(path)
+            for path in reference_files:
+                self._remove_references(path)
+
+    def _set_references(self, path, source_name, tokens, basenames, update_assets=True):
+        """Replaces the references of a reference file in the graph. The caller holds the lock."""
+        old_basenames = self.basenames_by_file.get(path, set())
+        basenames = set(basenames)
+        self.sources_by_file[path] = source_name
+        self.tokens_by_file[path] = tokens
+        self.basenames_by_file[path] = basenames
+        for basename in old_basenames - basenames:
+            self._remove_referrer(basename, path)
+        for basename in basenames - old_basenames:
+            self.referrers.setdefault(basename, set()).add(path)
+        if update_assets:
+            self._update_basenames(old_basenames ^ basenames)
+
+    def _remove_references(self, path):
+        """Removes a reference file from the graph. The caller holds the lock."""
+        old_basenames = self.basenames_by_file.pop(path, set())
+        self.sources_by_file.pop(path, None)
+        self.tokens_by_file.pop(path, None)
+        for basename in old_basenames:
+            self._remove_referrer(basename, path)
+        self._update_basenames(old_basenames)
+
+    def _remove_referrer(self, basename, path):
+        """Unlinks a reference file from a basename. The caller holds the lock."""
+        referrers = self.referrers[basename]
+        referrers.discard(path)
+        if not referrers:
+            del self.referrers[basename]
+
+    def _update_basenames(self, basenames):
+        """Updates the state of the assets having one of the given basenames. The caller holds the lock."""
+        for basename in basenames:
+            used = basename in self.referrers
+            for path in self.assets_by_basename.get(basename, ()):
+                self._set_state(path, used)
+
+    def _set_state(self, path, used):
+        """Moves an asset to the used or unused files, recording the change. The caller holds the lock."""
+        if used and path not in self.used_files:
+            self.unused_files.discard(path)
+            self.used_files.add(path)
+            self.changes.append((path, "used"))
+        elif not used and path not in self.unused_files:
+            self.used_files.discard(path)
+            self.unused_files.add(path)
+            self.changes.append((path, "unused"))
+
+    def unused_assets(self):
+        """Returns the sorted paths of the unused assets."""
+        with self.lock:
+            return sorted(self.unused_files)
+
+    def used_assets(self):
+        """Returns the sorted paths of the used assets."""
+        with self.lock:
+            return sorted(self.used_files)
+
+    def is_used(self, path):
+        """
+        Returns True if an asset is referenced, False if it is not, and None if it is not an indexed asset.
+
+        Args:
+            path (str): The asset path.
+        """
+        with self.lock:
+            if path in self.used_files:
+                return True
+            return False if path in self.unused_files else None
+
+    def referencing_files(self, path):
+        """
+        Returns the sorted paths of the reference files referencing an asset's basename.
+
+        Args:
+            path (str): The asset path.
+        """
+        with self.lock:
+            return sorted(self.referrers.get(os.path.basename(path), ()))
+
+
+def write_json_lines(scanner, stream, duplicates=False):
+    """
+    Runs a scan and streams its results to a text stream as JSON Lines.
+
+    Every unused asset is written as soon as it is known, then every duplicate group if requested, followed
+    by a single summary line.
+
+    Args:
+        scanner (UnusedAssetsScanner): The configured scanner.
+        stream: A writable text stream.
+        duplicates (bool): Also report the groups of byte-identical assets.
+
+    Returns:
+        int: The number of unused assets written.
+    """
+    start_time = time.perf_counter()
+    unused_count = 0
+    for record in scanner.iter_unused_assets():
+        stream.write(json.dumps({"type": "unused", "path": record.path, "size": record.size}) + "\n")
+        unused_count += 1
+    summary = {"type": "summary", "project": scanner.project_path, "assets": len(scanner.asset_entries()),
+               "used": len(scanner.used_files), "unused": unused_count}
+    if duplicates:
+        groups = scanner.find_duplicate_assets(workers=scanner.worker_count)
+        for group in groups:
+            stream.write(json.dumps({"type": "duplicate", "size": group.size, "hash": group.hash,
+                                     "paths": group.paths, "used": group.used_paths}) + "\n")
+        summary["duplicate_groups"] = len(groups)
+        summary["duplicate_bytes"] = sum(group.size * (len(group.paths) - 1) for group in groups)
+    summary["seconds"] = round(time.perf_counter() - start_time, 3)
+    stream.write(json.dumps(summary) + "\n")
+    stream.flush()
+    return unused_count
+
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    "scan" writes the unused assets of a project as JSON Lines, "restore" moves the files listed in a move
+    manifest back into the project and "watch" keeps writing the assets whose state changes until interrupted.
+
+    Args:
+        argv (list): Command line arguments, defaults to sys.argv[1:].
+
+    Returns:
+        int: The process exit code.
+    """
+    parser = argparse.ArgumentParser(description="Find unused asset files in a project and restore moved ones.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan_parser = commands.add_parser("scan", help="Print the unused assets of a project as JSON Lines")
+    scan_parser.add_argument("project", help="Project directory to scan")
+    scan_parser.add_argument("-e", "--extensions", nargs="+", required=True, help="Asset extensions, e.g. .png .jpg")
+    scan_parser.add_argument("-s", "--sources", nargs="+", default=["php"], choices=[name for name in REFERENCE_SOURCES if name != "text"],
+                             help="Reference source types to search (default: php)")
+    scan_parser.add_argument("-r", "--refs", nargs="+", default=[], help="Glob patterns of additional files whose whole text is searched")
+    scan_parser.add_argument("-w", "--workers", type=int, default=None, help="Number of scan workers (default: number of CPUs)")
+    scan_parser.add_argument("--chunk-size", type=int, default=64, help="Reference files handed to a worker at a time (default: 64)")
+    scan_parser.add_argument("--mode", choices=["thread", "process"], default="process", help="Scan execution mode (default: process)")
+    scan_parser.add_argument("--large-file-mb", type=int, default=DEFAULT_LARGE_FILE_THRESHOLD // (1024 * 1024),
+                             help="Stream reference files larger than this many MB in chunks (default: %(default)s)")
+    scan_parser.add_argument("--cache-path", default=DEFAULT_SCAN_CACHE_PATH, help="Scan cache database")
+    scan_parser.add_argument("--no-cache", action="store_true", help="Do not read or update the scan cache")
+    scan_parser.add_argument("--clear-cache", action="store_true", help="Invalidate the whole scan cache before scanning")
+    scan_parser.add_argument("-d", "--duplicates", action="store_true", help="Also report groups of byte-identical assets")
+    scan_parser.add_argument("-o", "--output", help="Write the JSON Lines to this file instead of stdout")
+    scan_parser.add_argument("-q", "--quiet", action="store_true", help="Do not report progress on stderr")
+
+    restore_parser = commands.add_parser("restore", help="Move the files of a move manifest back into the project")
+    restore_parser.add_argument("manifest", help=f"The {MANIFEST_NAME} file of a backup directory")
+    restore_parser.add_argument("-w", "--workers", type=int, default=8, help="Number of concurrent restores (default: 8)")
+    watch_parser = commands.add_parser("watch", help="Index a project, then print every asset that becomes used or unused")
+    watch_parser.add_argument("project", help="Project directory to watch")
+    watch_parser.add_argument("-e", "--extensions", nargs="+", required=True, help="Asset extensions, e.g. .png .jpg")
+    watch_parser.add_argument("-s", "--sources", nargs="+", default=["php"], choices=[name for name in REFERENCE_SOURCES if name != "text"],
+                              help="Reference source types to search (default: php)")
+    watch_parser.add_argument("-r", "--refs", nargs="+", default=[], help="Glob patterns of additional files whose whole text is searched")
+    watch_parser.add_argument("-w", "--workers", type=int, default=None, help="Threads reading files during the initial build")
+    watch_parser.add_argument("--poll", type=float, default=None, metavar="SECONDS",
+                              help="Poll the project every SECONDS instead of using inotify")
+    args = parser.parse_args(argv)
+
+    if args.command == "watch":
+        return watch_project(args, watch_parser)
+
+    if args.command == "restore":
+        if not os.path.isfile(args.manifest):
+            restore_parser.error(f"manifest not found: {args.manifest}")
+        restored, failed = restore_from_manifest(args.manifest, workers=args.workers)
+        for source, error in failed:
+            print(f"Could not restore {source}: {error}", file=sys.stderr)
+        print(f"Restored {len(restored)} files, {len(failed)} failed", file=sys.stderr)
+        return 1 if failed else 0
+
+    if not os.path.isdir(args.project):
+        scan_parser.error(f"project directory not found: {args.project}")
+    if (args.workers is not None and args.workers < 1) or args.chunk_size < 1:
+        scan_parser.error("--workers and --chunk-size must be at least 1")
+
+    if args.clear_cache:
+        cache = ScanCache(args.cache_path, args.project)
+        cache.clear()
+        cache.close()
+
+    def report_progress(processed, total, last_file):
+        print(f"Scanned {processed} of {total} reference files", file=sys.stderr)
+
+    def report_log(message):
+        print(message, file=sys.stderr)
+
+    scanner = UnusedAssetsScanner(os.path.abspath(args.project),
+                                  {extension if extension.startswith(".") else "." + extension for extension in args.extensions},
+                                  reference_sources=args.sources, reference_globs=args.refs, worker_count=args.workers, chunk_size=args.chunk_size,
+                                  scan_mode=args.mode, cache_path=None if args.no_cache else args.cache_path,
+                                  large_file_threshold=args.large_file_mb * 1024 * 1024,
+                                  progress=None if args.quiet else report_progress, log=None if args.quiet else report_log)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as stream:
+            write_json_lines(scanner, stream, duplicates=args.duplicates)
+    else:
+        write_json_lines(scanner, sys.stdout, duplicates=args.duplicates)
+    return 0
+
+
+def watch_project(args, watch_parser):
+    """
+    Runs the "watch" command: prints the unused assets once the index is built, then one JSON line per asset
+    whose state changes, until interrupted with Ctrl+C.
+
+    Args:
+        args (argparse.Namespace): The parsed "watch" arguments.
+        watch_parser (argparse.ArgumentParser): The "watch" parser, used to report argument errors.
+
+    Returns:
+        int: The process exit code.
+    """
+    if not os.path.isdir(args.project):
+        watch_parser.error(f"project directory not found: {args.project}")
+    if args.poll is not None and args.poll <= 0:
+        watch_parser.error("--poll must be a positive number of seconds")
+
+    index = LiveAssetIndex(os.path.abspath(args.project),
+                           {extension if extension.startswith(".") else "." + extension for extension in args.extensions},
+                           reference_sources=args.sources, reference_globs=args.refs, worker_count=args.workers,
+                           log=lambda message: print(message, file=sys.stderr))
+    start_time = time.perf_counter()
+
+    def print_lines(records):
+        sys.stdout.write("".join(json.dumps(record) + "\n" for record in records))
+        sys.stdout.flush()
+
+    def ready():
+        records = [{"type": "unused", "path": path} for path in index.unused_assets()]
+        records.append({"type": "summary", "project": index.project_path, "used": len(index.used_files),
+                        "unused": len(index.unused_files), "seconds": round(time.perf_counter() - start_time, 3)})
+        print_lines(records)
+
+    def on_change(changes):
+        print_lines({"type": state, "path": path} for path, state in changes)
+
+    stop_event = threading.Event()
+    try:
+        index.watch(stop_event, on_change=on_change, ready=ready, poll_interval=args.poll)
+    except KeyboardInterrupt:
+        stop_event.set()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# [END OF SCRIPT unused_assets_core.py]